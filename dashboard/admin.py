@@ -2,7 +2,9 @@ from django.contrib import admin
 
 # Import models only if they exist
 try:
-    from .models import Notification, Activity, SystemLog, Meeting, MeetingAttendance, AgendaItem
+    from .models import (Notification, Activity, SystemLog, Meeting, MeetingAttendance, AgendaItem,
+                         MeetingSeries, MeetingOccurrence, AttendanceSummary, SearchDocument,
+                         MemberFinancialProfile)
     
     @admin.register(Notification)
     class NotificationAdmin(admin.ModelAdmin):
@@ -92,6 +94,42 @@ try:
         search_fields = ('title', 'description', 'meeting__title')
         raw_id_fields = ('meeting',)
         readonly_fields = ('created_date', 'modified_date')
+    
+    @admin.register(MeetingSeries)
+    class MeetingSeriesAdmin(admin.ModelAdmin):
+        list_display = ('root', 'rule', 'starts_on', 'generated_until')
+        search_fields = ('root__title', 'rule')
+        raw_id_fields = ('root',)
+        readonly_fields = ('generated_until', 'created_date')
+    
+    @admin.register(MeetingOccurrence)
+    class MeetingOccurrenceAdmin(admin.ModelAdmin):
+        list_display = ('date', 'start_time', 'series', 'meeting', 'group', 'original_date', 'is_exception')
+        list_filter = ('is_exception', 'date')
+        date_hierarchy = 'date'
+        raw_id_fields = ('series', 'meeting', 'group')
+    
+    @admin.register(AttendanceSummary)
+    class AttendanceSummaryAdmin(admin.ModelAdmin):
+        list_display = ('member', 'group', 'rate_4', 'rate_12', 'rate_52', 'last_meeting_date')
+        search_fields = ('member__first_name', 'member__last_name', 'group__name')
+        raw_id_fields = ('member', 'group')
+        readonly_fields = ('history', 'rate_4', 'rate_12', 'rate_52', 'last_meeting_date', 'last_updated')
+    
+    @admin.register(SearchDocument)
+    class SearchDocumentAdmin(admin.ModelAdmin):
+        list_display = ('model', 'object_id', 'title', 'updated_at')
+        list_filter = ('model',)
+        readonly_fields = ('model', 'object_id', 'title', 'body', 'updated_at')
+    
+    @admin.register(MemberFinancialProfile)
+    class MemberFinancialProfileAdmin(admin.ModelAdmin):
+        list_display = ('member', 'total_savings', 'outstanding_loan_balance', 'active_loans', 'member_since',
+                        'repayment_score', 'last_updated')
+        search_fields = ('member__first_name', 'member__last_name', 'member__id_number')
+        raw_id_fields = ('member',)
+        readonly_fields = ('total_savings', 'outstanding_loan_balance', 'active_loans', 'member_since',
+                           'installments_on_time', 'installments_paid_late', 'open_due_dates', 'last_updated')
 
 except ImportError:
     # Models are not defined yet or have different names
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        from .signals import (connect_attendance_signals, connect_calendar_signals, connect_changefeed_signals,
+                              connect_kpi_signals, connect_profile_signals, connect_recurrence_signals,
+                              connect_search_signals)
+        connect_kpi_signals()
+        connect_changefeed_signals()
+        connect_recurrence_signals()
+        connect_calendar_signals()
+        connect_attendance_signals()
+        connect_search_signals()
+        connect_profile_signals()
@@ -0,0 +1,100 @@
+"""
+Batched meeting attendance writes.
+
+A whole register is saved with a fixed number of queries whatever the
+meeting size: one query each to load the meeting's member and officer ids,
+then one upsert each for member and officer rows, then the few queries that
+fold the register into the attendance summaries. Each upsert is a
+bulk_create that updates on conflict with the (meeting, member) or
+(meeting, field_officer) unique key. The writes run in one transaction.
+"""
+from django.db import transaction
+from django.utils.dateparse import parse_time
+
+from .attendance_stats import record_meeting
+from .models import MeetingAttendance
+
+
+ATTENDANCE_FIELDS = ['is_present', 'arrival_time', 'departure_time', 'notes', 'recorded_by']
+
+# Attendee kinds: the entry key naming the attendee and the meeting relation they must be in
+ATTENDEE_KINDS = {
+    'member': 'members',
+    'field_officer': 'field_officers',
+}
+
+
+def _flag(value):
+    # Offline form data arrives as strings
+    return value is True or str(value).lower() in ('true', 'on', '1', 'yes')
+
+
+def _time(value, label):
+    if value in (None, ''):
+        return None
+    if hasattr(value, 'hour'):
+        return value
+    try:
+        parsed = parse_time(str(value))
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"{label} must be a time in HH:MM format.")
+    return parsed
+
+
+def save_attendance(meeting, entries, recorded_by=None):
+    """
+    Create or update attendance rows for a meeting in one transaction.
+
+    ``entries`` is a list of dicts with either ``member`` or ``field_officer``
+    (an id) and optional ``is_present``, ``arrival_time``, ``departure_time``
+    and ``notes``. Attendees not linked to the meeting are rejected. Returns
+    the number of rows written.
+    """
+    allowed = {
+        kind: set(getattr(meeting, relation).values_list('pk', flat=True))
+        for kind, relation in ATTENDEE_KINDS.items()
+    }
+
+    rows = {kind: {} for kind in ATTENDEE_KINDS}
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Entry {index} must be an object.")
+        kind = next((kind for kind in ATTENDEE_KINDS if entry.get(kind) not in (None, '')), None)
+        if kind is None:
+            raise ValueError(f"Entry {index} must name a member or a field_officer.")
+        try:
+            attendee_id = int(entry[kind])
+        except (TypeError, ValueError):
+            raise ValueError(f"Entry {index} has an invalid {kind} id.")
+        if attendee_id not in allowed[kind]:
+            raise ValueError(f"{kind.replace('_', ' ').capitalize()} {attendee_id} is not invited to this meeting.")
+
+        # The last entry for an attendee wins
+        rows[kind][attendee_id] = MeetingAttendance(
+            meeting=meeting,
+            is_present=_flag(entry.get('is_present')),
+            arrival_time=_time(entry.get('arrival_time'), f"Entry {index} arrival_time"),
+            departure_time=_time(entry.get('departure_time'), f"Entry {index} departure_time"),
+            notes=entry.get('notes') or '',
+            recorded_by=recorded_by,
+            **{f'{kind}_id': attendee_id},
+        )
+
+    with transaction.atomic():
+        for kind, records in rows.items():
+            if records:
+                MeetingAttendance.objects.bulk_create(
+                    records.values(),
+                    update_conflicts=True,
+                    unique_fields=['meeting', kind],
+                    update_fields=ATTENDANCE_FIELDS,
+                )
+        # The upserts send no post_save, so the rolling attendance rates are updated here
+        record_meeting(meeting)
+
+    # bulk_create sends no post_save, so cached saved query results are dropped here
+    from reports.queries import bump_data_version
+    bump_data_version()
+    return sum(len(records) for records in rows.values())
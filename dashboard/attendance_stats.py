@@ -0,0 +1,181 @@
+"""
+Rolling attendance rates per member and per group.
+
+Each member and group has one AttendanceSummary row. The row holds its
+latest 52 meetings and the attendance rates over the last 4, 12 and 52 of
+them. Recording a meeting's attendance updates only the summaries of the
+people in that meeting and of its group, with a constant number of queries
+(see record_meeting). Group health reports and loan eligibility checks then
+read a rate with a single-row lookup instead of scanning MeetingAttendance.
+
+Rows saved one at a time only queue their meeting (see queue_meeting): each
+meeting is recorded once when the transaction commits, however many of its
+rows were saved.
+
+A group's rate is attendees over recorded members across its meetings, so
+large meetings weigh more than small ones.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import AttendanceSummary, MeetingAttendance
+
+
+WINDOWS = (4, 12, 52)
+
+HISTORY_LENGTH = max(WINDOWS)
+
+SUMMARY_FIELDS = ['history', 'rate_4', 'rate_12', 'rate_52', 'last_meeting_date', 'last_updated']
+
+SUBJECTS = ('member', 'group')
+
+
+def merge_entry(history, meeting_id, day, present, recorded):
+    """Replace (or drop, when nothing is recorded) a meeting's entry and keep the latest meetings."""
+    entries = [entry for entry in history if entry[0] != meeting_id]
+    if recorded:
+        entries.append([meeting_id, day.isoformat(), present, recorded])
+    entries.sort(key=lambda entry: (entry[1], entry[0]))
+    return entries[-HISTORY_LENGTH:]
+
+
+def _rate(entries):
+    recorded = sum(entry[3] for entry in entries)
+    if not recorded:
+        return None
+    return (Decimal(sum(entry[2] for entry in entries) * 100) / recorded).quantize(Decimal('0.01'))
+
+
+def _refresh(summary, history, now):
+    summary.history = history
+    for window in WINDOWS:
+        setattr(summary, f'rate_{window}', _rate(history[-window:]))
+    summary.last_meeting_date = history[-1][1] if history else None
+    summary.last_updated = now
+
+
+def _apply(subject, changes, meeting_id, day):
+    # changes: {subject id: (present, recorded)} for one meeting
+    if not changes:
+        return
+    # Missing rows are inserted empty first, so that two transactions adding the
+    # same member's first meeting both end up merging into one locked row
+    AttendanceSummary.objects.bulk_create(
+        [AttendanceSummary(**{f'{subject}_id': subject_id})
+         for subject_id, (_, recorded) in changes.items() if recorded],
+        ignore_conflicts=True,
+    )
+    now = timezone.now()
+    summaries = list(AttendanceSummary.objects.select_for_update().filter(**{f'{subject}__in': list(changes)}))
+    for summary in summaries:
+        present, recorded = changes[getattr(summary, f'{subject}_id')]
+        _refresh(summary, merge_entry(summary.history, meeting_id, day, present, recorded), now)
+    AttendanceSummary.objects.bulk_update(summaries, SUMMARY_FIELDS)
+
+
+def record_meeting(meeting, removed_members=()):
+    """
+    Fold a meeting's current attendance into the summaries of its members and group.
+
+    ``removed_members`` are members whose attendance row was deleted; the
+    meeting is dropped from their history.
+    """
+    rows = list(MeetingAttendance.objects.filter(meeting=meeting, member__isnull=False)
+                .values_list('member_id', 'is_present'))
+    members = {member_id: (0, 0) for member_id in removed_members}
+    members.update({member_id: (int(is_present), 1) for member_id, is_present in rows})
+
+    with transaction.atomic():
+        _apply('member', members, meeting.pk, meeting.scheduled_date)
+        if meeting.group_id:
+            present = sum(is_present for _, is_present in rows)
+            _apply('group', {meeting.group_id: (present, len(rows))}, meeting.pk, meeting.scheduled_date)
+
+
+class _QueuedMeetings:
+    """Meetings whose rows changed in the current transaction, recorded together when it commits."""
+
+    def __init__(self):
+        self.removed_members = defaultdict(set)
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        meetings = apps.get_model('dashboard.Meeting').objects.filter(pk__in=list(self.removed_members))
+        # Meetings deleted since were dropped from the summaries already
+        for meeting in meetings:
+            record_meeting(meeting, removed_members=self.removed_members[meeting.pk])
+
+
+def queue_meeting(meeting_id, removed_members=()):
+    """Record a meeting once the current transaction commits, once however many of its rows change."""
+    queued = next((callback for _, callback, _ in transaction.get_connection().run_on_commit
+                   if isinstance(callback, _QueuedMeetings) and not callback.done), None)
+    if queued is None:
+        queued = _QueuedMeetings()
+        queued.removed_members[meeting_id].update(removed_members)
+        # Outside a transaction this runs the callback straight away
+        transaction.on_commit(queued)
+    else:
+        queued.removed_members[meeting_id].update(removed_members)
+
+
+def forget_meeting(meeting):
+    """Drop a meeting (about to be deleted) from every summary that holds it."""
+    member_ids = list(MeetingAttendance.objects.filter(meeting=meeting, member__isnull=False)
+                      .values_list('member_id', flat=True))
+    with transaction.atomic():
+        _apply('member', {member_id: (0, 0) for member_id in member_ids}, meeting.pk, meeting.scheduled_date)
+        if meeting.group_id:
+            _apply('group', {meeting.group_id: (0, 0)}, meeting.pk, meeting.scheduled_date)
+
+
+def attendance_rate(member=None, group=None, window=12):
+    """A member's or group's attendance percentage over its last ``window`` meetings, or None."""
+    if window not in WINDOWS:
+        raise ValueError(f"Attendance rates cover the last {', '.join(map(str, WINDOWS))} meetings.")
+    subject = {'member': member} if member is not None else {'group': group}
+    return AttendanceSummary.objects.filter(**subject).values_list(f'rate_{window}', flat=True).first()
+
+
+def _histories():
+    members = defaultdict(list)
+    rows = (MeetingAttendance.objects.filter(member__isnull=False)
+            .values_list('member_id', 'meeting_id', 'meeting__scheduled_date', 'is_present')
+            .iterator(chunk_size=5000))
+    for member_id, meeting_id, day, is_present in rows:
+        members[member_id] = merge_entry(members[member_id], meeting_id, day, int(is_present), 1)
+
+    groups = defaultdict(list)
+    rows = (MeetingAttendance.objects.filter(member__isnull=False, meeting__group__isnull=False)
+            .values('meeting__group_id', 'meeting_id', 'meeting__scheduled_date')
+            .annotate(present=Count('pk', filter=Q(is_present=True)), recorded=Count('pk'))
+            .order_by())
+    for row in rows:
+        groups[row['meeting__group_id']] = merge_entry(groups[row['meeting__group_id']], row['meeting_id'],
+                                                       row['meeting__scheduled_date'], row['present'],
+                                                       row['recorded'])
+    return {'member': members, 'group': groups}
+
+
+def rebuild_summaries():
+    """Recompute every summary from MeetingAttendance. Returns {subject: rows written}."""
+    now = timezone.now()
+    histories = _histories()
+    with transaction.atomic():
+        AttendanceSummary.objects.all().delete()
+        written = {}
+        for subject in SUBJECTS:
+            summaries = []
+            for subject_id, history in histories[subject].items():
+                summary = AttendanceSummary(**{f'{subject}_id': subject_id})
+                _refresh(summary, history, now)
+                summaries.append(summary)
+            AttendanceSummary.objects.bulk_create(summaries, batch_size=1000)
+            written[subject] = len(summaries)
+    return written
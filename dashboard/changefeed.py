@@ -0,0 +1,187 @@
+"""
+Change feed for offline devices.
+
+Every save or delete of a feed model replaces the row's ChangeFeedEntry with a
+new one, so the entry ids form a change sequence. Entries carry the field
+officer area the row belongs to, which lets a device ask for "everything in my
+area since cursor N" with one indexed range query and then load the changed
+rows with one query per model.
+
+Ids are handed out when an entry is written, not when its transaction
+commits, so an entry can become visible after entries with higher ids have
+already been served. The cursor therefore only moves past entries older than
+SETTLE_SECONDS: newer ones are served straight away and again on the next
+request, until no transaction that could still commit a lower id is open.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ChangeFeedEntry
+
+
+FEED_VERSION = 1
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+
+# Longest a transaction writing feed entries is expected to stay open
+SETTLE_SECONDS = 60
+
+# Models served by the feed, keyed by the name devices see, with the lookup
+# paths that give the area each row belongs to (first non-null wins)
+FEED_MODELS = {
+    'member': ('user_management.Member', ['field_officer__assigned_area']),
+    'group': ('user_management.Group', ['field_officer__assigned_area']),
+    'group_membership': ('user_management.GroupMembership', ['group__field_officer__assigned_area']),
+    'loan': ('tablebanking.Loan', ['member__field_officer__assigned_area',
+                                  'group__field_officer__assigned_area']),
+    'savings_account': ('tablebanking.IndividualSavingsAccount', ['member__field_officer__assigned_area']),
+}
+
+# When a row moves area, the rows that inherit their area from it move too
+AREA_DEPENDENTS = {
+    'member': [('savings_account', 'member'), ('loan', 'member'), ('group_membership', 'member')],
+    'group': [('group_membership', 'group'), ('loan', 'group')],
+}
+
+FEED_NAMES = {label: name for name, (label, _) in FEED_MODELS.items()}
+
+
+def feed_name_for(model):
+    """Return the feed name of a model class, or None if it is not in the feed."""
+    return FEED_NAMES.get(model._meta.label)
+
+
+def _feed_model(name):
+    return apps.get_model(FEED_MODELS[name][0])
+
+
+def _area_expression(name):
+    paths = FEED_MODELS[name][1]
+    return Coalesce(*paths) if len(paths) > 1 else F(paths[0])
+
+
+def areas_for(name, object_ids):
+    """Look up the current area of each row with a single query."""
+    rows = (_feed_model(name).objects.filter(pk__in=object_ids)
+            .annotate(feed_area=_area_expression(name)).values_list('pk', 'feed_area'))
+    return {pk: area or '' for pk, area in rows}
+
+
+def record_changes(name, object_ids, deleted=False, areas=None):
+    """
+    Replace the feed entries of the given rows with fresh ones.
+
+    ``areas`` can be passed for rows that no longer exist (deletions). If a row
+    has moved area, a tombstone is left in its old area so devices there drop it.
+    Rows moving area also re-record the rows that inherit their area.
+    """
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+
+    if areas is None:
+        areas = areas_for(name, object_ids)
+
+    previous = defaultdict(set)
+    existing = ChangeFeedEntry.objects.filter(model=name, object_id__in=object_ids)
+    for object_id, area in existing.values_list('object_id', 'area'):
+        previous[object_id].add(area)
+
+    now = timezone.now()
+    entries = []
+    moved = []
+    for object_id in object_ids:
+        area = areas.get(object_id, '')
+        entries.append(ChangeFeedEntry(model=name, object_id=object_id, area=area,
+                                       deleted=deleted, changed_at=now))
+        old_areas = previous[object_id] - {area}
+        for old_area in old_areas:
+            entries.append(ChangeFeedEntry(model=name, object_id=object_id, area=old_area,
+                                           deleted=True, changed_at=now))
+        if old_areas and not deleted:
+            moved.append(object_id)
+
+    with transaction.atomic():
+        existing.delete()
+        ChangeFeedEntry.objects.bulk_create(entries)
+
+        for dependent, field in AREA_DEPENDENTS.get(name, []) if moved else []:
+            dependent_ids = (_feed_model(dependent).objects.filter(**{f'{field}__in': moved})
+                             .values_list('pk', flat=True))
+            record_changes(dependent, list(dependent_ids))
+
+
+def rebuild_feed(batch_size=2000):
+    """Write a fresh entry for every row of every feed model. Returns the number of rows."""
+    total = 0
+    for name in FEED_MODELS:
+        ids = list(_feed_model(name).objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), batch_size):
+            record_changes(name, ids[start:start + batch_size])
+        total += len(ids)
+    return total
+
+
+def _serialize(model, objects):
+    fields = [field.attname for field in model._meta.concrete_fields]
+    return {row['id']: row for row in model.objects.filter(pk__in=objects).values(*fields)}
+
+
+def get_changes(area, since=0, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return one page of changes for an area after the cursor ``since``.
+
+    The payload groups changed rows by model as ``upserts`` (full rows) and
+    ``deletes`` (ids), plus the cursor to send next time and whether more
+    pages are waiting. The cursor stops before the first entry younger than
+    SETTLE_SECONDS, so recent changes come again until they have settled.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    entries = list(ChangeFeedEntry.objects.filter(area=area, id__gt=since)
+                   .order_by('id').values('id', 'model', 'object_id', 'deleted', 'changed_at')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    cursor = since
+    for entry in entries:
+        if entry['changed_at'] > settled:
+            break
+        cursor = entry['id']
+    # The next page starts from the cursor, so there is only more to fetch once this one has settled
+    has_more = has_more and cursor == entries[-1]['id']
+
+    wanted = defaultdict(list)
+    deletes = defaultdict(list)
+    for entry in entries:
+        if entry['deleted']:
+            deletes[entry['model']].append(entry['object_id'])
+        else:
+            wanted[entry['model']].append(entry['object_id'])
+
+    changes = {}
+    for name in FEED_MODELS:
+        rows = _serialize(_feed_model(name), wanted[name]) if wanted[name] else {}
+        # A row deleted after its entry was read is reported as deleted
+        missing = [object_id for object_id in wanted[name] if object_id not in rows]
+        if rows or deletes[name] or missing:
+            changes[name] = {
+                'upserts': [rows[object_id] for object_id in wanted[name] if object_id in rows],
+                'deletes': deletes[name] + missing,
+            }
+
+    return {
+        'version': FEED_VERSION,
+        'area': area,
+        'since': since,
+        'cursor': cursor,
+        'has_more': has_more,
+        'changes': changes,
+    }
@@ -0,0 +1,102 @@
+"""
+Copying meetings together with their participants and agenda.
+
+Members, field officers and agenda items are copied with one bulk INSERT
+per table, whatever the number of participants or copies. The member and
+officer rows go straight into the M2M through tables.
+
+clone_meeting copies a meeting onto any number of dates in one
+transaction. The copies are inserted with a single bulk_create as
+stand-alone meetings. Their calendar occurrences are inserted the same way,
+because bulk_create sends no post_save, and so are their search documents.
+"""
+from datetime import datetime, time
+
+from dateutil.rrule import rrulestr
+from django.db import transaction
+
+from .models import AgendaItem, Meeting, MeetingOccurrence
+from .month_calendar import bump_meetings_version
+from .recurrence import rule_for
+from .search import index_objects
+
+
+# Most copies one call may create (a year of weekly meetings)
+MAX_CLONES = 52
+
+# Fields a copy takes over unchanged
+COPIED_FIELDS = ['title', 'description', 'meeting_type', 'location', 'organizer_id', 'group_id', 'agenda']
+
+AGENDA_FIELDS = ['title', 'description', 'time_allocation', 'order']
+
+
+def copy_participants(source, targets):
+    """Give every target meeting the source's members, field officers and agenda items."""
+    targets = list(targets)
+    for relation in ('members', 'field_officers'):
+        field = Meeting._meta.get_field(relation)
+        through = field.remote_field.through
+        ids = list(getattr(source, relation).values_list('pk', flat=True))
+        through.objects.bulk_create(
+            [
+                through(**{field.m2m_column_name(): target.pk, field.m2m_reverse_name(): related_id})
+                for target in targets
+                for related_id in ids
+            ],
+            ignore_conflicts=True,
+        )
+
+    items = list(source.agenda_items.values(*AGENDA_FIELDS))
+    AgendaItem.objects.bulk_create([AgendaItem(meeting=target, **item) for target in targets for item in items])
+
+
+def series_dates(recurrence, first_date, count):
+    """The first ``count`` dates of a recurrence choice, starting on ``first_date``."""
+    rule = f'{rule_for(recurrence, first_date)};COUNT={count}'
+    return [moment.date() for moment in rrulestr(rule, dtstart=datetime.combine(first_date, time()))]
+
+
+def clone_meeting(meeting, dates, start_time=None, end_time=None):
+    """
+    Copy a meeting, its participants and agenda onto each of ``dates``.
+
+    The copies are scheduled, stand-alone meetings at the original's times
+    unless others are given. Returns the new meetings in date order.
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        raise ValueError("Give at least one date to copy the meeting to.")
+    if len(dates) > MAX_CLONES:
+        raise ValueError(f"A meeting can be copied to at most {MAX_CLONES} dates at once.")
+
+    with transaction.atomic():
+        clones = Meeting.objects.bulk_create([
+            Meeting(
+                scheduled_date=day,
+                start_time=start_time or meeting.start_time,
+                end_time=end_time or meeting.end_time,
+                status='SCHEDULED',
+                recurrence='NONE',
+                **{field: getattr(meeting, field) for field in COPIED_FIELDS},
+            )
+            for day in dates
+        ])
+        MeetingOccurrence.objects.bulk_create([
+            MeetingOccurrence(
+                meeting=clone,
+                group_id=clone.group_id,
+                original_date=clone.scheduled_date,
+                date=clone.scheduled_date,
+                start_time=clone.start_time,
+                end_time=clone.end_time,
+            )
+            for clone in clones
+        ])
+        copy_participants(meeting, clones)
+        index_objects('meeting', [clone.pk for clone in clones])
+
+    # bulk_create sends no post_save, so the caches that listen for it are dropped here
+    from reports.queries import bump_data_version
+    bump_data_version()
+    bump_meetings_version()
+    return clones
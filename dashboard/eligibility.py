@@ -0,0 +1,99 @@
+"""
+Loan and product eligibility pre-checks.
+
+The rules come from the product: loan products (tablebanking.LoanProduct)
+set who may borrow and how much of the amount must already be saved,
+financial products (ukombozini_products.FinancialProduct) a minimum
+membership period. Both set an amount range and whether they are open to
+individuals and to members applying through their group. Each rule is
+checked against the member's cached MemberFinancialProfile in memory, so a
+whole group is checked with two queries (see dashboard.profiles).
+"""
+from decimal import Decimal
+
+from django.apps import apps
+from django.utils import timezone
+
+from .profiles import get_profiles
+
+
+def _limit(product, profile):
+    # Largest amount the product and the member's savings allow
+    limits = []
+    if product.maximum_amount is not None:
+        limits.append(product.maximum_amount)
+    percentage = getattr(product, 'min_saving_percentage', 0)
+    if percentage:
+        limits.append((profile.total_savings * 100 / percentage).quantize(Decimal('0.01')))
+    return min(limits) if limits else None
+
+
+def evaluate(product, profile, amount=None, through_group=False, today=None):
+    """
+    Check one member's profile against every rule of a product.
+
+    Returns ``{"eligible", "reasons", "max_amount"}``; ``reasons`` lists the
+    rules that failed. Without an ``amount`` only the rules that do not
+    depend on it are checked, and ``max_amount`` says how much could be
+    applied for.
+    """
+    today = today or timezone.localdate()
+    reasons = []
+    if not product.is_active:
+        reasons.append("The product is not available.")
+    launch_date = getattr(product, 'launch_date', None)
+    if launch_date and launch_date > today:
+        reasons.append(f"The product opens on {launch_date}.")
+    if through_group and not product.group_eligible:
+        reasons.append("The product is not offered through groups.")
+    if not through_group and not product.individual_eligible:
+        reasons.append("The product is not offered to individuals.")
+
+    months = getattr(product, 'minimum_membership_months', 0)
+    if months and profile.membership_months(today) < months:
+        reasons.append(f"Needs {months} months of membership; has {profile.membership_months(today)}.")
+
+    max_amount = _limit(product, profile)
+    if amount is not None:
+        if amount < product.minimum_amount:
+            reasons.append(f"The smallest amount is {product.minimum_amount}.")
+        if product.maximum_amount is not None and amount > product.maximum_amount:
+            reasons.append(f"The largest amount is {product.maximum_amount}.")
+        percentage = getattr(product, 'min_saving_percentage', 0)
+        if percentage and profile.total_savings * 100 < amount * percentage:
+            reasons.append(f"Needs savings of {percentage}% of the amount; has {profile.total_savings}.")
+    elif max_amount is not None and max_amount < product.minimum_amount:
+        reasons.append(f"Savings of {profile.total_savings} do not cover the smallest amount.")
+
+    return {'eligible': not reasons, 'reasons': reasons, 'max_amount': max_amount}
+
+
+def profile_summary(profile, today=None):
+    """The profile figures an eligibility result shows."""
+    return {
+        'total_savings': profile.total_savings,
+        'outstanding_loan_balance': profile.outstanding_loan_balance,
+        'active_loans': profile.active_loans,
+        'membership_months': profile.membership_months(today),
+        'installments_overdue': profile.installments_overdue(today),
+        'repayment_score': profile.repayment_score(today),
+    }
+
+
+def check_members(product, member_ids, amount=None, through_group=False):
+    """{member_id: result} for several members, each with its ``profile`` summary."""
+    today = timezone.localdate()
+    results = {}
+    for member_id, profile in get_profiles(member_ids).items():
+        result = evaluate(product, profile, amount, through_group, today)
+        result['profile'] = profile_summary(profile, today)
+        results[member_id] = result
+    return results
+
+
+def check_group(product, group, amount=None):
+    """Results for every active member of a group applying through it, keyed by member id."""
+    member_ids = (apps.get_model('user_management.GroupMembership').objects
+                  .filter(group=group, is_active=True, member__is_active=True)
+                  .values_list('member_id', flat=True))
+    return check_members(product, list(member_ids), amount, through_group=True)
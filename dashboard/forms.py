@@ -1,27 +1,63 @@
+import copy
+
 from django import forms
+from django.urls import reverse
 from .models import Meeting
 from user_management.models import Member, Group, FieldOfficer
 
+
+class AutocompleteSelectMultiple(forms.SelectMultiple):
+    """
+    Multiple select that renders only the selected options.
+    
+    Everything else is found through the participant search endpoint in
+    ``data-autocomplete-url`` (see static/js/main.js), so the page carries
+    a few options however many members there are.
+    """
+    
+    def __init__(self, kind, attrs=None):
+        self.kind = kind
+        super().__init__(attrs)
+    
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-autocomplete-url'] = (
+            f"{reverse('dashboard:participant_search')}?kind={self.kind}"
+        )
+        return context
+    
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        if hasattr(choices, 'queryset'):
+            selected = [item for item in value if str(item).isdigit()]
+            self.choices = copy.copy(choices)
+            self.choices.queryset = choices.queryset.filter(pk__in=selected)
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
+
+
 class MeetingForm(forms.ModelForm):
     """Form for creating and editing meetings."""
     
-    # Additional fields not directly on the model
+    # Additional fields not directly on the model; validation looks up only the submitted ids
     members = forms.ModelMultipleChoiceField(
         queryset=Member.objects.filter(is_active=True),
         required=False,
-        widget=forms.SelectMultiple(attrs={'class': 'form-control'})
+        widget=AutocompleteSelectMultiple('member', attrs={'class': 'form-control'})
     )
     
     field_officers = forms.ModelMultipleChoiceField(
-        queryset=FieldOfficer.objects.filter(is_active=True),
+        queryset=FieldOfficer.objects.filter(is_active=True).select_related('user'),
         required=False,
-        widget=forms.SelectMultiple(attrs={'class': 'form-control'})
+        widget=AutocompleteSelectMultiple('officer', attrs={'class': 'form-control'})
     )
     
     attendees = forms.ModelMultipleChoiceField(
         queryset=Member.objects.filter(is_active=True),
         required=False,
-        widget=forms.SelectMultiple(attrs={'class': 'form-control'})
+        widget=AutocompleteSelectMultiple('member', attrs={'class': 'form-control'})
     )
     
     group = forms.ModelChoiceField(
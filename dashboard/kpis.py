@@ -0,0 +1,166 @@
+"""
+Materialized dashboard KPIs.
+
+Each KPI is a (count, total) pair stored as one KPISnapshot row. Rows are kept
+current by applying deltas when source records are saved or deleted (see
+dashboard.signals), so the dashboard reads every figure with a single query
+instead of aggregating the source tables on each page load.
+"""
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import KPISnapshot
+
+
+# Loan statuses that count towards the "Active Loans" figure
+ACTIVE_LOAN_STATUSES = ('DISBURSED', 'ACTIVE')
+
+
+class KPI:
+    """Definition of a single snapshot counter over a source model."""
+
+    def __init__(self, key, model, filters=None, amount_field=None):
+        self.key = key
+        self.model_label = model
+        self.filters = filters or {}
+        self.amount_field = amount_field
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def fields(self):
+        """Model fields needed to work out a record's contribution."""
+        fields = [name.split('__')[0] for name in self.filters]
+        if self.amount_field:
+            fields.append(self.amount_field)
+        return fields
+
+    def matches(self, values):
+        """Check a record (as a dict of field values) against the KPI filters."""
+        for lookup, expected in self.filters.items():
+            field, _, op = lookup.partition('__')
+            value = values.get(field)
+            if op == 'in':
+                if value not in expected:
+                    return False
+            elif value != expected:
+                return False
+        return True
+
+    def contribution(self, values):
+        """Return the (count, amount) a record adds to this KPI."""
+        if values is None or not self.matches(values):
+            return 0, Decimal('0')
+        amount = values.get(self.amount_field) if self.amount_field else None
+        return 1, Decimal(amount or 0)
+
+    def compute(self):
+        """Aggregate the KPI from scratch over the source table."""
+        aggregates = {'count': Count('pk')}
+        if self.amount_field:
+            aggregates['total'] = Sum(self.amount_field)
+        result = self.model.objects.filter(**self.filters).aggregate(**aggregates)
+        return result['count'], result.get('total') or Decimal('0')
+
+
+KPI_DEFINITIONS = [
+    KPI('total_members', 'user_management.Member', {'is_active': True}),
+    KPI('total_groups', 'user_management.Group', {'is_active': True}),
+    KPI('active_loans', 'tablebanking.Loan', {'status__in': ACTIVE_LOAN_STATUSES}),
+    KPI('individual_savings', 'tablebanking.IndividualSavingsAccount', {'is_active': True}, 'current_balance'),
+    KPI('group_savings', 'tablebanking.GroupSavingsAccount', {'is_active': True}, 'current_balance'),
+    KPI('agriculture_collections', 'boosters.AgricultureCollection', amount_field='total_value'),
+    KPI('school_fees_collections', 'boosters.SchoolFeesCollection', amount_field='amount'),
+]
+
+KPIS_BY_KEY = {kpi.key: kpi for kpi in KPI_DEFINITIONS}
+
+
+def kpis_for_model(model):
+    """Return the KPI definitions fed by the given model class."""
+    label = model._meta.label
+    return [kpi for kpi in KPI_DEFINITIONS if kpi.model_label == label]
+
+
+def apply_delta(key, count=0, amount=0):
+    """
+    Add a delta to a snapshot row with a single UPDATE.
+
+    If the row has never been built it is computed from scratch instead, which
+    already includes the change being recorded.
+    """
+    if not count and not amount:
+        return
+    updated = KPISnapshot.objects.filter(key=key).update(
+        count=F('count') + count,
+        total=F('total') + amount,
+        last_updated=timezone.now(),
+    )
+    if not updated:
+        rebuild_snapshots([key])
+
+
+def apply_created(model, instances):
+    """Record rows inserted with bulk_create, which does not send post_save."""
+    for kpi in kpis_for_model(model):
+        count, amount = 0, Decimal('0')
+        for instance in instances:
+            values = {field: getattr(instance, field) for field in kpi.fields}
+            instance_count, instance_amount = kpi.contribution(values)
+            count += instance_count
+            amount += instance_amount
+        apply_delta(kpi.key, count, amount)
+
+
+def rebuild_snapshots(keys=None):
+    """Recompute snapshot rows from the source tables. Returns {key: (count, total)}."""
+    definitions = [KPIS_BY_KEY[key] for key in keys] if keys else KPI_DEFINITIONS
+    now = timezone.now()
+    results = {}
+
+    with transaction.atomic():
+        for kpi in definitions:
+            count, total = kpi.compute()
+            KPISnapshot.objects.update_or_create(
+                key=kpi.key,
+                defaults={'count': count, 'total': total, 'last_updated': now, 'last_rebuilt': now},
+            )
+            results[kpi.key] = (count, total)
+
+    return results
+
+
+def verify_snapshots():
+    """
+    Compare stored snapshots with freshly computed values.
+
+    Returns a list of (key, stored, expected) tuples for every KPI that has drifted.
+    """
+    stored = {row.key: (row.count, row.total) for row in KPISnapshot.objects.all()}
+    drift = []
+    for kpi in KPI_DEFINITIONS:
+        expected = kpi.compute()
+        current = stored.get(kpi.key)
+        if current is None or current[0] != expected[0] or current[1] != expected[1]:
+            drift.append((kpi.key, current, expected))
+    return drift
+
+
+def get_snapshot():
+    """
+    Read all KPI values in one query, building any missing rows on first use.
+
+    Returns a dict mapping each KPI key to a {'count': ..., 'total': ...} dict.
+    """
+    rows = {row['key']: row for row in KPISnapshot.objects.values('key', 'count', 'total')}
+    missing = [key for key in KPIS_BY_KEY if key not in rows]
+    if missing:
+        for key, (count, total) in rebuild_snapshots(missing).items():
+            rows[key] = {'key': key, 'count': count, 'total': total}
+    return rows
@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.models import Meeting, MeetingOccurrence
+from dashboard.recurrence import ensure_occurrences, sync_meeting
+
+
+class Command(BaseCommand):
+    help = "Build meeting series and calendar occurrences for existing meetings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--until', help="Also write series occurrences up to this date (YYYY-MM-DD).")
+
+    def handle(self, *args, **options):
+        until = None
+        if options['until']:
+            try:
+                until = date.fromisoformat(options['until'])
+            except ValueError:
+                raise CommandError(f"--until must be a date (YYYY-MM-DD), not '{options['until']}'.")
+
+        # Oldest first, so a series exists before the meetings rescheduled out of it
+        for meeting in Meeting.objects.order_by('pk').iterator():
+            sync_meeting(meeting)
+        if until:
+            ensure_occurrences(until)
+        self.stdout.write(self.style.SUCCESS(f"{MeetingOccurrence.objects.count()} occurrence(s) on the calendar."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.attendance_stats import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Rebuild the rolling member and group attendance summaries from the attendance records."
+
+    def handle(self, *args, **options):
+        written = rebuild_summaries()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written['member']} member and {written['group']} group attendance summaries."
+        ))
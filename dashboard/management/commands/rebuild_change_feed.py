@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from dashboard import changefeed
+
+
+class Command(BaseCommand):
+    help = "Write a fresh change feed entry for every member, group, membership, loan and savings account."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Number of rows recorded per query batch.")
+
+    def handle(self, *args, **options):
+        total = changefeed.rebuild_feed(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Recorded {total} row(s) in the change feed."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.profiles import rebuild_profiles
+
+
+class Command(BaseCommand):
+    help = "Recompute every member's cached financial profile from their savings, loans and memberships."
+
+    def handle(self, *args, **options):
+        written = rebuild_profiles()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} member financial profile(s)."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard import kpis
+
+
+class Command(BaseCommand):
+    help = "Rebuild the dashboard KPI snapshot from the source tables, or verify it for drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help="Only compare stored snapshots with fresh aggregates; do not write.")
+        parser.add_argument('--key', action='append', dest='keys', choices=sorted(kpis.KPIS_BY_KEY),
+                            help="Limit the rebuild to the given KPI (may be repeated).")
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            drift = kpis.verify_snapshots()
+            if not drift:
+                self.stdout.write(self.style.SUCCESS("All KPI snapshots match the source tables."))
+                return
+            for key, stored, expected in drift:
+                self.stdout.write(f"{key}: stored={stored} expected={expected}")
+            raise CommandError(f"{len(drift)} KPI snapshot(s) have drifted; run rebuild_kpis to fix.")
+
+        results = kpis.rebuild_snapshots(options['keys'])
+        for key, (count, total) in results.items():
+            self.stdout.write(f"{key}: count={count} total={total}")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(results)} KPI snapshot(s)."))
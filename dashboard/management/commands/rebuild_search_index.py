@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents of every meeting, member, group and loan."
+
+    def handle(self, *args, **options):
+        written = rebuild_index()
+        summary = ', '.join(f"{count} {name}(s)" for name, count in written.items())
+        self.stdout.write(self.style.SUCCESS(f"Indexed {summary}."))
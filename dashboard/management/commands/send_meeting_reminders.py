@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.reminders import dispatch_reminders, get_backend
+
+
+class Command(BaseCommand):
+    help = "Send reminders for scheduled meetings coming up soon; meetings already reminded are skipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days-ahead', type=int, default=1,
+                            help="Remind about meetings from today up to this many days ahead.")
+        parser.add_argument('--backend', default='default',
+                            help="Name of the REMINDER_BACKENDS entry to send through.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Count the reminders without sending them or flagging meetings.")
+
+    def handle(self, *args, **options):
+        try:
+            backend = get_backend(options['backend'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        meetings, sent = dispatch_reminders(backend, options['days_ahead'], dry_run=options['dry_run'])
+        action = "Would send" if options['dry_run'] else "Sent"
+        self.stdout.write(self.style.SUCCESS(f"{action} {sent} reminder(s) for {meetings} meeting(s)."))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:49
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_agendaitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPISnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('last_updated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_rebuilt', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['key'],
+            },
+        ),
+    ]
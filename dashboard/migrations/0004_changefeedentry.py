@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_kpisnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('area', models.CharField(blank=True, default='', max_length=100)),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'Change feed entries',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['area', 'id'], name='dashboard_c_area_05e6ca_idx'), models.Index(fields=['model', 'object_id'], name='dashboard_c_model_0a5dd8_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0001_initial'),
+        ('dashboard', '0004_changefeedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MeetingSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule', models.CharField(max_length=255)),
+                ('starts_on', models.DateField()),
+                ('generated_until', models.DateField()),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('root', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='series', to='dashboard.meeting')),
+            ],
+            options={
+                'verbose_name_plural': 'Meeting series',
+            },
+        ),
+        migrations.CreateModel(
+            name='MeetingOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_date', models.DateField()),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('is_exception', models.BooleanField(default=False)),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='meeting_occurrences', to='user_management.group')),
+                ('meeting', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='dashboard.meeting')),
+                ('series', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='dashboard.meetingseries')),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='meetingseries',
+            index=models.Index(fields=['generated_until'], name='dashboard_m_generat_d74da3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meetingoccurrence',
+            index=models.Index(fields=['date', 'start_time'], name='dashboard_m_date_823679_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meetingoccurrence',
+            index=models.Index(fields=['group', 'date'], name='dashboard_m_group_i_488cf9_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='meetingoccurrence',
+            constraint=models.UniqueConstraint(fields=('series', 'original_date'), name='unique_series_occurrence'),
+        ),
+    ]
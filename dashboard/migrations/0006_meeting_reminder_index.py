@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_meeting_series'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['status', 'scheduled_date', 'reminder_sent'], name='dashboard_m_status_7df891_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0001_initial'),
+        ('dashboard', '0006_meeting_reminder_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('history', models.JSONField(blank=True, default=list)),
+                ('rate_4', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('rate_12', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('rate_52', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('last_meeting_date', models.DateField(blank=True, null=True)),
+                ('last_updated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('group', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summary', to='user_management.group')),
+                ('member', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summary', to='user_management.member')),
+            ],
+            options={
+                'verbose_name_plural': 'Attendance summaries',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='attendancesummary',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('group__isnull', True), ('member__isnull', False)), models.Q(('group__isnull', False), ('member__isnull', True)), _connector='OR'), name='attendance_summary_member_or_group'),
+        ),
+    ]
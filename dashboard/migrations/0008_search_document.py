@@ -0,0 +1,78 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:19
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+# Full-text index over dashboard_searchdocument. SQLite gets an external
+# content FTS5 table kept in step by triggers; PostgreSQL gets a GIN index on
+# the weighted tsvector that dashboard.search queries. Other backends search
+# without an index.
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE dashboard_searchdocument_fts USING fts5("
+    "title, body, content='dashboard_searchdocument', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER dashboard_searchdocument_fts_insert AFTER INSERT ON dashboard_searchdocument BEGIN "
+    "INSERT INTO dashboard_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    "CREATE TRIGGER dashboard_searchdocument_fts_delete AFTER DELETE ON dashboard_searchdocument BEGIN "
+    "INSERT INTO dashboard_searchdocument_fts(dashboard_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); END",
+    "CREATE TRIGGER dashboard_searchdocument_fts_update AFTER UPDATE ON dashboard_searchdocument BEGIN "
+    "INSERT INTO dashboard_searchdocument_fts(dashboard_searchdocument_fts, rowid, title, body) "
+    "VALUES ('delete', old.id, old.title, old.body); "
+    "INSERT INTO dashboard_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS dashboard_searchdocument_fts_update",
+    "DROP TRIGGER IF EXISTS dashboard_searchdocument_fts_delete",
+    "DROP TRIGGER IF EXISTS dashboard_searchdocument_fts_insert",
+    "DROP TABLE IF EXISTS dashboard_searchdocument_fts",
+]
+
+POSTGRESQL_INDEX = [
+    "CREATE INDEX dashboard_searchdocument_fts ON dashboard_searchdocument USING GIN ("
+    "(setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')))",
+]
+
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS dashboard_searchdocument_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement, params=None)
+    return run
+
+
+create_search_index = _run({'sqlite': SQLITE_INDEX, 'postgresql': POSTGRESQL_INDEX})
+
+drop_search_index = _run({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_attendance_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True, default='')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
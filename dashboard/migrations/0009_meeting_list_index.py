@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_search_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['-scheduled_date', 'start_time', 'id'], name='dashboard_meeting_list_idx'),
+        ),
+    ]
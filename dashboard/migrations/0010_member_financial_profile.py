@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0002_participant_search_indexes'),
+        ('dashboard', '0009_meeting_list_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberFinancialProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_savings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('outstanding_loan_balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_loans', models.PositiveIntegerField(default=0)),
+                ('member_since', models.DateField(blank=True, null=True)),
+                ('installments_on_time', models.PositiveIntegerField(default=0)),
+                ('installments_late', models.PositiveIntegerField(default=0)),
+                ('repayment_score', models.DecimalField(blank=True, decimal_places=2, help_text='Percentage of settled or penalised installments paid on time', max_digits=5, null=True)),
+                ('last_updated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='financial_profile', to='user_management.member')),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+def drop_profiles(apps, schema_editor):
+    # Profiles written before open installments were tracked are rebuilt when next read
+    apps.get_model('dashboard', 'MemberFinancialProfile').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_member_financial_profile'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='memberfinancialprofile',
+            old_name='installments_late',
+            new_name='installments_paid_late',
+        ),
+        migrations.RemoveField(
+            model_name='memberfinancialprofile',
+            name='repayment_score',
+        ),
+        migrations.AddField(
+            model_name='memberfinancialprofile',
+            name='open_due_dates',
+            field=models.JSONField(blank=True, default=list, help_text='Due dates (ISO) of the installments still open on outstanding loans'),
+        ),
+        migrations.RunPython(drop_profiles, migrations.RunPython.noop),
+    ]
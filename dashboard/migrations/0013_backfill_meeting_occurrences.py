@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:20
+
+from django.db import migrations
+from django.utils import timezone
+
+from dashboard.recurrence import HORIZON, occurrence_dates, rule_for
+
+
+def build_occurrences(apps, schema_editor):
+    """
+    Put meetings saved before the occurrence table on the calendar.
+
+    Mirrors dashboard.recurrence.sync_meeting for meetings that have no
+    occurrence or series yet: a single occurrence for one-off meetings, a
+    series written up to the horizon for recurring ones, and a rescheduled
+    meeting takes over the series date its predecessor held. Meetings go
+    oldest first, so a series exists before the meetings rescheduled out of it.
+    """
+    Meeting = apps.get_model('dashboard', 'Meeting')
+    MeetingSeries = apps.get_model('dashboard', 'MeetingSeries')
+    MeetingOccurrence = apps.get_model('dashboard', 'MeetingOccurrence')
+    covered = set(MeetingOccurrence.objects.filter(meeting__isnull=False).values_list('meeting_id', flat=True))
+    covered.update(MeetingSeries.objects.values_list('root_id', flat=True))
+    today = timezone.localdate()
+
+    singles = []
+    for meeting in Meeting.objects.order_by('pk').iterator():
+        if meeting.pk in covered:
+            continue
+        times = {'group_id': meeting.group_id, 'date': meeting.scheduled_date,
+                 'start_time': meeting.start_time, 'end_time': meeting.end_time}
+
+        held = None
+        if meeting.previous_meeting_id:
+            held = (MeetingOccurrence.objects.filter(series__isnull=False, meeting_id=meeting.previous_meeting_id)
+                    .first())
+        if held is not None:
+            MeetingOccurrence.objects.filter(pk=held.pk).update(meeting=meeting, is_exception=True, **times)
+            continue
+        if meeting.recurrence == 'NONE':
+            singles.append(MeetingOccurrence(meeting=meeting, original_date=meeting.scheduled_date, **times))
+            continue
+
+        rule = rule_for(meeting.recurrence, meeting.scheduled_date)
+        until = max(today, meeting.scheduled_date) + HORIZON
+        series = MeetingSeries.objects.create(root=meeting, rule=rule, starts_on=meeting.scheduled_date,
+                                              generated_until=until)
+        dates = occurrence_dates(rule, meeting.scheduled_date, meeting.scheduled_date, until)
+        MeetingOccurrence.objects.bulk_create([
+            MeetingOccurrence(series=series, meeting=meeting if day == meeting.scheduled_date else None,
+                              original_date=day, **dict(times, date=day))
+            for day in dates
+        ])
+        next_date = next((day for day in dates if day > meeting.scheduled_date), None)
+        Meeting.objects.filter(pk=meeting.pk).update(next_meeting_date=next_date)
+
+    MeetingOccurrence.objects.bulk_create(singles, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_cache_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_occurrences, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 from user_management.models import Member, Group, FieldOfficer
@@ -31,6 +33,9 @@ class Meeting(models.Model):
         ('QUARTERLY', 'Quarterly'),
     )
     
+    # Order of the meeting list, newest day first; keyset pages seek on it (see Meta.indexes)
+    LIST_ORDERING = ('-scheduled_date', 'start_time', 'id')
+    
     # Basic meeting information
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
@@ -69,44 +74,45 @@ class Meeting(models.Model):
     
     class Meta:
         ordering = ['-scheduled_date', 'start_time']
+        indexes = [
+            models.Index(fields=['status', 'scheduled_date', 'reminder_sent']),
+            models.Index(fields=['-scheduled_date', 'start_time', 'id'], name='dashboard_meeting_list_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.scheduled_date}"
     
     def reschedule(self, new_date, new_start_time=None, new_end_time=None, reason=None):
         """Reschedule this meeting and create a new one."""
-        # Keep a reference to the original meeting
-        original_meeting = self
-        
-        # Update the status of the original meeting
-        self.status = 'RESCHEDULED'
-        if reason:
-            self.description += f"\n\nRescheduled reason: {reason}"
-        self.save()
-        
-        # Create a new meeting with the same attributes but different date/time
-        new_meeting = Meeting.objects.create(
-            title=self.title,
-            description=self.description,
-            meeting_type=self.meeting_type,
-            location=self.location,
-            scheduled_date=new_date,
-            start_time=new_start_time or self.start_time,
-            end_time=new_end_time or self.end_time,
-            status='SCHEDULED',
-            recurrence=self.recurrence,
-            organizer=self.organizer,
-            group=self.group,
-            previous_meeting=self,
-            agenda=self.agenda,
-        )
+        from .cloning import copy_participants
         
-        # Copy the M2M relationships
-        for member in self.members.all():
-            new_meeting.members.add(member)
-        
-        for officer in self.field_officers.all():
-            new_meeting.field_officers.add(officer)
+        with transaction.atomic():
+            # Update the status of the original meeting
+            self.status = 'RESCHEDULED'
+            if reason:
+                note = f"Rescheduled reason: {reason}"
+                self.description = f"{self.description}\n\n{note}" if self.description else note
+            self.save()
+            
+            # Create a new meeting with the same attributes but different date/time
+            new_meeting = Meeting.objects.create(
+                title=self.title,
+                description=self.description,
+                meeting_type=self.meeting_type,
+                location=self.location,
+                scheduled_date=new_date,
+                start_time=new_start_time or self.start_time,
+                end_time=new_end_time or self.end_time,
+                status='SCHEDULED',
+                recurrence=self.recurrence,
+                organizer=self.organizer,
+                group=self.group,
+                previous_meeting=self,
+                agenda=self.agenda,
+            )
+            
+            # Copy participants and agenda items with bulk inserts
+            copy_participants(self, [new_meeting])
         
         return new_meeting
     
@@ -156,3 +162,229 @@ class AgendaItem(models.Model):
         
     def __str__(self):
         return f"{self.title} - {self.meeting.title}"
+
+class KPISnapshot(models.Model):
+    """Precomputed dashboard counters and sums, kept current by incremental deltas."""
+    key = models.CharField(max_length=50, unique=True)
+    count = models.BigIntegerField(default=0)
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    last_updated = models.DateTimeField(default=timezone.now)
+    last_rebuilt = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['key']
+        
+    def __str__(self):
+        return f"{self.key}: {self.count} / {self.total}"
+
+class ChangeFeedEntry(models.Model):
+    """
+    Latest change to a row that devices download through the change feed.
+    
+    The auto-incrementing id is the change sequence: every save replaces the
+    row's entry with a new one, so a device only needs the entries above the
+    cursor it was last given for its area (see dashboard.changefeed).
+    """
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    area = models.CharField(max_length=100, blank=True, default='')
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['area', 'id']),
+            models.Index(fields=['model', 'object_id']),
+        ]
+        verbose_name_plural = "Change feed entries"
+    
+    def __str__(self):
+        action = "deleted" if self.deleted else "changed"
+        return f"#{self.pk} {self.model} {self.object_id} {action} ({self.area})"
+
+class MeetingSeries(models.Model):
+    """
+    Recurrence rule of a recurring meeting.
+    
+    The root meeting holds the details every occurrence shares. The rule is
+    an RRULE (RFC 5545) without DTSTART, e.g. ``FREQ=WEEKLY;INTERVAL=2``;
+    occurrences are written to MeetingOccurrence up to ``generated_until``.
+    """
+    root = models.OneToOneField(Meeting, on_delete=models.CASCADE, related_name='series')
+    rule = models.CharField(max_length=255)
+    starts_on = models.DateField()
+    generated_until = models.DateField()
+    created_date = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name_plural = "Meeting series"
+        indexes = [
+            models.Index(fields=['generated_until']),
+        ]
+    
+    def __str__(self):
+        return f"{self.root.title} ({self.rule})"
+
+class MeetingOccurrence(models.Model):
+    """
+    One dated entry on the meeting calendar.
+    
+    Every meeting outside a series has one occurrence. A series has one per
+    date its rule produces; ``meeting`` is empty until the date has a meeting
+    of its own, which is the root for the first date and the new meeting for
+    a rescheduled one. A rescheduled occurrence keeps its ``original_date``
+    and is flagged as an exception.
+    """
+    series = models.ForeignKey(MeetingSeries, on_delete=models.CASCADE, null=True, blank=True,
+                               related_name='occurrences')
+    meeting = models.ForeignKey(Meeting, on_delete=models.CASCADE, null=True, blank=True,
+                                related_name='occurrences')
+    group = models.ForeignKey(Group, on_delete=models.SET_NULL, null=True, blank=True,
+                              related_name='meeting_occurrences')
+    original_date = models.DateField()
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    is_exception = models.BooleanField(default=False)
+    
+    class Meta:
+        ordering = ['date', 'start_time']
+        constraints = [
+            models.UniqueConstraint(fields=['series', 'original_date'], name='unique_series_occurrence'),
+        ]
+        indexes = [
+            models.Index(fields=['date', 'start_time']),
+            models.Index(fields=['group', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.display_meeting.title} - {self.date}"
+    
+    @property
+    def display_meeting(self):
+        """The meeting shown for this date: its own, or the series root."""
+        return self.meeting if self.meeting_id else self.series.root
+
+class AttendanceSummary(models.Model):
+    """
+    Rolling attendance of one member or one group, kept current as attendance is recorded.
+    
+    ``history`` holds the latest meetings oldest first, as
+    ``[meeting_id, date, present, recorded]`` (a member's ``recorded`` is 1).
+    The rates are percentages over the last 4, 12 and 52 of them.
+    """
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, null=True, blank=True,
+                                  related_name='attendance_summary')
+    group = models.OneToOneField(Group, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='attendance_summary')
+    history = models.JSONField(default=list, blank=True)
+    rate_4 = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    rate_12 = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    rate_52 = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    last_meeting_date = models.DateField(null=True, blank=True)
+    last_updated = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name_plural = "Attendance summaries"
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(member__isnull=False, group__isnull=True) |
+                models.Q(member__isnull=True, group__isnull=False),
+                name='attendance_summary_member_or_group',
+            ),
+        ]
+    
+    def __str__(self):
+        subject = self.member.get_full_name() if self.member_id else self.group.name
+        return f"{subject}: {self.rate_12}% over the last 12 meetings"
+
+class SearchDocument(models.Model):
+    """
+    Denormalized text of one searchable row (meeting, member, group or loan).
+    
+    ``title`` is what a result shows and ranks highest; ``body`` holds the
+    rest of the row's searchable text, including names copied from related
+    rows. The full-text index over both lives outside the ORM: an FTS5 table
+    on SQLite and a tsvector expression index on PostgreSQL (see
+    dashboard.search and migration 0008).
+    """
+    model = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True, default='')
+    updated_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_id'], name='unique_search_document'),
+        ]
+    
+    def __str__(self):
+        return f"{self.model} {self.object_id}: {self.title}"
+
+
+class MemberFinancialProfile(models.Model):
+    """
+    Cached financial standing of one member, kept current as their records change.
+    
+    Savings are the member's active individual accounts; the loan figures
+    cover their own loans that are disbursed or active. ``member_since`` is
+    the earliest join date of an active group membership (the registration
+    date without one). An installment counts as on time when it was settled
+    by its due date, and as late when it was settled after it or is still
+    open past it. Which open installments are past due changes with the
+    date, so the row keeps their due dates and the score is worked out when
+    it is read. Eligibility checks read this row instead of the tables
+    behind it (see dashboard.profiles).
+    """
+    member = models.OneToOneField(Member, on_delete=models.CASCADE, related_name='financial_profile')
+    total_savings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    outstanding_loan_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_loans = models.PositiveIntegerField(default=0)
+    member_since = models.DateField(null=True, blank=True)
+    installments_on_time = models.PositiveIntegerField(default=0)
+    installments_paid_late = models.PositiveIntegerField(default=0)
+    open_due_dates = models.JSONField(default=list, blank=True,
+                                      help_text="Due dates (ISO) of the installments still open on outstanding loans")
+    last_updated = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.member.get_full_name()}: savings {self.total_savings}, owing {self.outstanding_loan_balance}"
+    
+    def membership_months(self, today=None):
+        """Whole months since the member joined, or 0 when unknown."""
+        if not self.member_since:
+            return 0
+        today = today or timezone.localdate()
+        months = (today.year - self.member_since.year) * 12 + today.month - self.member_since.month
+        return max(months - (today.day < self.member_since.day), 0)
+    
+    def installments_overdue(self, today=None):
+        """Open installments whose due date has passed."""
+        today = (today or timezone.localdate()).isoformat()
+        return sum(due_date < today for due_date in self.open_due_dates)
+    
+    def repayment_score(self, today=None):
+        """Percentage of the installments due so far that were paid on time, or None before any fell due."""
+        on_time = self.installments_on_time
+        late = self.installments_paid_late + self.installments_overdue(today)
+        if not on_time + late:
+            return None
+        return (Decimal(on_time * 100) / (on_time + late)).quantize(Decimal('0.01'))
+
+
+class CacheVersion(models.Model):
+    """
+    Version counter for a family of cached results (see dashboard.versions).
+    
+    Cached entries are keyed by the version, so bumping it retires them. The
+    counter lives in the database so that every worker process sees the
+    same version.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField(default=1)
+    changed_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.key}: {self.version}"
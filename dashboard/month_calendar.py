@@ -0,0 +1,118 @@
+"""
+Cached month grids for the meeting calendar.
+
+A month's grid is built from the occurrence table once and cached under
+(year, month, scope, meetings version). The scope is everyone, one user's
+groups, or a list of groups. The meetings version is a counter in the
+database (see dashboard.versions) that goes up whenever a meeting or group
+is saved or deleted (see dashboard.signals), so no worker process serves a
+cached grid after the meetings under it have changed.
+
+The version also feeds the page's ETag and Last-Modified. A browser that
+already has the page gets a 304 after reading the version alone, without a
+single meeting query.
+"""
+import calendar
+import hashlib
+from datetime import date, timedelta
+
+from django.core.cache import cache
+
+from user_management.models import Group
+
+from .recurrence import occurrences_between
+from .versions import bump_version, get_version
+
+
+MEETINGS_VERSION_KEY = 'meetings'
+
+# Grids are replaced by the version bump, so they can live long
+CALENDAR_TIMEOUT = 60 * 60 * 24
+
+
+def meetings_version():
+    """Current meetings version (starts at 1)."""
+    return get_version(MEETINGS_VERSION_KEY)[0]
+
+
+def meetings_modified():
+    """When the meetings last changed, to the second, if they ever have."""
+    modified = get_version(MEETINGS_VERSION_KEY)[1]
+    return modified.replace(microsecond=0) if modified else None
+
+
+def bump_meetings_version():
+    """Mark every cached month grid as stale."""
+    bump_version(MEETINGS_VERSION_KEY)
+
+
+def calendar_scope(user, params):
+    """
+    The scope named by request parameters, as (key, groups).
+
+    ``?mine=1`` is the groups the user looks after as field officer and
+    ``?group=<id>`` (repeatable) is the given groups. ``groups`` is None for
+    everyone; otherwise it is a lazy queryset or a list of ids.
+    """
+    if params.get('mine'):
+        return f'mine:{user.pk}', Group.objects.filter(field_officer__user=user)
+    group_ids = sorted({int(group_id) for group_id in params.getlist('group') if group_id.isdigit()})
+    if group_ids:
+        return f"groups:{','.join(map(str, group_ids))}", group_ids
+    return 'all', None
+
+
+def calendar_etag(year, month, scope, user, today):
+    # The page shows the user's own menu and highlights today, so both are part of it
+    key = f'{year}:{month}:{scope}:{meetings_version()}:{user.pk}:{today.isoformat()}'
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _entry(occurrence):
+    meeting = occurrence.display_meeting
+    return {
+        'id': meeting.pk,
+        'title': meeting.title,
+        'meeting_type': meeting.meeting_type,
+        'location': meeting.location,
+        'status': meeting.status,
+        'date': occurrence.date,
+        'start_time': occurrence.start_time,
+        'end_time': occurrence.end_time,
+        'is_exception': occurrence.is_exception,
+        'is_recurring': occurrence.series_id is not None,
+    }
+
+
+def build_month(year, month, groups=None):
+    """The calendar grid for a month, with each day's meetings."""
+    start_date = date(year, month, 1)
+    end_date = (start_date + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+
+    meeting_days = {}
+    for occurrence in occurrences_between(start_date, end_date, groups):
+        meeting_days.setdefault(occurrence.date.day, []).append(_entry(occurrence))
+
+    prev_month = end_date.replace(day=1) - timedelta(days=1)
+    next_month = end_date + timedelta(days=1)
+    return {
+        'calendar': calendar.monthcalendar(year, month),
+        'month': month,
+        'month_name': calendar.month_name[month],
+        'year': year,
+        'prev_month': prev_month.month,
+        'prev_year': prev_month.year,
+        'next_month': next_month.month,
+        'next_year': next_month.year,
+        'meeting_days': meeting_days,
+    }
+
+
+def get_month(year, month, scope='all', groups=None):
+    """The month grid for a scope, from the cache while the meetings are unchanged."""
+    key = f'dashboard:calendar:{year}:{month}:{scope}:{meetings_version()}'
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_month(year, month, groups)
+        cache.set(key, payload, CALENDAR_TIMEOUT)
+    return payload
@@ -0,0 +1,188 @@
+"""
+Keyset (seek) pagination for long listings.
+
+A page is read by seeking past the last row of the page before it on an
+ordering that ends with the primary key, instead of counting all rows and
+skipping them with OFFSET. Every page is one range query on the ordering's
+index, so the thousandth page costs the same as the first, and rows added
+while someone pages through do not shift the pages under them.
+
+Cursors are opaque URL-safe strings holding the ordering values of the row
+a page continues from. A total is optional and approximate: the planner's
+row estimate on PostgreSQL, and elsewhere a count that stops at COUNT_CAP.
+"""
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import and_, or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+
+
+DEFAULT_PER_PAGE = 20
+
+MAX_PER_PAGE = 100
+
+# Counting stops here on backends without a planner estimate
+COUNT_CAP = 1000
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was not issued for this listing."""
+
+
+def approximate_count(queryset, cap=COUNT_CAP):
+    """
+    Roughly how many rows a queryset has, without counting them all.
+
+    PostgreSQL answers from the query plan; other backends count at most
+    ``cap`` rows.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']['Plan Rows']
+    return queryset.order_by()[:cap].count()
+
+
+class KeysetPage:
+    """One page of rows with the cursors of the pages either side of it."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Pages through ``queryset`` in ``ordering``, which must end with the primary key.
+
+    The ordering names concrete fields that are never null, of the
+    queryset's model or of rows it reaches through foreign keys
+    (``user__last_name``), with a leading "-" for descending ones. Rows from
+    ``values()`` must include every ordering field. With ``with_total`` each
+    page also carries approximate_count() of the whole listing.
+    """
+
+    def __init__(self, queryset, ordering, per_page=DEFAULT_PER_PAGE, with_total=False):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = min(max(per_page, 1), MAX_PER_PAGE)
+        self.with_total = with_total
+
+        self.fields = []
+        self.paths = []
+        for name in self.ordering:
+            path = name.lstrip('-')
+            field = self._resolve(queryset.model._meta, path)
+            self.fields.append((field, name.startswith('-')))
+            self.paths.append(field.attname if LOOKUP_SEP not in path else path)
+        if not self.fields or not self.fields[-1][0].primary_key or LOOKUP_SEP in self.paths[-1]:
+            raise ValueError("A keyset ordering must end with the primary key.")
+
+    @staticmethod
+    def _resolve(opts, path):
+        *relations, attname = path.split(LOOKUP_SEP)
+        try:
+            for relation in relations:
+                field = opts.get_field(relation)
+                if not (field.many_to_one or field.one_to_one) or not field.concrete:
+                    raise FieldDoesNotExist
+                opts = field.related_model._meta
+            return opts.pk if attname == 'pk' else opts.get_field(attname)
+        except FieldDoesNotExist:
+            raise ValueError(f"Keyset ordering needs fields of {opts.label}, not '{path}'.")
+
+    def _values(self, row):
+        values = []
+        for (field, _), path, name in zip(self.fields, self.paths, self.ordering):
+            if isinstance(row, dict):
+                name = name.lstrip('-')
+                values.append(next(row[key] for key in (path, name, field.name) if key in row))
+            else:
+                value = row
+                for attname in path.split(LOOKUP_SEP):
+                    value = getattr(value, attname)
+                values.append(value)
+        return values
+
+    def encode_cursor(self, row, direction=FORWARD):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in self._values(row)]
+        data = json.dumps([direction, values], separators=(',', ':'), default=str)
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """The direction and ordering values a cursor holds."""
+        try:
+            direction, values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+            if direction not in (FORWARD, BACKWARD) or len(values) != len(self.fields):
+                raise ValueError
+            return direction, [field.to_python(value) for (field, _), value in zip(self.fields, values)]
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            raise InvalidCursor("Invalid page cursor.")
+
+    def _seek(self, values, backward):
+        # Rows after the cursor in the ordering (before it going backward):
+        # (a > x) or (a = x and b > y) or (a = x and b = y and pk > z), per field direction
+        conditions = []
+        for index, ((_, descending), path, value) in enumerate(zip(self.fields, self.paths, values)):
+            lookup = 'lt' if descending != backward else 'gt'
+            equal = [Q(**{prior: prior_value}) for prior, prior_value in zip(self.paths[:index], values[:index])]
+            conditions.append(reduce(and_, equal + [Q(**{f'{path}__{lookup}': value})]))
+        return reduce(or_, conditions)
+
+    def page(self, cursor=None):
+        """The page a cursor points at; the first page without one."""
+        direction, values = self.decode_cursor(cursor) if cursor else (FORWARD, None)
+        backward = direction == BACKWARD
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backward))
+        ordering = self.ordering
+        if backward:
+            ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backward:
+            # Going back, the page we came from is always next
+            rows.reverse()
+            has_next, has_previous = True, more
+        else:
+            has_next, has_previous = more, values is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], FORWARD) if rows and has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], BACKWARD) if rows and has_previous else None,
+            total=approximate_count(self.queryset) if self.with_total else None,
+        )
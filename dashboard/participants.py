@@ -0,0 +1,77 @@
+"""
+Participant search for the meeting form's member and officer pickers.
+
+Every word typed must be the start of a first name, last name, ID number or
+phone number. Members are looked up through the full-text index of their
+search documents (see dashboard.search) and the prefix rule is then checked
+on just the rows it found; field officers are few enough to filter directly.
+Results are ordered by name and paged by keyset (see dashboard.pagination),
+so each page is one query seeking past the last name of the page before.
+"""
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import Q
+
+from user_management.models import FieldOfficer, Member
+
+from .pagination import KeysetPaginator
+from .search import matching_ids
+
+
+PAGE_SIZE = 20
+
+MAX_PAGE_SIZE = 50
+
+# Shorter queries would match most of the table
+MIN_QUERY_LENGTH = 2
+
+# Model, prefix-searched fields and (first name, last name, ID number) paths per kind
+PARTICIPANT_KINDS = {
+    'member': (
+        Member,
+        ['first_name', 'last_name', 'id_number', 'phone_number'],
+        ('first_name', 'last_name', 'id_number'),
+    ),
+    'officer': (
+        FieldOfficer,
+        ['user__first_name', 'user__last_name', 'id_number', 'phone_number'],
+        ('user__first_name', 'user__last_name', 'id_number'),
+    ),
+}
+
+
+def search_participants(kind, query, cursor=None, page_size=PAGE_SIZE):
+    """
+    One page of participants of ``kind`` matching ``query``.
+
+    Returns ``{"results": [{"id", "text"}], "next"}``; ``text`` is the name
+    and ID number shown in the picker and ``next`` the cursor of the
+    following page, or None on the last one. A bad cursor raises
+    InvalidCursor.
+    """
+    if kind not in PARTICIPANT_KINDS:
+        raise ValueError(f"Unknown participant kind '{kind}'.")
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    terms = query.split()
+    if len(''.join(terms)) < MIN_QUERY_LENGTH:
+        return {'results': [], 'next': None}
+
+    model, fields, display = PARTICIPANT_KINDS[kind]
+    condition = reduce(and_, [
+        reduce(or_, [Q(**{f'{field}__istartswith': term}) for field in fields])
+        for term in terms
+    ])
+    rows = model.objects.filter(condition, is_active=True)
+    if kind == 'member':
+        rows = rows.filter(pk__in=matching_ids('member', query))
+    first_name, last_name, id_number = display
+    paginator = KeysetPaginator(rows.values('pk', first_name, last_name, id_number),
+                                [last_name, first_name, 'pk'], per_page=page_size)
+    page = paginator.page(cursor)
+
+    return {
+        'results': [{'id': row['pk'], 'text': f"{row[first_name]} {row[last_name]} ({row[id_number]})"}
+                    for row in page],
+        'next': page.next_cursor,
+    }
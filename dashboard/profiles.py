@@ -0,0 +1,133 @@
+"""
+Cached member financial profiles.
+
+Each member has one MemberFinancialProfile row summing up their savings,
+outstanding loans, membership tenure and repayment record. Checking a loan
+application against it is one row read instead of aggregating savings
+accounts, loans, installments and memberships (see dashboard.eligibility).
+
+Profiles are recomputed for just the members whose records changed (see
+dashboard.signals): rows saved one at a time, and the ledger's and the
+repayment engine's bulk updates through the balance_changed and
+loans_changed signals. Any number of members is refreshed with the same
+handful of grouped queries and one upsert.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.apps import apps
+from django.db.models import Count, F, Min, Q, Sum
+from django.utils import timezone
+
+from .kpis import ACTIVE_LOAN_STATUSES
+from .models import MemberFinancialProfile
+
+
+# Members refreshed together
+CHUNK_SIZE = 1000
+
+PROFILE_FIELDS = ['total_savings', 'outstanding_loan_balance', 'active_loans', 'member_since',
+                  'installments_on_time', 'installments_paid_late', 'open_due_dates', 'last_updated']
+
+# Loans whose open installments can fall overdue
+OPEN_LOAN_STATUSES = ACTIVE_LOAN_STATUSES + ('DEFAULTED',)
+
+ZERO = Decimal('0.00')
+
+
+def _grouped(queryset, key, **aggregates):
+    rows = queryset.values(key).annotate(**aggregates).order_by()
+    return {row[key]: row for row in rows}
+
+
+def build_profiles(member_ids):
+    """Unsaved profiles for the given members that still exist, from six queries."""
+    member_ids = list(member_ids)
+    members = apps.get_model('user_management.Member').objects.filter(pk__in=member_ids)
+    registered = dict(members.values_list('pk', 'registration_date'))
+
+    savings = _grouped(
+        apps.get_model('tablebanking.IndividualSavingsAccount').objects.filter(member_id__in=member_ids,
+                                                                               is_active=True),
+        'member_id', total=Sum('current_balance'),
+    )
+    loans = _grouped(
+        apps.get_model('tablebanking.Loan').objects.filter(member_id__in=member_ids,
+                                                           status__in=ACTIVE_LOAN_STATUSES),
+        'member_id', balance=Sum('remaining_balance'), count=Count('pk'),
+    )
+    memberships = _grouped(
+        apps.get_model('user_management.GroupMembership').objects.filter(member_id__in=member_ids, is_active=True),
+        'member_id', joined=Min('join_date'),
+    )
+    installments = _grouped(
+        apps.get_model('tablebanking.LoanInstallment').objects.filter(loan__member_id__in=member_ids),
+        'loan__member_id',
+        on_time=Count('pk', filter=Q(paid_date__lte=F('due_date'))),
+        late=Count('pk', filter=Q(paid_date__gt=F('due_date'))),
+    )
+    open_due_dates = defaultdict(list)
+    unsettled = (apps.get_model('tablebanking.LoanInstallment').objects
+                 .filter(loan__member_id__in=member_ids, loan__status__in=OPEN_LOAN_STATUSES, paid_date__isnull=True)
+                 .order_by('due_date').values_list('loan__member_id', 'due_date'))
+    for member_id, due_date in unsettled:
+        open_due_dates[member_id].append(due_date.isoformat())
+
+    now = timezone.now()
+    profiles = []
+    for member_id, registration_date in registered.items():
+        loan = loans.get(member_id, {})
+        record = installments.get(member_id, {})
+        profiles.append(MemberFinancialProfile(
+            member_id=member_id,
+            total_savings=savings.get(member_id, {}).get('total') or ZERO,
+            outstanding_loan_balance=loan.get('balance') or ZERO,
+            active_loans=loan.get('count', 0),
+            member_since=memberships.get(member_id, {}).get('joined') or registration_date,
+            installments_on_time=record.get('on_time', 0),
+            installments_paid_late=record.get('late', 0),
+            open_due_dates=open_due_dates[member_id],
+            last_updated=now,
+        ))
+    return profiles
+
+
+def refresh_profiles(member_ids):
+    """Recompute and store the profiles of the given members."""
+    member_ids = sorted({member_id for member_id in member_ids if member_id})
+    for start in range(0, len(member_ids), CHUNK_SIZE):
+        MemberFinancialProfile.objects.bulk_create(
+            build_profiles(member_ids[start:start + CHUNK_SIZE]),
+            update_conflicts=True,
+            unique_fields=['member'],
+            update_fields=PROFILE_FIELDS,
+        )
+
+
+def refresh_for(model_label, object_ids):
+    """Refresh the profiles of the members owning some savings accounts or loans."""
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+    rows = apps.get_model(model_label).objects.filter(pk__in=object_ids, member__isnull=False)
+    refresh_profiles(rows.values_list('member_id', flat=True).distinct())
+
+
+def get_profiles(member_ids):
+    """{member_id: profile} for the given members, building any that are missing."""
+    member_ids = set(member_ids)
+    profiles = {profile.member_id: profile
+                for profile in MemberFinancialProfile.objects.filter(member_id__in=member_ids)}
+    missing = member_ids - profiles.keys()
+    if missing:
+        refresh_profiles(missing)
+        profiles.update((profile.member_id, profile)
+                        for profile in MemberFinancialProfile.objects.filter(member_id__in=missing))
+    return profiles
+
+
+def rebuild_profiles():
+    """Recompute every member's profile. Returns the number written."""
+    member_ids = list(apps.get_model('user_management.Member').objects.order_by('pk').values_list('pk', flat=True))
+    refresh_profiles(member_ids)
+    return len(member_ids)
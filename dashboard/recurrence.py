@@ -0,0 +1,233 @@
+"""
+Recurring meetings and the occurrence table behind the calendar.
+
+A recurring meeting is the root of a MeetingSeries. Its ``recurrence`` choice
+becomes an RRULE, and the dates the rule produces are written to
+MeetingOccurrence up to a rolling horizon of HORIZON past today, when the
+series is saved and as the horizon moves on. Dates further out are worked
+out in memory when someone looks at them and are never written, so a read
+of a far-off month costs one rule expansion per series instead of years of
+rows. Every meeting outside a series has a single occurrence, so the
+calendar reads any date range within the horizon, for any set of groups,
+with one indexed range query.
+
+A series whose root meeting is cancelled stops producing dates; its own
+first date stays on the calendar, shown as cancelled.
+
+Meeting.reschedule links the new meeting to the old one through
+``previous_meeting``. When the old meeting held an occurrence of a series,
+that occurrence moves to the new meeting's date and time. It is flagged as
+an exception and keeps its ``original_date``, so regenerating the series
+never puts the original date back.
+"""
+from datetime import datetime, time, timedelta
+
+from dateutil.rrule import rrulestr
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Meeting, MeetingOccurrence, MeetingSeries
+
+
+# How far ahead of today series dates are written; later ones are only computed
+HORIZON = timedelta(days=180)
+
+CANCELLED = 'CANCELLED'
+
+# RRULE for each Meeting.recurrence choice; monthly rules are built per start day
+RECURRENCE_RULES = {
+    'DAILY': 'FREQ=DAILY',
+    'WEEKLY': 'FREQ=WEEKLY',
+    'BIWEEKLY': 'FREQ=WEEKLY;INTERVAL=2',
+}
+
+MONTHLY_INTERVALS = {
+    'MONTHLY': 1,
+    'QUARTERLY': 3,
+}
+
+
+def rule_for(recurrence, starts_on):
+    """The RRULE for a recurrence choice starting on ``starts_on``."""
+    if recurrence in RECURRENCE_RULES:
+        return RECURRENCE_RULES[recurrence]
+    if recurrence not in MONTHLY_INTERVALS:
+        raise ValueError(f"Unknown recurrence '{recurrence}'.")
+    rule = f'FREQ=MONTHLY;INTERVAL={MONTHLY_INTERVALS[recurrence]}'
+    if starts_on.day <= 28:
+        return f'{rule};BYMONTHDAY={starts_on.day}'
+    # Months too short for the start day fall back to their last day
+    days = ','.join(str(day) for day in range(28, starts_on.day + 1))
+    return f'{rule};BYMONTHDAY={days};BYSETPOS=-1'
+
+
+def occurrence_dates(rule, starts_on, date_from, date_to):
+    """Dates the rule produces between ``date_from`` and ``date_to``, both included."""
+    dates = rrulestr(rule, dtstart=datetime.combine(starts_on, time()))
+    return [moment.date() for moment in dates.between(datetime.combine(date_from, time()),
+                                                      datetime.combine(date_to, time()), inc=True)]
+
+
+def _occurrence(series, day):
+    root = series.root
+    return MeetingOccurrence(
+        series=series,
+        meeting=root if day == root.scheduled_date else None,
+        group_id=root.group_id,
+        original_date=day,
+        date=day,
+        start_time=root.start_time,
+        end_time=root.end_time,
+    )
+
+
+def extend_series(series, until):
+    """Write the series' occurrences up to ``until``. Returns the number of dates added."""
+    if until <= series.generated_until:
+        return 0
+    dates = occurrence_dates(series.rule, series.starts_on,
+                             series.generated_until + timedelta(days=1), until)
+    MeetingOccurrence.objects.bulk_create(
+        [_occurrence(series, day) for day in dates],
+        # Exceptions already hold their original dates
+        ignore_conflicts=True,
+    )
+    series.generated_until = until
+    series.save(update_fields=['generated_until'])
+    return len(dates)
+
+
+def horizon():
+    """The last date series occurrences are written up to."""
+    return timezone.localdate() + HORIZON
+
+
+def ensure_occurrences(until):
+    """Extend every live series that stops short of ``until``."""
+    added = 0
+    series_list = (MeetingSeries.objects.filter(generated_until__lt=until).exclude(root__status=CANCELLED)
+                   .select_related('root'))
+    for series in series_list:
+        added += extend_series(series, until)
+    return added
+
+
+def projected_occurrences(date_from, date_to, groups=None):
+    """Unsaved occurrences of the series dates from ``date_from`` to ``date_to`` that are not written yet."""
+    series_list = (MeetingSeries.objects.filter(generated_until__lt=date_to).exclude(root__status=CANCELLED)
+                   .select_related('root'))
+    if groups is not None:
+        series_list = series_list.filter(root__group__in=groups)
+    return [
+        _occurrence(series, day)
+        for series in series_list
+        for day in occurrence_dates(series.rule, series.starts_on,
+                                    max(date_from, series.generated_until + timedelta(days=1)), date_to)
+    ]
+
+
+def occurrences_between(date_from, date_to, groups=None):
+    """
+    Calendar entries from ``date_from`` to ``date_to`` in date order, optionally only for ``groups``.
+
+    Series are written up to the horizon at most; dates past it are added
+    without being saved.
+    """
+    ensure_occurrences(min(date_to, horizon()))
+    occurrences = (MeetingOccurrence.objects.filter(date__gte=date_from, date__lte=date_to)
+                   .exclude(Q(series__root__status=CANCELLED) & Q(meeting__isnull=True))
+                   .select_related('meeting', 'series__root'))
+    if groups is not None:
+        occurrences = occurrences.filter(group__in=groups)
+    entries = list(occurrences)
+    if date_to > horizon():
+        entries += projected_occurrences(date_from, date_to, groups)
+        entries.sort(key=lambda occurrence: (occurrence.date, occurrence.start_time))
+    return entries
+
+
+def _set_next_meeting_date(meeting, next_date):
+    if meeting.next_meeting_date != next_date:
+        # A queryset update does not send post_save back here
+        Meeting.objects.filter(pk=meeting.pk).update(next_meeting_date=next_date)
+        meeting.next_meeting_date = next_date
+
+
+def _rescheduled_occurrence(meeting):
+    # The occurrence this meeting already moved, or the one its predecessor held
+    held = MeetingOccurrence.objects.filter(series__isnull=False, meeting=meeting, is_exception=True).first()
+    if held or not meeting.previous_meeting_id:
+        return held
+    return (MeetingOccurrence.objects.filter(series__isnull=False, meeting_id=meeting.previous_meeting_id)
+            .exclude(series__root=meeting).first())
+
+
+def _sync_series(meeting):
+    rule = rule_for(meeting.recurrence, meeting.scheduled_date)
+    series = MeetingSeries.objects.filter(root=meeting).first()
+    until = max(timezone.localdate(), meeting.scheduled_date) + HORIZON
+
+    if series is None or (series.rule, series.starts_on) != (rule, meeting.scheduled_date):
+        if series is None:
+            series = MeetingSeries(root=meeting)
+        else:
+            series.occurrences.filter(is_exception=False).delete()
+        series.rule = rule
+        series.starts_on = meeting.scheduled_date
+        series.generated_until = meeting.scheduled_date - timedelta(days=1)
+        series.save()
+    else:
+        series.occurrences.filter(is_exception=False).update(
+            group_id=meeting.group_id, start_time=meeting.start_time, end_time=meeting.end_time,
+        )
+    series.root = meeting
+    extend_series(series, until)
+
+    MeetingOccurrence.objects.filter(series__isnull=True, meeting=meeting).delete()
+    next_date = (series.occurrences.filter(original_date__gt=meeting.scheduled_date)
+                 .order_by('original_date').values_list('original_date', flat=True).first())
+    _set_next_meeting_date(meeting, next_date)
+
+
+def release_series(series):
+    """Keep meetings rescheduled out of a series on the calendar on their own."""
+    series.occurrences.filter(is_exception=True).update(series=None, is_exception=False)
+
+
+def _sync_single(meeting):
+    series = MeetingSeries.objects.filter(root=meeting).first()
+    if series is not None:
+        release_series(series)
+        series.delete()
+
+    MeetingOccurrence.objects.update_or_create(
+        series=None, meeting=meeting,
+        defaults={
+            'group_id': meeting.group_id,
+            'original_date': meeting.scheduled_date,
+            'date': meeting.scheduled_date,
+            'start_time': meeting.start_time,
+            'end_time': meeting.end_time,
+        },
+    )
+    _set_next_meeting_date(meeting, None)
+
+
+def sync_meeting(meeting):
+    """Bring the occurrence table in line with a saved meeting."""
+    with transaction.atomic():
+        occurrence = _rescheduled_occurrence(meeting)
+        if occurrence is not None:
+            occurrence.meeting = meeting
+            occurrence.group_id = meeting.group_id
+            occurrence.date = meeting.scheduled_date
+            occurrence.start_time = meeting.start_time
+            occurrence.end_time = meeting.end_time
+            occurrence.is_exception = True
+            occurrence.save()
+            MeetingOccurrence.objects.filter(series__isnull=True, meeting=meeting).delete()
+        elif meeting.recurrence == 'NONE':
+            _sync_single(meeting)
+        else:
+            _sync_series(meeting)
@@ -0,0 +1,190 @@
+"""
+Meeting reminders.
+
+Due meetings are found with one range query on the (status, scheduled_date,
+reminder_sent) index. Their recipients are expanded in three set-based
+queries per chunk of meetings: invited members, invited field officers and
+the active members of the meeting's group. Each phone number gets one
+reminder per meeting.
+
+Reminders go out through a backend configured in ``REMINDER_BACKENDS``.
+Each backend has its own batch size and rate limit (messages per second).
+A chunk's meetings are flagged ``reminder_sent`` with one UPDATE once all
+their reminders have been handed over. A run that stops half way resends
+at most one chunk, and a second run on the same day sends nothing.
+"""
+import sys
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from user_management.models import GroupMembership
+
+from .models import Meeting
+
+
+Reminder = namedtuple('Reminder', ['meeting_id', 'name', 'phone_number', 'text'])
+
+DEFAULT_BACKENDS = {
+    'default': {
+        'BACKEND': 'dashboard.reminders.ConsoleBackend',
+    },
+}
+
+DEFAULT_BATCH_SIZE = 100
+
+# Meetings whose recipients are expanded and flagged together
+MEETING_CHUNK_SIZE = 200
+
+
+class BaseReminderBackend:
+    """
+    Delivery channel for reminders.
+
+    Subclasses implement ``send_messages(reminders)``, which receives one
+    batch and returns the number of reminders sent.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, rate_limit=None, **options):
+        self.batch_size = batch_size
+        self.rate_limit = rate_limit
+        self.options = options
+
+    def send_messages(self, reminders):
+        raise NotImplementedError("Reminder backends must implement send_messages().")
+
+    def close(self):
+        pass
+
+
+class ConsoleBackend(BaseReminderBackend):
+    """Write reminders to standard output, one line each."""
+
+    def __init__(self, stream=None, **kwargs):
+        super().__init__(**kwargs)
+        self.stream = stream or sys.stdout
+
+    def send_messages(self, reminders):
+        for reminder in reminders:
+            self.stream.write(f"{reminder.phone_number}\t{reminder.name}\t{reminder.text}\n")
+        self.stream.flush()
+        return len(reminders)
+
+
+class FileBackend(ConsoleBackend):
+    """Append reminders to the file at ``PATH``."""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(stream=open(path, 'a', encoding='utf-8'), **kwargs)
+
+    def close(self):
+        self.stream.close()
+
+
+def get_backend(name='default'):
+    """Instantiate the reminder backend configured under ``name``."""
+    backends = getattr(settings, 'REMINDER_BACKENDS', DEFAULT_BACKENDS)
+    if name not in backends:
+        raise ValueError(f"Unknown reminder backend '{name}'.")
+    config = backends[name]
+    options = {key.lower(): value for key, value in config.get('OPTIONS', {}).items()}
+    return import_string(config['BACKEND'])(
+        batch_size=config.get('BATCH_SIZE', DEFAULT_BATCH_SIZE),
+        rate_limit=config.get('RATE_LIMIT'),
+        **options,
+    )
+
+
+def due_meetings(days_ahead=1, today=None):
+    """Scheduled meetings from today to ``days_ahead`` days on that have had no reminder."""
+    today = today or timezone.localdate()
+    return Meeting.objects.filter(
+        status='SCHEDULED',
+        scheduled_date__gte=today,
+        scheduled_date__lte=today + timedelta(days=days_ahead),
+        reminder_sent=False,
+    )
+
+
+def reminder_text(meeting):
+    return (f"Reminder: {meeting['title']} on {meeting['scheduled_date']:%a %d %b} at "
+            f"{meeting['start_time']:%H:%M}, {meeting['location']}.")
+
+
+def expand_recipients(meeting_ids):
+    """(meeting id, name, phone number) for everyone a reminder goes to, in three queries."""
+    members = Meeting.members.through.objects.filter(meeting_id__in=meeting_ids, member__is_active=True)
+    officers = Meeting.field_officers.through.objects.filter(meeting_id__in=meeting_ids)
+    group_members = GroupMembership.objects.filter(
+        group__group_meetings__in=meeting_ids, is_active=True, member__is_active=True,
+    )
+    sources = [
+        members.values_list('meeting_id', 'member__first_name', 'member__last_name', 'member__phone_number'),
+        officers.values_list('meeting_id', 'fieldofficer__user__first_name', 'fieldofficer__user__last_name',
+                             'fieldofficer__phone_number'),
+        group_members.values_list('group__group_meetings', 'member__first_name', 'member__last_name',
+                                  'member__phone_number'),
+    ]
+
+    seen = set()
+    for rows in sources:
+        for meeting_id, first_name, last_name, phone_number in rows:
+            if phone_number and (meeting_id, phone_number) not in seen:
+                seen.add((meeting_id, phone_number))
+                yield meeting_id, f"{first_name} {last_name}".strip(), phone_number
+
+
+def build_reminders(meetings):
+    """Reminders for a list of meeting dicts (id, title, scheduled_date, start_time, location)."""
+    by_id = {meeting['id']: meeting for meeting in meetings}
+    texts = {meeting_id: reminder_text(meeting) for meeting_id, meeting in by_id.items()}
+    return [Reminder(meeting_id, name, phone_number, texts[meeting_id])
+            for meeting_id, name, phone_number in expand_recipients(list(by_id))]
+
+
+def deliver(backend, reminders, sleep=time.sleep):
+    """Send reminders in the backend's batches, pausing to stay under its rate limit."""
+    sent = 0
+    started = time.monotonic()
+    for start in range(0, len(reminders), backend.batch_size):
+        sent += backend.send_messages(reminders[start:start + backend.batch_size])
+        if backend.rate_limit:
+            ahead = sent / backend.rate_limit - (time.monotonic() - started)
+            if ahead > 0:
+                sleep(ahead)
+    return sent
+
+
+def dispatch_reminders(backend=None, days_ahead=1, today=None, dry_run=False):
+    """
+    Send reminders for every due meeting and flag the meetings.
+
+    Returns (meetings, reminders) counted. With ``dry_run`` nothing is sent
+    or flagged.
+    """
+    backend = backend or get_backend()
+    meetings = list(due_meetings(days_ahead, today).order_by('scheduled_date', 'start_time', 'pk')
+                    .values('id', 'title', 'scheduled_date', 'start_time', 'location'))
+
+    sent = 0
+    try:
+        for start in range(0, len(meetings), MEETING_CHUNK_SIZE):
+            chunk = meetings[start:start + MEETING_CHUNK_SIZE]
+            reminders = build_reminders(chunk)
+            if dry_run:
+                sent += len(reminders)
+                continue
+            sent += deliver(backend, reminders)
+            Meeting.objects.filter(pk__in=[meeting['id'] for meeting in chunk]).update(reminder_sent=True)
+    finally:
+        backend.close()
+
+    if meetings and not dry_run:
+        # A queryset update sends no post_save, so cached saved query results are dropped here
+        from reports.queries import bump_data_version
+        bump_data_version()
+    return len(meetings), sent
@@ -0,0 +1,233 @@
+"""
+Full-text search across meetings, members, groups and loans.
+
+Each searchable row has one SearchDocument holding its text, with the
+names of related rows copied in (a meeting carries its group's name, a loan
+its member's). The documents are indexed by the database's own full-text
+engine: FTS5 on SQLite and a tsvector GIN index on PostgreSQL, both created
+by migration 0008. Every word typed matches as a prefix, so results come
+back while a name or number is still being typed.
+
+Documents are rewritten when their row is saved and dropped when it is
+deleted (see dashboard.signals). When a title other documents copy changes,
+those documents are rewritten too. Code that writes rows in bulk calls
+index_objects itself, and rebuild_index recreates every document.
+"""
+import re
+
+from django.apps import apps
+from django.db import connection, transaction
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import SearchDocument
+
+
+PAGE_SIZE = 20
+
+MAX_PAGE_SIZE = 50
+
+# Shorter queries would match most of the documents
+MIN_QUERY_LENGTH = 2
+
+# Rows read and written together when documents are built in bulk
+CHUNK_SIZE = 1000
+
+# How much more a match in the title weighs than one in the body (FTS5 bm25)
+TITLE_WEIGHT = 10.0
+
+# Searchable models keyed by document type, with the lookup paths that make
+# up a document's title and body (empty values are left out)
+SEARCH_MODELS = {
+    'meeting': ('dashboard.Meeting', ['title'],
+                ['group__name', 'location', 'description', 'agenda']),
+    'member': ('user_management.Member', ['first_name', 'last_name'],
+               ['id_number', 'phone_number', 'email', 'physical_address', 'occupation']),
+    'group': ('user_management.Group', ['name'],
+              ['registration_number', 'meeting_location', 'description']),
+    'loan': ('tablebanking.Loan', ['loan_number'],
+             ['member__first_name', 'member__last_name', 'group__name', 'loan_product__name', 'purpose']),
+}
+
+# Documents that copy another row's title, as (document type, foreign key)
+SEARCH_DEPENDENTS = {
+    'member': [('loan', 'member')],
+    'group': [('meeting', 'group'), ('loan', 'group')],
+}
+
+SEARCH_NAMES = {label: name for name, (label, _, _) in SEARCH_MODELS.items()}
+
+FTS_TABLE = f'{SearchDocument._meta.db_table}_fts'
+
+# The expression indexed on PostgreSQL; queries must repeat it exactly to use the index
+TSVECTOR = "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', body), 'B')"
+
+
+def search_name_for(model):
+    """Return the document type of a model class, or None if it is not searchable."""
+    return SEARCH_NAMES.get(model._meta.label)
+
+
+def _search_model(name):
+    return apps.get_model(SEARCH_MODELS[name][0])
+
+
+def _join(values):
+    return ' '.join(str(value) for value in values if value)
+
+
+def build_documents(name, object_ids):
+    """Unsaved documents for the given rows that still exist, from one query."""
+    _, title_paths, body_paths = SEARCH_MODELS[name]
+    rows = _search_model(name).objects.filter(pk__in=object_ids).values_list('pk', *title_paths, *body_paths)
+    now = timezone.now()
+    return [
+        SearchDocument(
+            model=name,
+            object_id=row[0],
+            title=_join(row[1:1 + len(title_paths)])[:255],
+            body=_join(row[1 + len(title_paths):]),
+            updated_at=now,
+        )
+        for row in rows
+    ]
+
+
+def index_objects(name, object_ids):
+    """
+    Rewrite the documents of the given rows.
+
+    Rows that no longer exist lose their document. If a row's title changed,
+    the documents that copy it are rewritten as well.
+    """
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+
+    for start in range(0, len(object_ids), CHUNK_SIZE):
+        chunk = object_ids[start:start + CHUNK_SIZE]
+        documents = build_documents(name, chunk)
+        previous = {}
+        if name in SEARCH_DEPENDENTS:
+            previous = dict(SearchDocument.objects.filter(model=name, object_id__in=chunk)
+                            .values_list('object_id', 'title'))
+
+        with transaction.atomic():
+            found = {document.object_id for document in documents}
+            remove_objects(name, [object_id for object_id in chunk if object_id not in found])
+            SearchDocument.objects.bulk_create(
+                documents,
+                update_conflicts=True,
+                unique_fields=['model', 'object_id'],
+                update_fields=['title', 'body', 'updated_at'],
+            )
+
+        renamed = [document.object_id for document in documents
+                   if document.object_id in previous and previous[document.object_id] != document.title]
+        for dependent, field in SEARCH_DEPENDENTS.get(name, []) if renamed else []:
+            ids = _search_model(dependent).objects.filter(**{f'{field}__in': renamed}).values_list('pk', flat=True)
+            index_objects(dependent, list(ids))
+
+
+def remove_objects(name, object_ids):
+    """Drop the documents of deleted rows."""
+    object_ids = list(object_ids)
+    if object_ids:
+        SearchDocument.objects.filter(model=name, object_id__in=object_ids).delete()
+
+
+def rebuild_index():
+    """Recreate every document from its row. Returns {document type: documents written}."""
+    written = {}
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for name in SEARCH_MODELS:
+            ids = list(_search_model(name).objects.order_by('pk').values_list('pk', flat=True))
+            written[name] = 0
+            for start in range(0, len(ids), CHUNK_SIZE):
+                documents = build_documents(name, ids[start:start + CHUNK_SIZE])
+                SearchDocument.objects.bulk_create(documents)
+                written[name] += len(documents)
+    return written
+
+
+def query_terms(query):
+    """The words of a query, lower-cased, without the punctuation the engines treat as syntax."""
+    return re.findall(r'\w+', query.lower())
+
+
+def _fts5_query(terms):
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _tsquery(terms):
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def _match_condition(terms):
+    # A boolean SQL condition on SearchDocument rows that match every term as a prefix
+    if connection.vendor == 'sqlite':
+        return Q(pk__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [_fts5_query(terms)]))
+    if connection.vendor == 'postgresql':
+        return RawSQL(f"({TSVECTOR}) @@ to_tsquery('simple', %s)", [_tsquery(terms)], output_field=BooleanField())
+    return Q(*[Q(title__icontains=term) | Q(body__icontains=term) for term in terms])
+
+
+def _ranked_rows(terms, types, limit, offset):
+    # (type, id, title) of matching documents, best first
+    if connection.vendor == 'sqlite':
+        # bm25 (lower is better) is only available inside the FTS5 query itself
+        table = SearchDocument._meta.db_table
+        placeholders = ', '.join(['%s'] * len(types))
+        sql = (f"SELECT d.model, d.object_id, d.title FROM {FTS_TABLE} JOIN {table} d ON d.id = {FTS_TABLE}.rowid "
+               f"WHERE {FTS_TABLE} MATCH %s AND d.model IN ({placeholders}) "
+               f"ORDER BY bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1.0), d.id LIMIT %s OFFSET %s")
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [_fts5_query(terms), *types, limit, offset])
+            return cursor.fetchall()
+
+    documents = SearchDocument.objects.filter(_match_condition(terms), model__in=types)
+    if connection.vendor == 'postgresql':
+        rank = RawSQL(f"ts_rank({TSVECTOR}, to_tsquery('simple', %s))", [_tsquery(terms)])
+        documents = documents.order_by(rank.desc(), 'pk')
+    else:
+        documents = documents.order_by('title', 'pk')
+    return list(documents.values_list('model', 'object_id', 'title')[offset:offset + limit])
+
+
+def matching_ids(name, query):
+    """Subquery of the ids of ``name`` rows whose document matches every word of ``query``."""
+    terms = query_terms(query)
+    documents = SearchDocument.objects.filter(model=name)
+    if not terms:
+        return documents.none().values('object_id')
+    return documents.filter(_match_condition(terms)).values('object_id')
+
+
+def search(query, types=None, page=1, page_size=PAGE_SIZE):
+    """
+    One page of documents matching every word of ``query``, best matches first.
+
+    ``types`` limits the results to some document types. Returns
+    ``{"results": [{"type", "id", "title"}], "page", "more"}``; one row more
+    than the page is read to tell whether there is a next page.
+    """
+    types = list(types or SEARCH_MODELS)
+    unknown = [name for name in types if name not in SEARCH_MODELS]
+    if unknown:
+        raise ValueError(f"Unknown search type '{unknown[0]}'.")
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), MAX_PAGE_SIZE)
+    terms = query_terms(query)
+    if len(''.join(terms)) < MIN_QUERY_LENGTH:
+        return {'results': [], 'page': page, 'more': False}
+
+    offset = (page - 1) * page_size
+    rows = _ranked_rows(terms, types, page_size + 1, offset)
+
+    return {
+        'results': [{'type': name, 'id': object_id, 'title': title} for name, object_id, title in rows[:page_size]],
+        'page': page,
+        'more': len(rows) > page_size,
+    }
@@ -0,0 +1,247 @@
+from django.apps import apps
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+
+from tablebanking.signals import balance_changed, loans_changed
+from . import attendance_stats, changefeed, kpis, month_calendar, profiles, recurrence, search
+
+
+def _current_values(instance, fields):
+    return {field: getattr(instance, field) for field in fields}
+
+
+def kpi_pre_save(sender, instance, raw=False, **kwargs):
+    """Remember what the stored row contributed before it is overwritten."""
+    if raw:
+        return
+    definitions = kpis.kpis_for_model(sender)
+    previous = None
+    if instance.pk:
+        fields = sorted({field for kpi in definitions for field in kpi.fields}) or ['pk']
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._kpi_previous = {kpi.key: kpi.contribution(previous) for kpi in definitions}
+
+
+def kpi_post_save(sender, instance, created, raw=False, **kwargs):
+    """Apply the difference between the old and new contribution of a record."""
+    if raw:
+        return
+    previous = getattr(instance, '_kpi_previous', {})
+    for kpi in kpis.kpis_for_model(sender):
+        old_count, old_amount = previous.get(kpi.key, (0, 0))
+        new_count, new_amount = kpi.contribution(_current_values(instance, kpi.fields))
+        kpis.apply_delta(kpi.key, new_count - old_count, new_amount - old_amount)
+    instance._kpi_previous = {}
+
+
+def kpi_post_delete(sender, instance, **kwargs):
+    """Remove a deleted record's contribution."""
+    for kpi in kpis.kpis_for_model(sender):
+        count, amount = kpi.contribution(_current_values(instance, kpi.fields))
+        kpis.apply_delta(kpi.key, -count, -amount)
+
+
+def kpi_balance_changed(sender, active_delta, **kwargs):
+    """Ledger postings move savings balances with bulk UPDATEs; fold them into the snapshot."""
+    for kpi in kpis.kpis_for_model(sender):
+        kpis.apply_delta(kpi.key, amount=active_delta)
+
+
+def connect_kpi_signals():
+    """Hook the KPI receivers up to every model that feeds a snapshot."""
+    for label in sorted({kpi.model_label for kpi in kpis.KPI_DEFINITIONS}):
+        model = apps.get_model(label)
+        uid = f'dashboard_kpi_{label}'
+        pre_save.connect(kpi_pre_save, sender=model, dispatch_uid=f'{uid}_pre_save')
+        post_save.connect(kpi_post_save, sender=model, dispatch_uid=f'{uid}_post_save')
+        post_delete.connect(kpi_post_delete, sender=model, dispatch_uid=f'{uid}_post_delete')
+    
+    balance_changed.connect(kpi_balance_changed, dispatch_uid='dashboard_kpi_balance_changed')
+
+
+def feed_post_save(sender, instance, raw=False, **kwargs):
+    """Give a saved row a new change sequence number."""
+    if raw:
+        return
+    changefeed.record_changes(changefeed.feed_name_for(sender), [instance.pk])
+
+
+def feed_pre_delete(sender, instance, **kwargs):
+    """Capture the row's area while its relations can still be followed."""
+    name = changefeed.feed_name_for(sender)
+    instance._feed_area = changefeed.areas_for(name, [instance.pk]).get(instance.pk, '')
+
+
+def feed_post_delete(sender, instance, **kwargs):
+    """Leave a tombstone so devices drop the deleted row."""
+    name = changefeed.feed_name_for(sender)
+    changefeed.record_changes(name, [instance.pk], deleted=True,
+                              areas={instance.pk: getattr(instance, '_feed_area', '')})
+
+
+def feed_officer_pre_save(sender, instance, raw=False, **kwargs):
+    if raw or not instance.pk:
+        return
+    instance._feed_previous_area = (sender.objects.filter(pk=instance.pk)
+                                    .values_list('assigned_area', flat=True).first())
+
+
+def feed_officer_post_save(sender, instance, created, raw=False, **kwargs):
+    """An officer moving area takes their members and groups (and everything under them) along."""
+    if raw or created or getattr(instance, '_feed_previous_area', None) == instance.assigned_area:
+        return
+    for name in ('member', 'group'):
+        model = apps.get_model(changefeed.FEED_MODELS[name][0])
+        ids = model.objects.filter(field_officer=instance).values_list('pk', flat=True)
+        changefeed.record_changes(name, list(ids))
+
+
+def feed_balance_changed(sender, deltas, **kwargs):
+    name = changefeed.feed_name_for(sender)
+    if name:
+        changefeed.record_changes(name, deltas.keys())
+
+
+def feed_loans_changed(sender, loan_ids, **kwargs):
+    changefeed.record_changes('loan', loan_ids)
+
+
+def connect_changefeed_signals():
+    """Hook the change feed up to the models devices download."""
+    for label, _ in changefeed.FEED_MODELS.values():
+        model = apps.get_model(label)
+        uid = f'dashboard_feed_{label}'
+        post_save.connect(feed_post_save, sender=model, dispatch_uid=f'{uid}_post_save')
+        pre_delete.connect(feed_pre_delete, sender=model, dispatch_uid=f'{uid}_pre_delete')
+        post_delete.connect(feed_post_delete, sender=model, dispatch_uid=f'{uid}_post_delete')
+    
+    officer = apps.get_model('user_management.FieldOfficer')
+    pre_save.connect(feed_officer_pre_save, sender=officer, dispatch_uid='dashboard_feed_officer_pre_save')
+    post_save.connect(feed_officer_post_save, sender=officer, dispatch_uid='dashboard_feed_officer_post_save')
+    balance_changed.connect(feed_balance_changed, dispatch_uid='dashboard_feed_balance_changed')
+    loans_changed.connect(feed_loans_changed, dispatch_uid='dashboard_feed_loans_changed')
+
+
+def recurrence_post_save(sender, instance, raw=False, **kwargs):
+    """Keep a meeting's calendar occurrences (and its series) in step with it."""
+    if raw:
+        return
+    recurrence.sync_meeting(instance)
+
+
+def recurrence_pre_delete(sender, instance, **kwargs):
+    """Rescheduled meetings outlive the series they were moved out of."""
+    series = recurrence.MeetingSeries.objects.filter(root=instance).first()
+    if series is not None:
+        recurrence.release_series(series)
+
+
+def connect_recurrence_signals():
+    """Hook the occurrence table up to meeting saves and deletes."""
+    meeting = apps.get_model('dashboard.Meeting')
+    post_save.connect(recurrence_post_save, sender=meeting, dispatch_uid='dashboard_recurrence_post_save')
+    pre_delete.connect(recurrence_pre_delete, sender=meeting, dispatch_uid='dashboard_recurrence_pre_delete')
+
+
+def calendar_changed(sender, raw=False, **kwargs):
+    """Any meeting or group change retires the cached calendar months."""
+    if raw:
+        return
+    month_calendar.bump_meetings_version()
+
+
+def connect_calendar_signals():
+    """Bump the meetings version whenever what the calendar shows can change."""
+    for label in ('dashboard.Meeting', 'user_management.Group'):
+        model = apps.get_model(label)
+        uid = f'dashboard_calendar_{label}'
+        post_save.connect(calendar_changed, sender=model, dispatch_uid=f'{uid}_post_save')
+        post_delete.connect(calendar_changed, sender=model, dispatch_uid=f'{uid}_post_delete')
+
+
+def attendance_post_save(sender, instance, raw=False, **kwargs):
+    """Queue a saved attendance row's meeting for the rolling attendance rates."""
+    if raw:
+        return
+    attendance_stats.queue_meeting(instance.meeting_id)
+
+
+def attendance_post_delete(sender, instance, **kwargs):
+    attendance_stats.queue_meeting(instance.meeting_id,
+                                   removed_members=[instance.member_id] if instance.member_id else [])
+
+
+def attendance_meeting_pre_delete(sender, instance, **kwargs):
+    attendance_stats.forget_meeting(instance)
+
+
+def connect_attendance_signals():
+    """Keep the attendance summaries in step with attendance rows saved one at a time."""
+    attendance = apps.get_model('dashboard.MeetingAttendance')
+    meeting = apps.get_model('dashboard.Meeting')
+    post_save.connect(attendance_post_save, sender=attendance, dispatch_uid='dashboard_attendance_post_save')
+    post_delete.connect(attendance_post_delete, sender=attendance, dispatch_uid='dashboard_attendance_post_delete')
+    pre_delete.connect(attendance_meeting_pre_delete, sender=meeting,
+                       dispatch_uid='dashboard_attendance_meeting_pre_delete')
+
+
+def search_post_save(sender, instance, raw=False, **kwargs):
+    """Rewrite a saved row's search document (and those that copy its title)."""
+    if raw:
+        return
+    search.index_objects(search.search_name_for(sender), [instance.pk])
+
+
+def search_post_delete(sender, instance, **kwargs):
+    search.remove_objects(search.search_name_for(sender), [instance.pk])
+
+
+def connect_search_signals():
+    """Keep the search documents in step with the rows they describe."""
+    for label, _, _ in search.SEARCH_MODELS.values():
+        model = apps.get_model(label)
+        uid = f'dashboard_search_{label}'
+        post_save.connect(search_post_save, sender=model, dispatch_uid=f'{uid}_post_save')
+        post_delete.connect(search_post_delete, sender=model, dispatch_uid=f'{uid}_post_delete')
+
+
+# Models whose rows feed a member's financial profile, with the field naming the member
+PROFILE_SOURCES = {
+    'user_management.Member': 'pk',
+    'user_management.GroupMembership': 'member_id',
+    'tablebanking.IndividualSavingsAccount': 'member_id',
+    'tablebanking.Loan': 'member_id',
+}
+
+
+def profile_changed(sender, instance, raw=False, origin=None, **kwargs):
+    """Recompute the profile of the member a saved or deleted row belongs to."""
+    if raw:
+        return
+    # Rows deleted along with their member take the profile with them
+    member = apps.get_model('user_management.Member')
+    if isinstance(origin, member) or getattr(origin, 'model', None) is member:
+        return
+    member_id = getattr(instance, PROFILE_SOURCES[sender._meta.label])
+    if member_id:
+        profiles.refresh_profiles([member_id])
+
+
+def profile_balance_changed(sender, deltas, **kwargs):
+    if sender._meta.label == 'tablebanking.IndividualSavingsAccount':
+        profiles.refresh_for(sender._meta.label, deltas.keys())
+
+
+def profile_loans_changed(sender, loan_ids, **kwargs):
+    profiles.refresh_for('tablebanking.Loan', loan_ids)
+
+
+def connect_profile_signals():
+    """Keep the member financial profiles in step with savings, loans and memberships."""
+    for label in PROFILE_SOURCES:
+        model = apps.get_model(label)
+        uid = f'dashboard_profile_{label}'
+        post_save.connect(profile_changed, sender=model, dispatch_uid=f'{uid}_post_save')
+        post_delete.connect(profile_changed, sender=model, dispatch_uid=f'{uid}_post_delete')
+    
+    balance_changed.connect(profile_balance_changed, dispatch_uid='dashboard_profile_balance_changed')
+    loans_changed.connect(profile_loans_changed, dispatch_uid='dashboard_profile_loans_changed')
@@ -0,0 +1,295 @@
+"""
+Batch synchronisation of records captured offline by the PWA.
+
+A device posts a list of records (transactions, loan repayments and booster
+collections/payments). Each record is validated in memory against foreign
+keys preloaded in one query per field, deduplicated on its reference or
+receipt number, and every model's new rows are written with one bulk_create
+inside a single database transaction. The caller gets one result per record
+in the order they were sent, so retrying a batch is always safe.
+"""
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import kpis
+
+
+MAX_BATCH_SIZE = 500
+
+# Offline-capable models: model label, natural key used for deduplication and
+# the field that records the field officer who captured the record
+SYNC_MODELS = {
+    'transaction': ('tablebanking.Transaction', 'reference_number', 'field_officer'),
+    'loan_repayment': ('tablebanking.LoanRepayment', 'reference_number', 'received_by'),
+    'agriculture_collection': ('boosters.AgricultureCollection', 'receipt_number', 'collected_by'),
+    'school_fees_collection': ('boosters.SchoolFeesCollection', 'receipt_number', 'collected_by'),
+    'booster_payment': ('boosters.BoosterPayment', 'reference_number', 'processed_by'),
+}
+
+# Bookkeeping fields that are never compared when checking for conflicts
+SYNC_METADATA_FIELDS = ('id', 'is_synced', 'offline_created_at')
+
+
+class SyncResult:
+    """Outcome for one submitted record."""
+
+    CREATED = 'created'
+    DUPLICATE = 'duplicate'
+    CONFLICT = 'conflict'
+    INVALID = 'invalid'
+
+    def __init__(self, index, client_id, model_key):
+        self.index = index
+        self.client_id = client_id
+        self.model_key = model_key
+        self.status = None
+        self.id = None
+        self.errors = None
+
+    def as_dict(self):
+        result = {'index': self.index, 'client_id': self.client_id, 'model': self.model_key,
+                  'status': self.status, 'id': self.id}
+        if self.errors:
+            result['errors'] = self.errors
+        return result
+
+
+def _concrete_fields(model):
+    return [field for field in model._meta.concrete_fields if field.name not in SYNC_METADATA_FIELDS]
+
+
+def _build_instance(model, data):
+    """
+    Build an unsaved instance from submitted data.
+
+    Foreign keys are accepted as either ``field`` or ``field_id`` and are set
+    by id only; their existence is checked separately in bulk.
+    """
+    instance = model()
+    provided = []
+    for field in _concrete_fields(model):
+        if field.is_relation:
+            if field.name in data or field.attname in data:
+                value = data.get(field.attname, data.get(field.name))
+                setattr(instance, field.attname, value if value not in ('', None) else None)
+                provided.append(field)
+        elif field.name in data:
+            setattr(instance, field.attname, data[field.name])
+            provided.append(field)
+
+    offline_created_at = data.get('offline_created_at')
+    if offline_created_at:
+        instance.offline_created_at = parse_datetime(str(offline_created_at))
+    if not instance.offline_created_at:
+        instance.offline_created_at = timezone.now()
+    instance.is_synced = True
+    return instance, provided
+
+
+def _prepare(model, instance):
+    """Apply the defaults the model's own save() would otherwise fill in."""
+    if model._meta.label == 'boosters.AgricultureCollection' and instance.total_value in (None, ''):
+        try:
+            instance.total_value = Decimal(str(instance.quantity)) * Decimal(str(instance.unit_price))
+        except (InvalidOperation, TypeError, ValueError):
+            pass
+
+
+def _make_aware(model, instance):
+    """Interpret naive submitted datetimes in the project time zone."""
+    for field in model._meta.concrete_fields:
+        if field.get_internal_type() == 'DateTimeField':
+            value = getattr(instance, field.attname)
+            if value is not None and timezone.is_naive(value):
+                setattr(instance, field.attname, timezone.make_aware(value))
+
+
+def _coerce(field, value):
+    """Convert a submitted foreign key value to the target's type, or None if it cannot be."""
+    try:
+        return field.target_field.to_python(value)
+    except ValidationError:
+        return None
+
+
+def _validate_foreign_keys(model, pending):
+    """
+    Check every submitted foreign key with one query per field. Returns {index: errors}.
+
+    Required foreign keys left out are reported here, as full_clean() skips relations.
+    """
+    errors = defaultdict(dict)
+    for field in model._meta.concrete_fields:
+        if not field.is_relation:
+            continue
+
+        submitted = {}
+        for index, instance, _ in pending:
+            value = getattr(instance, field.attname)
+            if value is not None:
+                submitted[index] = _coerce(field, value)
+            elif not field.null:
+                errors[index][field.name] = [field.error_messages['null']]
+        wanted = set(submitted.values()) - {None}
+        if not submitted:
+            continue
+
+        existing = set(field.related_model._default_manager
+                       .filter(**{f'{field.target_field.attname}__in': wanted})
+                       .values_list(field.target_field.attname, flat=True)) if wanted else set()
+        for index, instance, _ in pending:
+            if index not in submitted:
+                continue
+            if submitted[index] in existing:
+                setattr(instance, field.attname, submitted[index])
+            else:
+                errors[index][field.name] = [f"{field.related_model._meta.verbose_name} does not exist."]
+    return errors
+
+
+def _differs(existing, instance, provided):
+    """Whether a submitted record disagrees with the stored record it duplicates."""
+    for field in provided:
+        if getattr(existing, field.attname) != getattr(instance, field.attname):
+            return True
+    return False
+
+
+def _insert(model, instances):
+    """
+    Insert new rows with a single bulk_create.
+
+    If a concurrent upload inserted one of the same natural keys first, fall
+    back to inserting row by row so only the clashing rows are rejected.
+    Returns the list of rows actually inserted.
+    """
+    try:
+        with transaction.atomic():
+            return model.objects.bulk_create(instances)
+    except IntegrityError:
+        inserted = []
+        for instance in instances:
+            instance.pk = None
+            try:
+                with transaction.atomic():
+                    inserted.extend(model.objects.bulk_create([instance]))
+            except IntegrityError:
+                instance.pk = None
+        return inserted
+
+
+def _after_insert(model, inserted):
+    """Run the side effects that model save() methods and signals would have run."""
+    label = model._meta.label
+    if label == 'tablebanking.Transaction':
+        from tablebanking.ledger import post_transactions
+        post_transactions(inserted)
+    elif label == 'tablebanking.LoanRepayment':
+        from tablebanking.repayments import apply_repayments
+        apply_repayments(inserted)
+    kpis.apply_created(model, inserted)
+
+    # Bulk inserts send no post_save, so cached saved query results are dropped here
+    from reports.queries import bump_data_version
+    bump_data_version()
+
+
+def sync_records(records, field_officer=None):
+    """
+    Validate, deduplicate and insert a batch of offline records.
+
+    ``records`` is a list of ``{"model": ..., "client_id": ..., "data": {...}}``
+    dicts. Returns one result dict per record, in the submitted order.
+    """
+    results = []
+    by_model = defaultdict(list)
+
+    for index, record in enumerate(records):
+        record = record if isinstance(record, dict) else {}
+        model_key = record.get('model')
+        result = SyncResult(index, record.get('client_id'), model_key)
+        results.append(result)
+
+        if model_key not in SYNC_MODELS:
+            result.status = SyncResult.INVALID
+            result.errors = {'model': [f"Unknown model '{model_key}'."]}
+            continue
+        if not isinstance(record.get('data'), dict):
+            result.status = SyncResult.INVALID
+            result.errors = {'data': ["This field must be an object."]}
+            continue
+        by_model[model_key].append((index, record['data']))
+
+    with transaction.atomic():
+        for model_key, submitted in by_model.items():
+            label, key_field, officer_field = SYNC_MODELS[model_key]
+            model = apps.get_model(label)
+
+            # Build and validate every record in memory
+            relations = [field.name for field in model._meta.concrete_fields if field.is_relation]
+            pending = []
+            for index, data in submitted:
+                instance, provided = _build_instance(model, data)
+                if field_officer is not None and getattr(instance, f'{officer_field}_id') is None:
+                    setattr(instance, officer_field, field_officer)
+                _prepare(model, instance)
+                try:
+                    instance.full_clean(exclude=relations, validate_unique=False)
+                except ValidationError as e:
+                    results[index].status = SyncResult.INVALID
+                    results[index].errors = e.message_dict
+                    continue
+                _make_aware(model, instance)
+                pending.append((index, instance, provided))
+
+            for index, errors in _validate_foreign_keys(model, pending).items():
+                results[index].status = SyncResult.INVALID
+                results[index].errors = errors
+            pending = [item for item in pending if results[item[0]].status is None]
+
+            # Deduplicate against stored rows and within the batch
+            keys = {getattr(instance, key_field) for _, instance, _ in pending}
+            existing = model.objects.in_bulk(keys, field_name=key_field)
+            to_insert = {}
+            for index, instance, provided in pending:
+                key = getattr(instance, key_field)
+                match = existing.get(key)
+                if match is None and key in to_insert:
+                    match = to_insert[key][1]
+                if match is None:
+                    to_insert[key] = (index, instance, provided)
+                    continue
+                results[index].status = (SyncResult.CONFLICT if _differs(match, instance, provided)
+                                         else SyncResult.DUPLICATE)
+                results[index].id = match.pk
+
+            inserted = _insert(model, [instance for _, instance, _ in to_insert.values()])
+            rejected = [getattr(instance, key_field) for _, instance, _ in to_insert.values() if instance.pk is None]
+            taken = set(model.objects.filter(**{f'{key_field}__in': rejected})
+                        .values_list(key_field, flat=True)) if rejected else set()
+            for index, instance, _ in to_insert.values():
+                if instance.pk is None and getattr(instance, key_field) in taken:
+                    results[index].status = SyncResult.CONFLICT
+                    results[index].errors = {key_field: ["A record with this number was synced concurrently."]}
+                elif instance.pk is None:
+                    results[index].status = SyncResult.INVALID
+                    results[index].errors = {'__all__': ["The record could not be saved."]}
+                else:
+                    results[index].status = SyncResult.CREATED
+                    results[index].id = instance.pk
+
+            # Repeats of a record first seen in this batch point at its new id
+            for index, instance, _ in pending:
+                if results[index].id is None and results[index].status != SyncResult.CREATED:
+                    results[index].id = to_insert[getattr(instance, key_field)][1].pk
+
+            if inserted:
+                _after_insert(model, inserted)
+
+    return [result.as_dict() for result in results]
@@ -1,3 +1,1096 @@
-from django.test import TestCase
+import importlib
+import json
+import os
+import tempfile
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from tablebanking.models import (GroupSavingsAccount, IndividualSavingsAccount, Loan, LoanInstallment, LoanProduct,
+                                 LoanRepayment, SavingsProduct, Transaction)
+from ukombozini_products.models import FinancialProduct
+from user_management.models import FieldOfficer, Group, GroupMembership, Member
+
+from . import attendance_stats
+from .changefeed import SETTLE_SECONDS, get_changes
+from .cloning import MAX_CLONES, clone_meeting, series_dates
+from .eligibility import check_group, check_members, profile_summary
+from .kpis import get_snapshot, verify_snapshots
+from .models import (AgendaItem, AttendanceSummary, CacheVersion, ChangeFeedEntry, KPISnapshot, Meeting,
+                     MeetingAttendance, MeetingOccurrence, MeetingSeries, MemberFinancialProfile, SearchDocument)
+from .month_calendar import MEETINGS_VERSION_KEY, meetings_version
+from .pagination import InvalidCursor, KeysetPaginator
+from .participants import search_participants
+from .profiles import refresh_profiles
+from .recurrence import HORIZON, occurrences_between
+from .reminders import BaseReminderBackend, deliver, dispatch_reminders, get_backend
+from .search import FTS_TABLE, matching_ids, rebuild_index, search
+from .sync import MAX_BATCH_SIZE
+
+
+# Stand-ins for the meeting pages that touch every relation the real pages show
+MEETING_TEMPLATES = {
+    'dashboard/meeting_list.html': (
+        '{{ upcoming_count }} {{ completed_count }} {{ page_obj.total }} {{ page_obj.next_cursor }}'
+        '{% for meeting in page_obj %}{{ meeting }} {{ meeting.group.name }} '
+        '{{ meeting.organizer.get_full_name }}{% endfor %}'
+    ),
+    'dashboard/meeting_detail.html': (
+        '{{ meeting }} {{ meeting.group.name }} {{ meeting.organizer.username }}'
+        '{% for member in meeting.members.all %}{{ member.get_full_name }}{% endfor %}'
+        '{% for officer in meeting.field_officers.all %}{{ officer.user.get_full_name }}{% endfor %}'
+        '{% for item in meeting.agenda_items.all %}{{ item.title }}{% endfor %}'
+        '{% for record in attendance_records %}{{ record }} {{ record.recorded_by.username }}{% endfor %}'
+    ),
+    'dashboard/index.html': '{{ total_members }} {{ total_groups }} {{ active_loans }} {{ total_savings }}',
+    'dashboard/calendar.html': (
+        '{{ month_name }} {{ year }}{% for day, entries in meeting_days.items %}'
+        '{% for entry in entries %}{{ day }}: {{ entry.title }} {% endfor %}{% endfor %}'
+    ),
+}
+
+TEST_TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {
+        'loaders': [('django.template.loaders.locmem.Loader', MEETING_TEMPLATES)],
+        'context_processors': [
+            'django.template.context_processors.request',
+            'django.contrib.auth.context_processors.auth',
+        ],
+    },
+}]
+
+# Session and user lookups included
+MEETING_LIST_QUERIES = 4
+MEETING_DETAIL_QUERIES = 9
+
+# Due meetings, three recipient queries and the flagging UPDATE
+DISPATCH_QUERIES = 5
+
+
+class GroupTestCase(TestCase):
+    """An organizer who is also a field officer, and the group they look after."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('organizer', password='secret', first_name='Ann', last_name='Ok')
+        cls.officer = FieldOfficer.objects.create(
+            user=cls.user, phone_number='+254700000000', id_number='FO-1',
+            location='Nairobi', assigned_area='Central',
+        )
+        cls.group = Group.objects.create(
+            name='Umoja', registration_number='G-1', formation_date=date(2020, 1, 1),
+            meeting_schedule='Every Monday', meeting_location='Hall', field_officer=cls.officer,
+        )
+        cls.sequence = 0
+
+
+@override_settings(TEMPLATES=TEST_TEMPLATES)
+class KPISnapshotTests(GroupTestCase):
+    """The headline figures follow saves, edits and deletes of their rows and agree with a rebuild."""
+
+    def add_member(self, index):
+        return Member.objects.create(first_name='Member', last_name=str(index), id_number=f'K-{index}', gender='F',
+                                     date_of_birth=date(1990, 1, 1), phone_number='+254711111111',
+                                     physical_address='Village')
+
+    def figures(self):
+        snapshot = get_snapshot()
+        return {key: (row['count'], row['total']) for key, row in snapshot.items()
+                if key in ('total_members', 'total_groups', 'active_loans', 'individual_savings')}
+
+    def test_figures_follow_saves_edits_and_deletes(self):
+        get_snapshot()
+        members = [self.add_member(index) for index in range(3)]
+        members[0].is_active = False
+        members[0].save()
+        members[1].delete()
+
+        savings = SavingsProduct.objects.create(name='Savings', code='SV', description='', interest_rate=0,
+                                                minimum_deposit=0)
+        account = IndividualSavingsAccount.objects.create(member=members[2], product=savings, account_number='S-1',
+                                                          current_balance=Decimal('500'))
+        account.current_balance = Decimal('800')
+        account.save()
+        product = LoanProduct.objects.create(name='Group loan', code='GL', description='', interest_rate=12,
+                                             minimum_amount=100, maximum_amount=100000, minimum_term=1,
+                                             maximum_term=12)
+        _, completed = [
+            Loan.objects.create(loan_product=product, loan_number=f'L-{index}', group=self.group,
+                                principal_amount=1200, interest_rate=12, term_months=3, status='DISBURSED',
+                                disbursement_date=date(2024, 1, 1))
+            for index in range(2)
+        ]
+        completed.status = 'COMPLETED'
+        completed.save()
+
+        self.assertEqual(self.figures(), {
+            'total_members': (1, 0), 'total_groups': (1, 0), 'active_loans': (1, 0),
+            'individual_savings': (1, Decimal('800.00')),
+        })
+        self.assertEqual(verify_snapshots(), [])
+
+    def test_drift_is_reported_and_rebuilt(self):
+        get_snapshot()
+        KPISnapshot.objects.filter(key='total_groups').update(count=7)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_kpis', '--verify', stdout=StringIO())
+        call_command('rebuild_kpis', '--key', 'total_groups', stdout=StringIO())
+        self.assertEqual(verify_snapshots(), [])
+
+    def test_index_reads_every_figure_in_one_query(self):
+        self.add_member(0)
+        get_snapshot()
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard:index'))
+        self.assertEqual(response.content.decode(), '1 1 0 0')
+        self.assertEqual(sum('dashboard_kpisnapshot' in query['sql'] for query in queries.captured_queries), 1)
+
+
+@override_settings(TEMPLATES=TEST_TEMPLATES)
+class MeetingQueryBudgetTests(GroupTestCase):
+    """The meeting pages run a fixed number of queries however many rows they show."""
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def add_meetings(self, count, attendees=0):
+        meetings = []
+        for index in range(count):
+            meeting = Meeting.objects.create(
+                title=f'Meeting {index}', location='Hall', group=self.group, organizer=self.user,
+                scheduled_date=date.today() + timedelta(days=index), start_time=time(14), end_time=time(16),
+            )
+            meeting.field_officers.add(self.officer)
+            for _ in range(attendees):
+                type(self).sequence += 1
+                member = Member.objects.create(
+                    first_name='Member', last_name=str(self.sequence), id_number=f'M-{self.sequence}',
+                    gender='F', date_of_birth=date(1990, 1, 1), phone_number='+254711111111',
+                    physical_address='Village',
+                )
+                meeting.members.add(member)
+                AgendaItem.objects.create(meeting=meeting, title=f'Item {self.sequence}')
+                MeetingAttendance.objects.create(meeting=meeting, member=member, is_present=True,
+                                                 recorded_by=self.user)
+            MeetingAttendance.objects.create(meeting=meeting, field_officer=self.officer, recorded_by=self.user)
+            meetings.append(meeting)
+        return meetings
+
+    def test_meeting_list_budget(self):
+        self.add_meetings(2)
+        with self.assertNumQueries(MEETING_LIST_QUERIES):
+            self.client.get(reverse('dashboard:meeting_list'))
+
+        self.add_meetings(12)
+        with self.assertNumQueries(MEETING_LIST_QUERIES):
+            response = self.client.get(reverse('dashboard:meeting_list'), {'search': 'Umoja'})
+        page = response.context['page_obj']
+        self.assertEqual(response.context['upcoming_count'], 14)
+        self.assertIsNone(page.total)
+        self.assertEqual(len(page), 10)
+
+        with self.assertNumQueries(MEETING_LIST_QUERIES):
+            response = self.client.get(reverse('dashboard:meeting_list'),
+                                       {'search': 'Umoja', 'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['page_obj']), 4)
+        self.assertFalse(response.context['page_obj'].has_next)
+
+    @override_settings(TEMPLATES=[{**TEST_TEMPLATES[0], 'OPTIONS': {
+        **TEST_TEMPLATES[0]['OPTIONS'],
+        'loaders': [('django.template.loaders.locmem.Loader', {'base.html': '{% block content %}{% endblock %}'}),
+                    'django.template.loaders.app_directories.Loader'],
+    }}])
+    def test_meeting_list_links_pages_by_cursor(self):
+        self.add_meetings(12)
+        response = self.client.get(reverse('dashboard:meeting_list'), {'search': 'Umoja'})
+        page = response.context['page_obj']
+        self.assertContains(response, f'href="?cursor={page.next_cursor}&search=Umoja"')
+        self.assertNotContains(response, '?page=')
+
+        response = self.client.get(reverse('dashboard:meeting_list'), {'search': 'Umoja', 'cursor': page.next_cursor})
+        self.assertContains(response, 'Meeting 0')
+        self.assertContains(response, f'?cursor={response.context["page_obj"].previous_cursor}')
+        self.assertContains(response, 'href="?search=Umoja&"')
+
+    def test_meeting_detail_budget(self):
+        small, = self.add_meetings(1, attendees=1)
+        large, = self.add_meetings(1, attendees=15)
+
+        for meeting in (small, large):
+            with self.assertNumQueries(MEETING_DETAIL_QUERIES):
+                response = self.client.get(reverse('dashboard:meeting_detail', args=[meeting.pk]))
+            self.assertTrue(response.context['is_assigned'])
+            self.assertTrue(response.context['can_edit'])
+
+
+class OfflineSyncTests(GroupTestCase):
+    """A batch of offline records is inserted once; retries come back as duplicates or conflicts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        savings = SavingsProduct.objects.create(name='Savings', code='SV', description='', interest_rate=0,
+                                                minimum_deposit=0)
+        cls.account = GroupSavingsAccount.objects.create(group=cls.group, product=savings, account_number='GS-1')
+        product = LoanProduct.objects.create(name='Group loan', code='GL', description='', interest_rate=12,
+                                             minimum_amount=100, maximum_amount=100000, minimum_term=1,
+                                             maximum_term=12, interest_method='FLAT')
+        cls.loan = Loan.objects.create(loan_product=product, loan_number='L-1', group=cls.group,
+                                       principal_amount=1200, interest_rate=12, term_months=3, status='DISBURSED',
+                                       disbursement_date=date(2024, 1, 1))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def deposit(self, reference, amount='500', **data):
+        return {'model': 'transaction', 'client_id': reference,
+                'data': {'transaction_type': 'DEPOSIT', 'amount': amount, 'reference_number': reference,
+                         'group_savings_account': self.account.pk, **data}}
+
+    def sync(self, records):
+        return self.client.post(reverse('api_sync'), {'records': records}, content_type='application/json')
+
+    def statuses(self, response):
+        return [result['status'] for result in response.json()['results']]
+
+    def test_batch_is_validated_deduplicated_and_inserted(self):
+        records = [
+            self.deposit('D-1'),
+            self.deposit('D-2', amount='250'),
+            self.deposit('D-1'),
+            self.deposit('D-3', group_savings_account=0),
+            {'model': 'account', 'data': {}},
+            {'model': 'loan_repayment', 'data': {'loan': self.loan.pk, 'amount': '412', 'reference_number': 'R-1'}},
+        ]
+        response = self.sync(records)
+        self.assertEqual(self.statuses(response), ['created', 'created', 'duplicate', 'invalid', 'invalid', 'created'])
+        results = response.json()['results']
+        self.assertEqual(results[2]['id'], results[0]['id'])
+        self.assertIn('group_savings_account', results[3]['errors'])
+
+        # The side effects of saving one at a time still happen
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.current_balance, Decimal('750.00'))
+        self.assertEqual(set(Transaction.objects.values_list('field_officer', flat=True)), {self.officer.pk})
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.remaining_balance, Decimal('824.00'))
+
+    def test_retries_are_duplicates_and_changed_records_conflicts(self):
+        self.sync([self.deposit('D-1'), self.deposit('D-2')])
+        response = self.sync([self.deposit('D-1'), self.deposit('D-2', amount='900')])
+        self.assertEqual(self.statuses(response), ['duplicate', 'conflict'])
+        self.assertEqual(response.json()['summary'], {'duplicate': 1, 'conflict': 1})
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.current_balance, Decimal('1000.00'))
+
+    def test_missing_required_relations_are_invalid(self):
+        response = self.sync([
+            {'model': 'loan_repayment', 'data': {'amount': '412', 'reference_number': 'R-1'}},
+            {'model': 'loan_repayment', 'data': {'loan': None, 'amount': '412', 'reference_number': 'R-2'}},
+        ])
+        self.assertEqual(self.statuses(response), ['invalid', 'invalid'])
+        for result in response.json()['results']:
+            self.assertEqual(result['errors'], {'loan': ['This field cannot be null.']})
+        self.assertFalse(LoanRepayment.objects.exists())
+
+    def test_malformed_and_oversized_batches_are_refused(self):
+        self.assertEqual(self.sync({'records': 'D-1'}).status_code, 400)
+        self.assertEqual(self.sync([self.deposit(f'D-{index}') for index in range(MAX_BATCH_SIZE + 1)]).status_code,
+                         400)
+        self.assertFalse(Transaction.objects.exists())
+
+
+class AttendanceSyncTests(GroupTestCase):
+    """Registers replayed by the service worker are saved; a refused one is a client error."""
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.meeting = Meeting.objects.create(
+            title='Register', location='Hall', group=self.group, organizer=self.user,
+            scheduled_date=timezone.localdate(), start_time=time(14), end_time=time(16),
+        )
+        self.meeting.field_officers.add(self.officer)
+        self.present, self.absent = [
+            Member.objects.create(first_name=name, last_name='Achieng', id_number=f'A-{name}', gender='F',
+                                  date_of_birth=date(1990, 1, 1), phone_number='+254711111111',
+                                  physical_address='Village')
+            for name in ('Present', 'Absent')
+        ]
+        self.meeting.members.add(self.present, self.absent)
+
+    def post(self, payload):
+        return self.client.post(reverse('api_attendance'), json.dumps(payload), content_type='application/json')
+
+    def test_replayed_register_is_saved(self):
+        # The shape serviceworker.js builds from the register's form fields
+        response = self.post({
+            'meeting': self.meeting.pk, 'mark_completed': True,
+            'attendance': [
+                {'member': self.present.pk, 'is_present': True, 'arrival_time': '14:05'},
+                {'member': self.absent.pk, 'is_present': False, 'arrival_time': '', 'notes': 'Travelling'},
+                {'field_officer': self.officer.pk, 'is_present': True},
+            ],
+        })
+        self.assertEqual(response.json(), {'meeting': self.meeting.pk, 'saved': 3, 'status': 'COMPLETED'})
+        record = MeetingAttendance.objects.get(meeting=self.meeting, member=self.absent)
+        self.assertEqual((record.is_present, record.notes), (False, 'Travelling'))
+        self.assertEqual(MeetingAttendance.objects.get(meeting=self.meeting, member=self.present).arrival_time,
+                         time(14, 5))
+
+    def test_refused_register_is_a_client_error(self):
+        stranger = Member.objects.create(first_name='Stranger', last_name='Otieno', id_number='S-1', gender='F',
+                                         date_of_birth=date(1990, 1, 1), phone_number='+254722222222',
+                                         physical_address='Town')
+        response = self.post({'meeting': self.meeting.pk, 'attendance': [{'member': stranger.pk}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.post({'meeting': 0, 'attendance': []}).status_code, 404)
+
+
+class AttendanceSummaryTests(GroupTestCase):
+    """Rows saved one at a time update the rolling rates once per meeting, when the transaction commits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.members = [
+            Member.objects.create(first_name=name, last_name='Wambui', id_number=f'W-{name}', gender='F',
+                                  date_of_birth=date(1990, 1, 1), phone_number='+254711111111',
+                                  physical_address='Village')
+            for name in ('Akinyi', 'Baraka', 'Chebet')
+        ]
+
+    def add_meeting(self, day):
+        meeting = Meeting.objects.create(title=f'Meeting {day}', location='Hall', group=self.group,
+                                         organizer=self.user, scheduled_date=day, start_time=time(14),
+                                         end_time=time(16))
+        meeting.members.add(*self.members)
+        return meeting
+
+    def register(self, meeting, present):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for member in self.members:
+                MeetingAttendance.objects.create(meeting=meeting, member=member, is_present=member in present,
+                                                 recorded_by=self.user)
+        return callbacks
+
+    def test_a_register_is_recorded_once_per_meeting(self):
+        meeting = self.add_meeting(date(2024, 1, 1))
+        with patch.object(attendance_stats, 'record_meeting', wraps=attendance_stats.record_meeting) as record:
+            callbacks = self.register(meeting, self.members[:2])
+        self.assertEqual((len(callbacks), record.call_count), (1, 1))
+
+        self.assertEqual(attendance_stats.attendance_rate(member=self.members[0]), Decimal('100.00'))
+        self.assertEqual(attendance_stats.attendance_rate(member=self.members[2]), Decimal('0.00'))
+        self.assertEqual(attendance_stats.attendance_rate(group=self.group), Decimal('66.67'))
+
+    def test_later_meetings_merge_into_the_existing_summaries(self):
+        self.register(self.add_meeting(date(2024, 1, 1)), self.members)
+        second = self.add_meeting(date(2024, 1, 8))
+        self.register(second, [])
+        self.assertEqual(AttendanceSummary.objects.count(), 4)
+        self.assertEqual(attendance_stats.attendance_rate(member=self.members[0]), Decimal('50.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MeetingAttendance.objects.filter(meeting=second, member=self.members[0]).delete()
+        self.assertEqual(attendance_stats.attendance_rate(member=self.members[0]), Decimal('100.00'))
+        self.assertEqual(attendance_stats.attendance_rate(group=self.group), Decimal('60.00'))
+
+    def test_summaries_written_meanwhile_are_merged_not_inserted_again(self):
+        # Another transaction gave the member a summary after this one started
+        AttendanceSummary.objects.create(member=self.members[0], history=[[0, '2023-12-25', 0, 1]])
+        self.register(self.add_meeting(date(2024, 1, 1)), self.members)
+        summary = AttendanceSummary.objects.get(member=self.members[0])
+        self.assertEqual([entry[1] for entry in summary.history], ['2023-12-25', '2024-01-01'])
+        self.assertEqual(summary.rate_4, Decimal('50.00'))
+
+
+    def test_rows_saved_in_one_transaction_are_recorded_on_commit(self):
+        meeting = self.add_meeting(date(2024, 1, 1))
+        with self.captureOnCommitCallbacks() as callbacks:
+            MeetingAttendance.objects.create(meeting=meeting, member=self.members[0], is_present=True,
+                                             recorded_by=self.user)
+        self.assertFalse(AttendanceSummary.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertEqual(attendance_stats.attendance_rate(member=self.members[0]), Decimal('100.00'))
+        self.assertEqual(attendance_stats.attendance_rate(group=self.group), Decimal('100.00'))
+
+
+class AttendanceAutocommitTests(TransactionTestCase):
+    """Rows saved outside a transaction update the rolling rates straight away."""
+
+    def test_autocommit_saves_are_recorded(self):
+        user = User.objects.create_user('recorder', password='secret')
+        group = Group.objects.create(name='Upendo', registration_number='G-A', formation_date=date(2020, 1, 1),
+                                     meeting_schedule='Every Friday', meeting_location='Hall')
+        member = Member.objects.create(first_name='Akinyi', last_name='Wambui', id_number='A-1', gender='F',
+                                       date_of_birth=date(1990, 1, 1), phone_number='+254711111111',
+                                       physical_address='Village')
+        meeting = Meeting.objects.create(title='Meeting', location='Hall', group=group, organizer=user,
+                                         scheduled_date=date(2024, 1, 1), start_time=time(14), end_time=time(16))
+        self.assertFalse(connection.in_atomic_block)
+
+        attendance = MeetingAttendance.objects.create(meeting=meeting, member=member, is_present=True,
+                                                      recorded_by=user)
+        self.assertEqual(attendance_stats.attendance_rate(member=member), Decimal('100.00'))
+        self.assertEqual(attendance_stats.attendance_rate(group=group), Decimal('100.00'))
+
+        attendance.delete()
+        self.assertIsNone(attendance_stats.attendance_rate(member=member))
+
+
+class SearchIndexTests(GroupTestCase):
+    """Search documents follow their rows and come back ranked and paged."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.member = Member.objects.create(
+            first_name='Wanjiru', last_name='Kamau', id_number='12345678', gender='F',
+            date_of_birth=date(1990, 1, 1), phone_number='+254722000111', physical_address='Umoja estate',
+        )
+
+    def add_meeting(self, title, **fields):
+        return Meeting.objects.create(
+            title=title, location='Hall', group=self.group, organizer=self.user,
+            scheduled_date=date.today(), start_time=time(14), end_time=time(16), **fields,
+        )
+
+    def found(self, query, **kwargs):
+        return [(result['type'], result['id']) for result in search(query, **kwargs)['results']]
+
+    def test_prefix_match_across_types(self):
+        meeting = self.add_meeting('Harvest planning')
+        self.assertEqual(self.found('harv'), [('meeting', meeting.pk)])
+        self.assertEqual(self.found('wanj kam'), [('member', self.member.pk)])
+        self.assertEqual(self.found('1234'), [('member', self.member.pk)])
+        self.assertEqual(self.found('wanjiru harvest'), [])
+
+    def test_title_matches_rank_first(self):
+        meeting = self.add_meeting('Savings review')
+        found = self.found('umoja')
+        self.assertEqual(found[0], ('group', self.group.pk))
+        self.assertCountEqual(found[1:], [('member', self.member.pk), ('meeting', meeting.pk)])
+        self.assertEqual(self.found('umoja', types=['meeting']), [('meeting', meeting.pk)])
+        with self.assertRaises(ValueError):
+            search('umoja', types=['account'])
+
+    def test_documents_follow_saves_and_deletes(self):
+        meeting = self.add_meeting('Savings review')
+        self.group.name = 'Tumaini'
+        self.group.save()
+        self.assertEqual(list(Meeting.objects.filter(pk__in=matching_ids('meeting', 'tumaini'))), [meeting])
+
+        meeting.delete()
+        self.member.delete()
+        self.assertEqual(self.found('tumaini'), [('group', self.group.pk)])
+        self.assertFalse(SearchDocument.objects.filter(model__in=['meeting', 'member']).exists())
+
+    def test_pages_and_rebuild(self):
+        for index in range(5):
+            self.add_meeting(f'Training {index}')
+        first = search('training', page_size=3)
+        second = search('training', page=2, page_size=3)
+        self.assertTrue(first['more'])
+        self.assertFalse(second['more'])
+        self.assertEqual(len(first['results']) + len(second['results']), 5)
+
+        SearchDocument.objects.all().delete()
+        self.assertEqual(rebuild_index(), {'meeting': 5, 'member': 1, 'group': 1, 'loan': 0})
+        self.assertEqual(len(self.found('training')), 5)
+
+    def test_search_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('dashboard:search'), {'q': 'wanjiru'})
+        self.assertEqual(response.json()['results'], [{'type': 'member', 'id': self.member.pk,
+                                                       'title': 'Wanjiru Kamau'}])
+        response = self.client.get(reverse('dashboard:search'), {'q': 'wanjiru', 'page': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ParticipantSearchTests(GroupTestCase):
+    """Pickers find participants by name, ID or phone prefix through the search index, a keyset page at a time."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.members = [
+            Member.objects.create(first_name='Wanjiku', last_name=last_name, id_number=f'2000{index}',
+                                  gender='F', date_of_birth=date(1990, 1, 1), phone_number=f'+25472200011{index}',
+                                  physical_address='Kibera')
+            for index, last_name in enumerate(['Otieno', 'Kamau', 'Njeri', 'Achieng', 'Mutua'])
+        ]
+
+    def found(self, query, kind='member', **kwargs):
+        return [result['id'] for result in search_participants(kind, query, **kwargs)['results']]
+
+    def test_every_word_is_a_prefix_of_a_name_id_or_phone(self):
+        kamau = self.members[1]
+        self.assertEqual(self.found('wanj kam'), [kamau.pk])
+        self.assertEqual(self.found('20001'), [kamau.pk])
+        self.assertEqual(self.found('+254722000111'), [kamau.pk])
+        # The address is in the search document but is not a picker field
+        self.assertEqual(self.found('kibera'), [])
+        self.assertEqual(self.found('k'), [])
+        self.assertEqual(self.found('ann ok', kind='officer'), [self.officer.pk])
+
+    def test_members_are_found_through_the_full_text_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Checks the SQLite FTS5 table.')
+        with self.assertNumQueries(1) as queries:
+            self.found('wanjiku')
+        self.assertIn(FTS_TABLE, queries.captured_queries[0]['sql'])
+
+    def test_pages_follow_the_names_by_cursor(self):
+        pages, cursor = [], None
+        while True:
+            page = search_participants('member', 'wanjiku', cursor=cursor, page_size=2)
+            pages.append([result['text'] for result in page['results']])
+            cursor = page['next']
+            if cursor is None:
+                break
+        self.assertEqual(pages, [
+            ['Wanjiku Achieng (20003)', 'Wanjiku Kamau (20001)'],
+            ['Wanjiku Mutua (20004)', 'Wanjiku Njeri (20002)'],
+            ['Wanjiku Otieno (20000)'],
+        ])
+
+    def test_view_rejects_bad_cursors(self):
+        self.client.force_login(self.user)
+        url = reverse('dashboard:participant_search')
+        response = self.client.get(url, {'kind': 'officer', 'q': 'ann'})
+        self.assertEqual(response.json(), {'results': [{'id': self.officer.pk, 'text': 'Ann Ok (FO-1)'}],
+                                           'next': None})
+        self.assertEqual(self.client.get(url, {'q': 'wanjiku', 'cursor': 'junk'}).status_code, 400)
+
+
+class KeysetPaginationTests(GroupTestCase):
+    """Keyset pages walk a listing both ways without gaps or repeats."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for index in range(7):
+            # Two meetings a day, the later one created first
+            for hour in (16, 9):
+                Meeting.objects.create(
+                    title=f'Day {index} {hour}h', location='Hall', group=cls.group, organizer=cls.user,
+                    scheduled_date=date(2024, 1, 1) + timedelta(days=index // 2), start_time=time(hour),
+                    end_time=time(hour + 1),
+                )
+
+    def test_pages_follow_the_ordering(self):
+        paginator = KeysetPaginator(Meeting.objects.all(), Meeting.LIST_ORDERING, per_page=4, with_total=True)
+        expected = list(Meeting.objects.order_by(*Meeting.LIST_ORDERING))
+        pages, cursor = [], None
+        while True:
+            with self.assertNumQueries(2):
+                page = paginator.page(cursor)
+            self.assertEqual(page.total, 14)
+            pages.append(page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual([meeting for page in pages for meeting in page], expected)
+        self.assertEqual([len(page) for page in pages], [4, 4, 4, 2])
+        self.assertFalse(pages[0].has_previous)
+
+        back = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual(back.object_list, pages[-2].object_list)
+        self.assertEqual(paginator.page(back.previous_cursor).object_list, pages[-3].object_list)
+        self.assertEqual(paginator.page(back.next_cursor).object_list, pages[-1].object_list)
+
+    def test_rejects_bad_orderings_and_cursors(self):
+        with self.assertRaises(ValueError):
+            KeysetPaginator(Meeting.objects.all(), ['-scheduled_date', 'start_time'])
+        paginator = KeysetPaginator(Meeting.objects.values('id', 'scheduled_date', 'start_time'),
+                                    Meeting.LIST_ORDERING, per_page=5)
+        self.assertEqual(len(paginator.page(paginator.page().next_cursor)), 5)
+        for cursor in ('junk', KeysetPaginator(Meeting.objects.all(), ['-id'], per_page=5).page().next_cursor):
+            with self.assertRaises(InvalidCursor):
+                paginator.page(cursor)
+
+
+class ChangeFeedTests(GroupTestCase):
+    """The feed cursor never moves past an entry that a transaction still open could precede."""
+
+    def setUp(self):
+        ChangeFeedEntry.objects.update(changed_at=timezone.now() - timedelta(seconds=SETTLE_SECONDS + 1))
+
+    def add_member(self, name):
+        return Member.objects.create(first_name=name, last_name='Achieng', id_number=f'F-{name}', gender='F',
+                                     date_of_birth=date(1990, 1, 1), phone_number='+254711111111',
+                                     physical_address='Village', field_officer=self.officer)
+
+    def entry(self, member):
+        return ChangeFeedEntry.objects.get(model='member', object_id=member.pk)
+
+    def settle(self, *members):
+        settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS + 1)
+        ChangeFeedEntry.objects.filter(model='member', object_id__in=[member.pk for member in members]) \
+            .update(changed_at=settled)
+
+    def test_recent_changes_are_served_without_moving_the_cursor(self):
+        since = get_changes('Central')['cursor']
+        member = self.add_member('Wanjiru')
+
+        changes = get_changes('Central', since=since)
+        self.assertEqual([row['id'] for row in changes['changes']['member']['upserts']], [member.pk])
+        self.assertEqual(changes['cursor'], since)
+
+        self.settle(member)
+        self.assertEqual(get_changes('Central', since=since)['cursor'], self.entry(member).pk)
+
+    def test_an_entry_committed_out_of_order_is_not_skipped(self):
+        since = get_changes('Central')['cursor']
+        first, second = self.add_member('Akinyi'), self.add_member('Njeri')
+        # The first entry's transaction committed late: the second was visible and settled before it
+        self.settle(second)
+
+        changes = get_changes('Central', since=since)
+        self.assertEqual(changes['cursor'], since)
+        self.assertEqual({row['id'] for row in changes['changes']['member']['upserts']}, {first.pk, second.pk})
+
+        self.settle(first)
+        self.assertEqual(get_changes('Central', since=since)['cursor'], self.entry(second).pk)
+
+    def test_paging_stops_at_unsettled_entries(self):
+        since = get_changes('Central')['cursor']
+        members = [self.add_member(name) for name in ('Amina', 'Bahati', 'Chausiku')]
+        self.settle(*members[:2])
+
+        page = get_changes('Central', since=since, limit=1)
+        self.assertEqual((page['cursor'], page['has_more']), (self.entry(members[0]).pk, True))
+        page = get_changes('Central', since=page['cursor'], limit=1)
+        self.assertEqual((page['cursor'], page['has_more']), (self.entry(members[1]).pk, True))
+        page = get_changes('Central', since=page['cursor'], limit=1)
+        self.assertEqual((page['cursor'], page['has_more']), (self.entry(members[1]).pk, False))
+
+
+class EligibilityTests(GroupTestCase):
+    """Profiles follow savings, loans and memberships; product rules are checked against them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.savings = SavingsProduct.objects.create(name='Savings', code='SV', description='', interest_rate=0,
+                                                    minimum_deposit=0)
+        cls.loan_product = LoanProduct.objects.create(
+            name='Biashara', code='BL', description='', interest_rate=12, minimum_amount=1000,
+            maximum_amount=50000, minimum_term=1, maximum_term=12, min_saving_percentage=25,
+            individual_eligible=False, late_payment_fee=100,
+        )
+        cls.financial_product = FinancialProduct.objects.create(
+            name='Asset finance', product_type='LOAN', code='AF', description='', terms_and_conditions='',
+            launch_date=date(2020, 1, 1), interest_rate=10, minimum_amount=500, minimum_membership_months=24,
+        )
+        cls.saver, cls.newcomer = [
+            Member.objects.create(first_name=name, last_name='Wanjiru', id_number=f'E-{name}', gender='F',
+                                  date_of_birth=date(1990, 1, 1), phone_number='+254700000000',
+                                  physical_address='Village')
+            for name in ('Saver', 'Newcomer')
+        ]
+        GroupMembership.objects.create(member=cls.saver, group=cls.group, join_date=date(2020, 1, 15))
+        GroupMembership.objects.create(member=cls.newcomer, group=cls.group, join_date=timezone.localdate())
+        cls.account = IndividualSavingsAccount.objects.create(member=cls.saver, product=cls.savings,
+                                                              account_number='E-S-1')
+        Transaction.objects.create(transaction_type='DEPOSIT', amount=Decimal('1500'), reference_number='E-D-1',
+                                   individual_savings_account=cls.account)
+
+    def profile(self, member):
+        return MemberFinancialProfile.objects.get(member=member)
+
+    def test_profile_follows_savings_loans_and_repayments(self):
+        profile = self.profile(self.saver)
+        self.assertEqual(profile.total_savings, Decimal('1500'))
+        self.assertEqual(profile.member_since, date(2020, 1, 15))
+
+        # 1200 over 3 months at 12% flat: installments of 412, the first due next month
+        loan = Loan.objects.create(loan_product=self.loan_product, loan_number='E-L-1', member=self.saver,
+                                   principal_amount=1200, interest_rate=12, term_months=3, status='DISBURSED',
+                                   disbursement_date=timezone.localdate())
+        profile = self.profile(self.saver)
+        self.assertEqual((profile.outstanding_loan_balance, profile.active_loans), (Decimal('1236'), 1))
+        self.assertIsNone(profile.repayment_score())
+
+        LoanRepayment.objects.create(loan=loan, amount=Decimal('412'), reference_number='E-R-1')
+        profile = self.profile(self.saver)
+        self.assertEqual(profile.outstanding_loan_balance, Decimal('824'))
+        self.assertEqual((profile.installments_on_time, profile.repayment_score()), (1, Decimal('100.00')))
+
+        # Once the second installment is overdue it counts against the score, late fee or not
+        later = timezone.localdate() + timedelta(days=70)
+        self.assertEqual((profile.installments_overdue(later), profile.repayment_score(later)),
+                         (1, Decimal('50.00')))
+        self.assertEqual(profile_summary(profile, later)['installments_overdue'], 1)
+
+        # Paying it after the due date keeps it late
+        LoanInstallment.objects.filter(loan=loan, installment_number=2).update(paid_date=later)
+        refresh_profiles([self.saver.pk])
+        profile = self.profile(self.saver)
+        self.assertEqual((profile.installments_paid_late, profile.installments_overdue(later)), (1, 0))
+        self.assertEqual(profile.repayment_score(later), Decimal('50.00'))
+
+    def test_loan_product_rules(self):
+        results = check_members(self.loan_product, [self.saver.pk], Decimal('8000'))
+        self.assertFalse(results[self.saver.pk]['eligible'])
+        self.assertEqual(len(results[self.saver.pk]['reasons']), 2)
+
+        results = check_group(self.loan_product, self.group, Decimal('6000'))
+        self.assertTrue(results[self.saver.pk]['eligible'])
+        self.assertEqual(results[self.saver.pk]['max_amount'], Decimal('6000.00'))
+        self.assertFalse(results[self.newcomer.pk]['eligible'])
+        self.assertEqual(results[self.newcomer.pk]['profile']['total_savings'], Decimal('0'))
+
+    def test_membership_tenure_rule(self):
+        results = check_group(self.financial_product, self.group, Decimal('1000'))
+        self.assertTrue(results[self.saver.pk]['eligible'])
+        self.assertEqual(results[self.newcomer.pk]['reasons'], ["Needs 24 months of membership; has 0."])
+
+    def test_group_check_reads_only_cached_profiles(self):
+        check_group(self.loan_product, self.group)
+        with self.assertNumQueries(2):
+            check_group(self.loan_product, self.group, Decimal('2000'))
+
+    def test_deleting_a_member_removes_the_profile(self):
+        self.saver.delete()
+        self.assertFalse(MemberFinancialProfile.objects.filter(member_id=self.saver.pk).exists())
+
+    def test_eligibility_view(self):
+        self.client.force_login(self.user)
+        url = reverse('dashboard:eligibility_check')
+        response = self.client.get(url, {'loan_product': self.loan_product.pk, 'group': self.group.pk,
+                                         'amount': '6000'})
+        self.assertEqual(response.status_code, 200)
+        results = {row['member']: row for row in response.json()['results']}
+        self.assertTrue(results[self.saver.pk]['eligible'])
+        self.assertEqual(results[self.saver.pk]['profile']['total_savings'], '1500.00')
+
+        self.assertEqual(self.client.get(url, {'loan_product': self.loan_product.pk}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'loan_product': 'x', 'member': self.saver.pk}).status_code, 400)
+
+
+@override_settings(TEMPLATES=TEST_TEMPLATES)
+class CalendarCacheTests(GroupTestCase):
+    """Cached months and the calendar's ETag follow a meetings version every process shares."""
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def get_calendar(self, **headers):
+        return self.client.get(reverse('dashboard:meeting_calendar'), headers=headers)
+
+    def add_meeting(self, title):
+        return Meeting.objects.create(title=title, location='Hall', group=self.group, organizer=self.user,
+                                      scheduled_date=timezone.localdate(), start_time=time(14), end_time=time(16))
+
+    def test_unchanged_month_is_not_modified(self):
+        self.add_meeting('Savings day')
+        response = self.get_calendar()
+        self.assertContains(response, 'Savings day')
+
+        response = self.get_calendar(if_none_match=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_a_meeting_change_changes_the_etag(self):
+        self.add_meeting('Savings day')
+        etag = self.get_calendar()['ETag']
+
+        self.add_meeting('Loan review')
+        response = self.get_calendar(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Loan review')
+
+    def test_version_is_shared_through_the_database(self):
+        self.add_meeting('Savings day')
+        version = meetings_version()
+        response = self.get_calendar()
+        self.assertContains(response, 'Savings day')
+
+        # Another worker saves a meeting: its bump reaches this process, whose
+        # cache still holds the old month
+        Meeting.objects.filter(title='Savings day').update(title='Harvest day')
+        CacheVersion.objects.filter(key=MEETINGS_VERSION_KEY).update(version=F('version') + 1)
+        self.assertEqual(meetings_version(), version + 1)
+        response = self.get_calendar(if_none_match=response['ETag'])
+        self.assertContains(response, 'Harvest day')
+
+        # Losing the cache does not reset the version
+        cache.clear()
+        self.assertEqual(meetings_version(), version + 1)
+
+
+class RecurrenceTests(GroupTestCase):
+    """Series dates are written up to the horizon and only computed beyond it."""
+
+    def add_series(self, recurrence='DAILY', **fields):
+        return Meeting.objects.create(
+            title='Weekly savings', location='Hall', group=self.group, organizer=self.user,
+            scheduled_date=timezone.localdate(), start_time=time(14), end_time=time(16), recurrence=recurrence,
+            **fields,
+        )
+
+    def test_far_future_months_are_computed_not_written(self):
+        root = self.add_series()
+        written = MeetingOccurrence.objects.count()
+        last_written = timezone.localdate() + HORIZON
+
+        entries = occurrences_between(date(2100, 1, 1), date(2100, 1, 31))
+        self.assertEqual([entry.date for entry in entries], [date(2100, 1, day) for day in range(1, 32)])
+        self.assertTrue(all(entry.pk is None and entry.display_meeting == root for entry in entries))
+        self.assertEqual(MeetingOccurrence.objects.count(), written)
+        self.assertFalse(MeetingOccurrence.objects.filter(date__gt=last_written).exists())
+
+    def test_range_across_the_horizon_has_no_gaps_or_repeats(self):
+        self.add_series()
+        last_written = timezone.localdate() + HORIZON
+
+        entries = occurrences_between(last_written - timedelta(days=2), last_written + timedelta(days=2))
+        self.assertEqual([entry.date for entry in entries],
+                         [last_written + timedelta(days=offset) for offset in range(-2, 3)])
+        self.assertEqual([entry.pk is None for entry in entries], [False, False, False, True, True])
+
+    def test_group_filter_applies_to_computed_dates(self):
+        self.add_series()
+        other = Group.objects.create(name='Other', registration_number='G-2', formation_date=date(2020, 1, 1),
+                                     meeting_schedule='Fridays', meeting_location='Market')
+
+        self.assertEqual(len(occurrences_between(date(2100, 1, 1), date(2100, 1, 7), [self.group.pk])), 7)
+        self.assertEqual(occurrences_between(date(2100, 1, 1), date(2100, 1, 7), [other.pk]), [])
+
+    def test_cancelled_series_stops_producing_dates(self):
+        root = self.add_series()
+        root.status = 'CANCELLED'
+        root.save()
+        today = timezone.localdate()
+
+        entries = occurrences_between(today, today + timedelta(days=7))
+        self.assertEqual([entry.display_meeting for entry in entries], [root])
+        self.assertEqual(occurrences_between(date(2100, 1, 1), date(2100, 1, 31)), [])
+
+    def calendar(self):
+        return sorted(MeetingOccurrence.objects.values_list('meeting_id', 'series__root_id', 'original_date', 'date',
+                                                            'is_exception'),
+                      key=lambda row: (row[3], row[2]))
+
+    def test_existing_meetings_are_backfilled_as_saving_would(self):
+        root = self.add_series('WEEKLY')
+        root.reschedule(root.scheduled_date + timedelta(days=2), reason='Holiday')
+        self.add_series('NONE', agenda='One-off')
+        expected = self.calendar()
+        next_dates = dict(Meeting.objects.values_list('pk', 'next_meeting_date'))
+
+        MeetingOccurrence.objects.all().delete()
+        MeetingSeries.objects.all().delete()
+        Meeting.objects.update(next_meeting_date=None)
+        backfill = importlib.import_module('dashboard.migrations.0013_backfill_meeting_occurrences')
+        backfill.build_occurrences(django_apps, None)
+
+        self.assertEqual(self.calendar(), expected)
+        self.assertEqual(dict(Meeting.objects.values_list('pk', 'next_meeting_date')), next_dates)
+
+        # Running it again adds nothing
+        backfill.build_occurrences(django_apps, None)
+        self.assertEqual(self.calendar(), expected)
+
+    def test_command_refuses_a_bad_date(self):
+        with self.assertRaises(CommandError):
+            call_command('build_meeting_occurrences', '--until', '2024-13-01', stdout=StringIO())
+
+
+class MeetingCloneTests(GroupTestCase):
+    """Copies take the meeting's participants and agenda with a fixed number of queries."""
+
+    def add_meeting(self, attendees):
+        meeting = Meeting.objects.create(title='Savings day', location='Hall', group=self.group, organizer=self.user,
+                                         scheduled_date=date(2024, 1, 1), start_time=time(14), end_time=time(16))
+        meeting.field_officers.add(self.officer)
+        for _ in range(attendees):
+            type(self).sequence += 1
+            meeting.members.add(Member.objects.create(
+                first_name='Member', last_name=str(self.sequence), id_number=f'C-{self.sequence}', gender='F',
+                date_of_birth=date(1990, 1, 1), phone_number='+254711111111', physical_address='Village',
+            ))
+        for order, title in enumerate(['Contributions', 'Loans']):
+            AgendaItem.objects.create(meeting=meeting, title=title, order=order)
+        return meeting
+
+    def test_copies_take_participants_and_agenda_in_constant_queries(self):
+        dates = series_dates('WEEKLY', date(2024, 2, 5), 4)
+        self.assertEqual(dates, [date(2024, 2, 5), date(2024, 2, 12), date(2024, 2, 19), date(2024, 2, 26)])
+
+        counts = []
+        for attendees in (1, 12):
+            meeting = self.add_meeting(attendees)
+            with CaptureQueriesContext(connection) as queries:
+                clones = clone_meeting(meeting, dates, start_time=time(9))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+        self.assertEqual([clone.scheduled_date for clone in clones], dates)
+        for clone in clones:
+            self.assertEqual((clone.start_time, clone.end_time, clone.status), (time(9), time(16), 'SCHEDULED'))
+            self.assertEqual(clone.members.count(), 12)
+            self.assertEqual(list(clone.field_officers.all()), [self.officer])
+            self.assertEqual(list(clone.agenda_items.order_by('order').values_list('title', flat=True)),
+                             ['Contributions', 'Loans'])
+        self.assertEqual(MeetingOccurrence.objects.filter(meeting__in=clones).count(), 4)
+        self.assertEqual(Meeting.objects.filter(pk__in=matching_ids('meeting', 'savings day')).count(), 10)
+
+    def test_clone_limits(self):
+        meeting = self.add_meeting(1)
+        with self.assertRaises(ValueError):
+            clone_meeting(meeting, [])
+        with self.assertRaises(ValueError):
+            clone_meeting(meeting, [date(2024, 1, 1) + timedelta(days=day) for day in range(MAX_CLONES + 1)])
+
+    def test_reschedule_copies_participants(self):
+        meeting = self.add_meeting(3)
+        moved = meeting.reschedule(date(2024, 1, 8), reason='Public holiday')
+        meeting.refresh_from_db()
+        self.assertEqual(meeting.status, 'RESCHEDULED')
+        self.assertEqual((moved.previous_meeting, moved.members.count(), moved.agenda_items.count()),
+                         (meeting, 3, 2))
+
+    def test_clone_view_copies_a_series(self):
+        meeting = self.add_meeting(2)
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('dashboard:meeting_clone', args=[meeting.pk]),
+                                    {'recurrence': 'MONTHLY', 'first_date': '2024-02-01', 'count': 3})
+        self.assertRedirects(response, reverse('dashboard:meeting_list'), fetch_redirect_response=False)
+        self.assertEqual(list(Meeting.objects.exclude(pk=meeting.pk).values_list('scheduled_date', flat=True)
+                              .order_by('scheduled_date')),
+                         [date(2024, 2, 1), date(2024, 3, 1), date(2024, 4, 1)])
+
+
+class RecordingBackend(BaseReminderBackend):
+    """Keep each batch handed over instead of sending it."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def send_messages(self, reminders):
+        self.batches.append(list(reminders))
+        return len(reminders)
+
+
+class ReminderTests(GroupTestCase):
+    """Due meetings get one reminder per phone number, in batches, and are flagged so re-runs send nothing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.today = date(2024, 3, 4)
+        cls.members = []
+        for index, active in enumerate([True, True, False]):
+            member = Member.objects.create(
+                first_name='Member', last_name=str(index), id_number=f'R-{index}', gender='F',
+                date_of_birth=date(1990, 1, 1), phone_number=f'+25472000000{index}', physical_address='Village',
+                is_active=active,
+            )
+            GroupMembership.objects.create(member=member, group=cls.group, join_date=date(2020, 1, 1))
+            cls.members.append(member)
+        cls.guest = Member.objects.create(
+            first_name='Guest', last_name='Speaker', id_number='R-G', gender='F', date_of_birth=date(1990, 1, 1),
+            phone_number='+254729999999', physical_address='Town',
+        )
+
+    def add_meeting(self, days, status='SCHEDULED', reminder_sent=False, group=True):
+        meeting = Meeting.objects.create(
+            title='Savings day', location='Hall', group=self.group if group else None, organizer=self.user,
+            scheduled_date=self.today + timedelta(days=days), start_time=time(14), end_time=time(16),
+            status=status, reminder_sent=reminder_sent,
+        )
+        meeting.members.add(self.members[0], self.members[2], self.guest)
+        meeting.field_officers.add(self.officer)
+        return meeting
+
+    def dispatch(self, **kwargs):
+        backend = RecordingBackend()
+        counts = dispatch_reminders(backend, today=self.today, **kwargs)
+        return counts, [reminder for batch in backend.batches for reminder in batch]
+
+    def test_due_meetings_remind_each_phone_number_once(self):
+        due = self.add_meeting(1)
+        self.add_meeting(0, status='COMPLETED')
+        self.add_meeting(1, reminder_sent=True)
+        self.add_meeting(-1)
+        self.add_meeting(3)
+
+        with self.assertNumQueries(DISPATCH_QUERIES):
+            counts, reminders = self.dispatch()
+        self.assertEqual(counts, (1, 4))
+        self.assertEqual({reminder.meeting_id for reminder in reminders}, {due.pk})
+        self.assertEqual(sorted(reminder.phone_number for reminder in reminders),
+                         ['+254700000000', '+254720000000', '+254720000001', '+254729999999'])
+        self.assertEqual(reminders[0].text, 'Reminder: Savings day on Tue 05 Mar at 14:00, Hall.')
+
+        due.refresh_from_db()
+        self.assertTrue(due.reminder_sent)
+        self.assertEqual(self.dispatch(), ((0, 0), []))
+
+    def test_recipients_for_many_meetings_take_the_same_queries(self):
+        for days in range(2):
+            self.add_meeting(days)
+        # Invited guests and officers only
+        self.add_meeting(1, group=False)
+        with self.assertNumQueries(DISPATCH_QUERIES):
+            counts, reminders = self.dispatch()
+        self.assertEqual(counts, (3, 11))
+        self.assertFalse(Meeting.objects.filter(reminder_sent=False).exists())
+
+    def test_dry_run_flags_nothing(self):
+        self.add_meeting(1)
+        self.assertEqual(self.dispatch(dry_run=True), ((1, 4), []))
+        self.assertFalse(Meeting.objects.filter(reminder_sent=True).exists())
+
+    def test_batches_stay_under_the_rate_limit(self):
+        backend = RecordingBackend(batch_size=2, rate_limit=1)
+        pauses = []
+        self.assertEqual(deliver(backend, list(range(5)), sleep=pauses.append), 5)
+        self.assertEqual([len(batch) for batch in backend.batches], [2, 2, 1])
+        for pause, expected in zip(pauses, [2, 4, 5]):
+            self.assertAlmostEqual(pause, expected, places=1)
+
+    def test_backends_come_from_settings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'reminders.log')
+            backends = {'file': {'BACKEND': 'dashboard.reminders.FileBackend', 'BATCH_SIZE': 2,
+                                 'OPTIONS': {'PATH': path}}}
+            with override_settings(REMINDER_BACKENDS=backends):
+                backend = get_backend('file')
+                self.assertEqual((backend.batch_size, backend.rate_limit), (2, None))
+                self.add_meeting(1)
+                self.assertEqual(dispatch_reminders(backend, today=self.today), (1, 4))
+                with self.assertRaises(ValueError):
+                    get_backend('sms')
+            with open(path, encoding='utf-8') as log:
+                self.assertEqual(len(log.readlines()), 4)
+
+    def test_command_reports_counts(self):
+        self.today = timezone.localdate()
+        self.add_meeting(1)
+        out = StringIO()
+        call_command('send_meeting_reminders', '--dry-run', stdout=out)
+        self.assertIn('Would send 4 reminder(s) for 1 meeting(s).', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('send_meeting_reminders', '--backend', 'sms', stdout=StringIO())
@@ -15,7 +15,11 @@ urlpatterns = [
     path('meetings/<int:meeting_id>/edit/', views.meeting_edit, name='meeting_edit'),
     path('meetings/<int:meeting_id>/delete/', views.meeting_delete, name='meeting_delete'),
     path('meetings/<int:meeting_id>/reschedule/', views.meeting_reschedule, name='meeting_reschedule'),
+    path('meetings/<int:meeting_id>/clone/', views.meeting_clone, name='meeting_clone'),
     path('meetings/<int:meeting_id>/attendance/', views.meeting_attendance, name='meeting_attendance'),
+    path('participants/search/', views.participant_search, name='participant_search'),
+    path('search/', views.global_search, name='search'),
+    path('eligibility/', views.eligibility_check, name='eligibility_check'),
     path('meetings/<int:meeting_id>/remove-attachment/<int:attachment_id>/', views.meeting_remove_attachment, name='meeting_remove_attachment'),
     
     # Settings and system URLs
@@ -0,0 +1,32 @@
+"""
+Shared version counters for cached results.
+
+A cache keyed by a version is retired by bumping the version. Each counter
+is a CacheVersion row, so one bump is seen by every worker process however
+the cache itself is configured, and it is rolled back together with the
+transaction that made the change. Reading a version is one indexed lookup.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CacheVersion
+
+
+def get_version(key):
+    """``(version, changed_at)`` of a counter; ``(1, None)`` before its first bump."""
+    row = CacheVersion.objects.filter(key=key).values_list('version', 'changed_at').first()
+    return row or (1, None)
+
+
+def bump_version(key):
+    """Move a counter on, creating it at 2 on its first bump."""
+    now = timezone.now()
+    if CacheVersion.objects.filter(key=key).update(version=F('version') + 1, changed_at=now):
+        return
+    try:
+        with transaction.atomic():
+            CacheVersion.objects.create(key=key, version=2, changed_at=now)
+    except IntegrityError:
+        # Created by a concurrent first bump; this bump still has to count
+        CacheVersion.objects.filter(key=key).update(version=F('version') + 1, changed_at=now)
@@ -1,27 +1,46 @@
+from django.apps import apps
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.dateparse import parse_time
 from django.http import JsonResponse
-from django.core.paginator import Paginator
-from django.db.models import Q
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
+from django.db.models import Count, Q
 from .models import Meeting, MeetingAttendance
 from .forms import MeetingForm
+from .attendance import save_attendance
+from .changefeed import DEFAULT_PAGE_SIZE, get_changes
+from .cloning import MAX_CLONES, clone_meeting, series_dates
+from .eligibility import check_group, check_members
+from .kpis import get_snapshot
+from .month_calendar import calendar_etag, calendar_scope, get_month, meetings_modified
+from .pagination import InvalidCursor, KeysetPaginator
+from .participants import PAGE_SIZE as PARTICIPANT_PAGE_SIZE, search_participants
+from .search import PAGE_SIZE as SEARCH_PAGE_SIZE, matching_ids, search
+from .sync import MAX_BATCH_SIZE, sync_records
 from user_management.models import Member, Group, FieldOfficer
+from collections import Counter
 from datetime import timedelta, datetime
-import calendar
+from decimal import Decimal, InvalidOperation
+import json
 
 
 @login_required
 def dashboard_index(request):
     """Main dashboard view that displays system overview and statistics."""
-    # In a real application, you would query your database for the following data
+    # Headline figures come from the materialized KPI snapshot (one query)
+    kpi = get_snapshot()
+    total_savings = kpi['individual_savings']['total'] + kpi['group_savings']['total']
+    
     context = {
         'active_menu': 'dashboard',
-        'total_members': 6000,  # Placeholder value
-        'total_groups': 120,    # Placeholder value
-        'active_loans': 450,    # Placeholder value
-        'total_savings': '7,500,000',  # Placeholder value
+        'total_members': kpi['total_members']['count'],
+        'total_groups': kpi['total_groups']['count'],
+        'active_loans': kpi['active_loans']['count'],
+        'total_savings': f"{total_savings:,.0f}",
         
         # Recent loans (sample data)
         'recent_loans': [
@@ -39,11 +58,9 @@ def dashboard_index(request):
             {'date': '2023-05-07', 'member_name': 'Women Empowerment Group', 'amount': '15,000', 'type': 'Loan Repayment'},
         ],
         
-        # Agriculture collection data (sample data)
-        'agriculture_total': '2,500,000',
-        
-        # School fees collection data (sample data)
-        'school_fees_total': '1,800,000',
+        # Booster collection totals
+        'agriculture_total': f"{kpi['agriculture_collections']['total']:,.0f}",
+        'school_fees_total': f"{kpi['school_fees_collections']['total']:,.0f}",
         
         # Upcoming payments (sample data)
         'upcoming_payments': [
@@ -73,6 +90,127 @@ def offline_view(request):
     return render(request, 'offline.html')
 
 
+@login_required
+@require_POST
+def sync_offline_records(request):
+    """Accept a batch of records captured offline and report the outcome of each one."""
+    try:
+        payload = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': "Request body must be valid JSON."}, status=400)
+    
+    records = payload.get('records') if isinstance(payload, dict) else None
+    if not isinstance(records, list):
+        return JsonResponse({'error': "Expected a 'records' list."}, status=400)
+    
+    if len(records) > MAX_BATCH_SIZE:
+        return JsonResponse({'error': f"At most {MAX_BATCH_SIZE} records can be synced per request."},
+                            status=400)
+    
+    # Records without an officer are attributed to the officer uploading them
+    field_officer = FieldOfficer.objects.filter(user=request.user).first()
+    results = sync_records(records, field_officer=field_officer)
+    
+    return JsonResponse({
+        'results': results,
+        'summary': dict(Counter(result['status'] for result in results)),
+    })
+
+
+@login_required
+@require_GET
+@gzip_page
+def change_feed(request):
+    """Page of member, group, loan and savings changes in the officer's area since a cursor."""
+    field_officer = FieldOfficer.objects.filter(user=request.user).first()
+    if field_officer is None:
+        return JsonResponse({'error': "Only field officers can download the change feed."}, status=403)
+    
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': "'since' and 'limit' must be integers."}, status=400)
+    
+    return JsonResponse(get_changes(field_officer.assigned_area, since=since, limit=limit))
+
+
+@login_required
+@require_GET
+def participant_search(request):
+    """Page of members or field officers whose name, ID number or phone starts with ?q= (continue with ?cursor=)."""
+    try:
+        page_size = int(request.GET.get('page_size', PARTICIPANT_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': "'page_size' must be an integer."}, status=400)
+    
+    try:
+        results = search_participants(request.GET.get('kind', 'member'), request.GET.get('q', ''),
+                                      cursor=request.GET.get('cursor') or None, page_size=page_size)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(results)
+
+
+@login_required
+@require_GET
+def global_search(request):
+    """Ranked page of meetings, members, groups and loans matching ?q= (limit with ?type=)."""
+    try:
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', SEARCH_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'error': "'page' and 'page_size' must be integers."}, status=400)
+    
+    try:
+        results = search(request.GET.get('q', ''), types=request.GET.getlist('type'),
+                         page=page, page_size=page_size)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(results)
+
+
+@login_required
+@require_GET
+def eligibility_check(request):
+    """
+    Check a member (?member=) or every member of a group (?group=) against a
+    product (?loan_product= or ?financial_product=), optionally for ?amount=.
+    """
+    products = {
+        'loan_product': 'tablebanking.LoanProduct',
+        'financial_product': 'ukombozini_products.FinancialProduct',
+    }
+    chosen = [param for param in products if request.GET.get(param)]
+    subjects = [param for param in ('member', 'group') if request.GET.get(param)]
+    if len(chosen) != 1 or len(subjects) != 1:
+        return JsonResponse({'error': "Give one of 'loan_product' or 'financial_product' and one of "
+                                      "'member' or 'group'."}, status=400)
+    
+    amount = None
+    try:
+        product_id = int(request.GET[chosen[0]])
+        subject_id = int(request.GET[subjects[0]])
+        if request.GET.get('amount'):
+            amount = Decimal(request.GET['amount'])
+    except (ValueError, InvalidOperation):
+        return JsonResponse({'error': "Ids must be integers and 'amount' a number."}, status=400)
+    
+    product = get_object_or_404(apps.get_model(products[chosen[0]]), pk=product_id)
+    if subjects[0] == 'group':
+        results = check_group(product, get_object_or_404(Group, pk=subject_id), amount)
+    else:
+        results = check_members(product, [get_object_or_404(Member, pk=subject_id).pk], amount)
+    
+    return JsonResponse({
+        'product': {'type': chosen[0], 'id': product.pk, 'name': product.name},
+        'amount': amount,
+        'results': [{'member': member_id, **result} for member_id, result in sorted(results.items())],
+    })
+
+
 # Meeting Views
 @login_required
 def meeting_list(request):
@@ -84,8 +222,8 @@ def meeting_list(request):
     date_to = request.GET.get('date_to', '')
     search_query = request.GET.get('search', '')
     
-    # Start with all meetings
-    meetings = Meeting.objects.all().order_by('-scheduled_date', 'start_time')
+    # Start with all meetings, loading the group and organizer shown on each row
+    meetings = Meeting.objects.select_related('group', 'organizer')
     
     # Apply filters
     if meeting_type:
@@ -109,25 +247,23 @@ def meeting_list(request):
             pass
     
     if search_query:
-        meetings = meetings.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(location__icontains=search_query) |
-            Q(group__name__icontains=search_query)
-        )
-    
-    # Pagination
-    paginator = Paginator(meetings, 10)  # Show 10 meetings per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Get some stats
-    upcoming_count = Meeting.objects.filter(
-        scheduled_date__gte=timezone.now().date(),
-        status='SCHEDULED'
-    ).count()
-    
-    completed_count = Meeting.objects.filter(status='COMPLETED').count()
+        meetings = meetings.filter(pk__in=matching_ids('meeting', search_query))
+    
+    # Stats in one conditional aggregate
+    stats = Meeting.objects.aggregate(
+        upcoming=Count('pk', filter=Q(scheduled_date__gte=timezone.now().date(), status='SCHEDULED')),
+        completed=Count('pk', filter=Q(status='COMPLETED')),
+    )
+    
+    # Keyset pagination: ?cursor= seeks straight to a page, however deep it is
+    paginator = KeysetPaginator(meetings, Meeting.LIST_ORDERING, per_page=10)
+    try:
+        page_obj = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        page_obj = paginator.page()
+    
+    upcoming_count = stats['upcoming']
+    completed_count = stats['completed']
     
     context = {
         'page_obj': page_obj,
@@ -149,21 +285,19 @@ def meeting_list(request):
 @login_required
 def meeting_detail(request, meeting_id):
     """View details of a specific meeting."""
-    meeting = get_object_or_404(Meeting, id=meeting_id)
+    meeting = get_object_or_404(
+        Meeting.objects.select_related('group', 'organizer')
+        .prefetch_related('members', 'field_officers__user', 'agenda_items'),
+        id=meeting_id,
+    )
     
-    # Get attendance records for this meeting
-    attendance_records = MeetingAttendance.objects.filter(meeting=meeting)
+    # Get attendance records for this meeting, with the people they name
+    attendance_records = (MeetingAttendance.objects.filter(meeting=meeting)
+                          .select_related('meeting', 'member', 'field_officer__user', 'recorded_by'))
     
     # Check if the current user is the organizer or a field officer assigned to this meeting
-    is_organizer = (meeting.organizer == request.user)
-    is_assigned = False
-    
-    # Try to get the field officer associated with the current user
-    try:
-        field_officer = FieldOfficer.objects.get(user=request.user)
-        is_assigned = field_officer in meeting.field_officers.all()
-    except FieldOfficer.DoesNotExist:
-        field_officer = None
+    is_organizer = (meeting.organizer_id == request.user.id)
+    is_assigned = meeting.field_officers.filter(user=request.user).exists()
     
     can_edit = is_organizer or is_assigned
     
@@ -200,41 +334,6 @@ def meeting_create(request):
                 meeting.group = form.cleaned_data['group']
                 meeting.save()
             
-            # Set next meeting date if recurrence is set
-            if meeting.recurrence != 'NONE':
-                next_date = meeting.scheduled_date
-                if meeting.recurrence == 'DAILY':
-                    next_date += timedelta(days=1)
-                elif meeting.recurrence == 'WEEKLY':
-                    next_date += timedelta(weeks=1)
-                elif meeting.recurrence == 'BIWEEKLY':
-                    next_date += timedelta(weeks=2)
-                elif meeting.recurrence == 'MONTHLY':
-                    # Add one month (handle month transitions)
-                    month = next_date.month + 1
-                    year = next_date.year
-                    if month > 12:
-                        month = 1
-                        year += 1
-                    # Ensure we don't exceed the number of days in the month
-                    last_day = calendar.monthrange(year, month)[1]
-                    day = min(next_date.day, last_day)
-                    next_date = next_date.replace(year=year, month=month, day=day)
-                elif meeting.recurrence == 'QUARTERLY':
-                    # Add three months
-                    month = next_date.month + 3
-                    year = next_date.year
-                    if month > 12:
-                        month = month - 12
-                        year += 1
-                    # Ensure we don't exceed the number of days in the month
-                    last_day = calendar.monthrange(year, month)[1]
-                    day = min(next_date.day, last_day)
-                    next_date = next_date.replace(year=year, month=month, day=day)
-                
-                meeting.next_meeting_date = next_date
-                meeting.save()
-            
             messages.success(request, f"Meeting '{meeting.title}' created successfully.")
             return redirect('dashboard:meeting_detail', meeting_id=meeting.id)
     else:
@@ -290,44 +389,6 @@ def meeting_edit(request, meeting_id):
             
             meeting.save()
             
-            # Update next meeting date if recurrence is set
-            if meeting.recurrence != 'NONE':
-                next_date = meeting.scheduled_date
-                if meeting.recurrence == 'DAILY':
-                    next_date += timedelta(days=1)
-                elif meeting.recurrence == 'WEEKLY':
-                    next_date += timedelta(weeks=1)
-                elif meeting.recurrence == 'BIWEEKLY':
-                    next_date += timedelta(weeks=2)
-                elif meeting.recurrence == 'MONTHLY':
-                    # Add one month (handle month transitions)
-                    month = next_date.month + 1
-                    year = next_date.year
-                    if month > 12:
-                        month = 1
-                        year += 1
-                    # Ensure we don't exceed the number of days in the month
-                    last_day = calendar.monthrange(year, month)[1]
-                    day = min(next_date.day, last_day)
-                    next_date = next_date.replace(year=year, month=month, day=day)
-                elif meeting.recurrence == 'QUARTERLY':
-                    # Add three months
-                    month = next_date.month + 3
-                    year = next_date.year
-                    if month > 12:
-                        month = month - 12
-                        year += 1
-                    # Ensure we don't exceed the number of days in the month
-                    last_day = calendar.monthrange(year, month)[1]
-                    day = min(next_date.day, last_day)
-                    next_date = next_date.replace(year=year, month=month, day=day)
-                
-                meeting.next_meeting_date = next_date
-            else:
-                meeting.next_meeting_date = None
-            
-            meeting.save()
-            
             messages.success(request, f"Meeting '{meeting.title}' updated successfully.")
             return redirect('dashboard:meeting_detail', meeting_id=meeting.id)
     else:
@@ -428,91 +489,75 @@ def meeting_reschedule(request, meeting_id):
     return render(request, 'dashboard/meeting_reschedule.html', context)
 
 
+@login_required
+@require_POST
+def meeting_clone(request, meeting_id):
+    """Copy a meeting, its participants and agenda onto several future dates."""
+    meeting = get_object_or_404(Meeting, id=meeting_id)
+    
+    if meeting.organizer_id != request.user.id and not meeting.field_officers.filter(user=request.user).exists():
+        messages.error(request, "You don't have permission to copy this meeting.")
+        return redirect('dashboard:meeting_detail', meeting_id=meeting.id)
+    
+    # Either explicit dates, or a recurrence with a first date and a count
+    try:
+        if request.POST.get('recurrence'):
+            first_date = datetime.strptime(request.POST.get('first_date', ''), '%Y-%m-%d').date()
+            count = int(request.POST.get('count', ''))
+            if not 0 < count <= MAX_CLONES:
+                raise ValueError(f"Count must be between 1 and {MAX_CLONES}.")
+            dates = series_dates(request.POST['recurrence'], first_date, count)
+        else:
+            dates = [datetime.strptime(value, '%Y-%m-%d').date() for value in request.POST.getlist('dates')]
+        start_time = parse_time(request.POST.get('start_time') or '') or None
+        end_time = parse_time(request.POST.get('end_time') or '') or None
+        clones = clone_meeting(meeting, dates, start_time, end_time)
+    except ValueError as e:
+        messages.error(request, f"Error copying meeting: {str(e)}")
+        return redirect('dashboard:meeting_detail', meeting_id=meeting.id)
+    
+    messages.success(request, f"Meeting copied to {len(clones)} date(s), {clones[0].scheduled_date} to "
+                              f"{clones[-1].scheduled_date}.")
+    return redirect('dashboard:meeting_list')
+
+
 @login_required
 def meeting_attendance(request, meeting_id):
     """Take or view attendance for a meeting."""
     meeting = get_object_or_404(Meeting, id=meeting_id)
     
     # Check if user has permission to manage attendance
-    if meeting.organizer != request.user:
-        try:
-            officer = FieldOfficer.objects.get(user=request.user)
-            if officer not in meeting.field_officers.all():
-                messages.error(request, "You don't have permission to manage attendance for this meeting.")
-                return redirect('dashboard:meeting_detail', meeting_id=meeting.id)
-        except FieldOfficer.DoesNotExist:
-            messages.error(request, "You don't have permission to manage attendance for this meeting.")
-            return redirect('dashboard:meeting_detail', meeting_id=meeting.id)
+    if not _can_manage_attendance(meeting, request.user):
+        messages.error(request, "You don't have permission to manage attendance for this meeting.")
+        return redirect('dashboard:meeting_detail', meeting_id=meeting.id)
     
     # Get all members and field officers associated with this meeting
     members = meeting.members.all()
     officers = meeting.field_officers.all()
     
-    # Get existing attendance records
-    attendance_records = MeetingAttendance.objects.filter(meeting=meeting)
-    
-    # Map of attendee ID to attendance record
-    member_attendance = {record.member_id: record for record in attendance_records if record.member}
-    officer_attendance = {record.field_officer_id: record for record in attendance_records if record.field_officer}
-    
     if request.method == 'POST':
         # Process attendance form submission
         present_members = request.POST.getlist('present_members')
         present_officers = request.POST.getlist('present_officers')
         
-        # Record attendance for members
-        for member in members:
-            is_present = str(member.id) in present_members
-            arrival_time = request.POST.get(f'arrival_time_member_{member.id}', None)
-            departure_time = request.POST.get(f'departure_time_member_{member.id}', None)
-            notes = request.POST.get(f'notes_member_{member.id}', '')
-            
-            # Update or create attendance record
-            if member.id in member_attendance:
-                record = member_attendance[member.id]
-                record.is_present = is_present
-                record.arrival_time = arrival_time if arrival_time else None
-                record.departure_time = departure_time if departure_time else None
-                record.notes = notes
-                record.recorded_by = request.user
-                record.save()
-            else:
-                MeetingAttendance.objects.create(
-                    meeting=meeting,
-                    member=member,
-                    is_present=is_present,
-                    arrival_time=arrival_time if arrival_time else None,
-                    departure_time=departure_time if departure_time else None,
-                    notes=notes,
-                    recorded_by=request.user
-                )
+        # One entry per invited member and officer, written in a single batch
+        entries = []
+        for kind, attendees, present, prefix in (('member', members, present_members, 'member'),
+                                                 ('field_officer', officers, present_officers, 'officer')):
+            for attendee in attendees:
+                entries.append({
+                    kind: attendee.id,
+                    'is_present': str(attendee.id) in present,
+                    'arrival_time': request.POST.get(f'arrival_time_{prefix}_{attendee.id}'),
+                    'departure_time': request.POST.get(f'departure_time_{prefix}_{attendee.id}'),
+                    'notes': request.POST.get(f'notes_{prefix}_{attendee.id}', ''),
+                })
         
-        # Record attendance for officers
-        for officer in officers:
-            is_present = str(officer.id) in present_officers
-            arrival_time = request.POST.get(f'arrival_time_officer_{officer.id}', None)
-            departure_time = request.POST.get(f'departure_time_officer_{officer.id}', None)
-            notes = request.POST.get(f'notes_officer_{officer.id}', '')
-            
-            # Update or create attendance record
-            if officer.id in officer_attendance:
-                record = officer_attendance[officer.id]
-                record.is_present = is_present
-                record.arrival_time = arrival_time if arrival_time else None
-                record.departure_time = departure_time if departure_time else None
-                record.notes = notes
-                record.recorded_by = request.user
-                record.save()
-            else:
-                MeetingAttendance.objects.create(
-                    meeting=meeting,
-                    field_officer=officer,
-                    is_present=is_present,
-                    arrival_time=arrival_time if arrival_time else None,
-                    departure_time=departure_time if departure_time else None,
-                    notes=notes,
-                    recorded_by=request.user
-                )
+        try:
+            save_attendance(meeting, entries, recorded_by=request.user)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('dashboard:meeting_attendance', meeting_id=meeting.id)
         
         # If the meeting is not yet marked as completed, ask if it should be
         if meeting.status == 'SCHEDULED':
@@ -528,6 +573,12 @@ def meeting_attendance(request, meeting_id):
         
         return redirect('dashboard:meeting_detail', meeting_id=meeting.id)
     
+    # Map of attendee ID to attendance record
+    attendance_records = MeetingAttendance.objects.filter(meeting=meeting)
+    member_attendance = {record.member_id: record for record in attendance_records if record.member_id}
+    officer_attendance = {record.field_officer_id: record for record in attendance_records
+                          if record.field_officer_id}
+    
     context = {
         'meeting': meeting,
         'members': members,
@@ -540,69 +591,78 @@ def meeting_attendance(request, meeting_id):
     return render(request, 'dashboard/meeting_attendance.html', context)
 
 
+def _can_manage_attendance(meeting, user):
+    """The organizer and the meeting's field officers may record attendance."""
+    return meeting.organizer_id == user.id or meeting.field_officers.filter(user=user).exists()
+
+
 @login_required
-def calendar_view(request):
-    """View meetings in a calendar format."""
+@require_POST
+def sync_meeting_attendance(request):
+    """Save attendance posted as JSON, e.g. a register captured offline by the PWA."""
+    try:
+        payload = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': "Request body must be valid JSON."}, status=400)
+    
+    if not isinstance(payload, dict) or not isinstance(payload.get('attendance'), list):
+        return JsonResponse({'error': "Expected a 'meeting' id and an 'attendance' list."}, status=400)
+    
+    try:
+        meeting = Meeting.objects.get(pk=int(payload.get('meeting')))
+    except (TypeError, ValueError, Meeting.DoesNotExist):
+        return JsonResponse({'error': "Meeting not found."}, status=404)
+    if not _can_manage_attendance(meeting, request.user):
+        return JsonResponse({'error': "You don't have permission to manage attendance for this meeting."},
+                            status=403)
+    
+    try:
+        saved = save_attendance(meeting, payload['attendance'], recorded_by=request.user)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    if payload.get('mark_completed') and meeting.status == 'SCHEDULED':
+        meeting.status = 'COMPLETED'
+        meeting.save()
+    
+    return JsonResponse({'meeting': meeting.id, 'saved': saved, 'status': meeting.status})
+
+
+def _calendar_request(request):
     # Get the month and year from the query parameters or use current month/year
-    now = timezone.now()
+    now = timezone.localtime()
     year = int(request.GET.get('year', now.year))
     month = int(request.GET.get('month', now.month))
+    scope, groups = calendar_scope(request.user, request.GET)
+    return year, month, scope, groups, now.date()
+
+
+def _calendar_etag(request):
+    year, month, scope, _, today = _calendar_request(request)
+    return calendar_etag(year, month, scope, request.user, today)
+
+
+def _calendar_last_modified(request):
+    # Today's highlight moves at midnight even when no meeting changes
+    modified = meetings_modified()
+    midnight = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(modified, midnight) if modified else None
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_calendar_etag, last_modified_func=_calendar_last_modified)
+def calendar_view(request):
+    """View meetings in a calendar format."""
+    year, month, scope, groups, today = _calendar_request(request)
     
-    # Get all meetings for the selected month
-    start_date = datetime(year, month, 1).date()
-    
-    # Get the last day of the month
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-    else:
-        end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
-    
-    # Get meetings for the selected month
-    meetings = Meeting.objects.filter(
-        scheduled_date__gte=start_date,
-        scheduled_date__lte=end_date
-    ).order_by('scheduled_date', 'start_time')
-    
-    # Group meetings by date
-    meeting_days = {}
-    for meeting in meetings:
-        day = meeting.scheduled_date.day
-        if day not in meeting_days:
-            meeting_days[day] = []
-        meeting_days[day].append(meeting)
-    
-    # Get the calendar for the selected month
-    cal = calendar.monthcalendar(year, month)
-    
-    # Get month name
-    month_name = calendar.month_name[month]
-    
-    # Get previous and next month/year
-    prev_month = month - 1
-    prev_year = year
-    if prev_month == 0:
-        prev_month = 12
-        prev_year = year - 1
-    
-    next_month = month + 1
-    next_year = year
-    if next_month == 13:
-        next_month = 1
-        next_year = year + 1
-    
-    context = {
-        'calendar': cal,
-        'month': month,
-        'month_name': month_name,
-        'year': year,
-        'prev_month': prev_month,
-        'prev_year': prev_year,
-        'next_month': next_month,
-        'next_year': next_year,
-        'meeting_days': meeting_days,
+    # The month grid, with its meetings grouped by day, comes from the cache
+    # until a meeting changes
+    context = dict(get_month(year, month, scope, groups))
+    context.update({
         'active_menu': 'meeting_calendar',
-        'today': now.date(),
-    }
+        'today': today,
+    })
     
     return render(request, 'dashboard/calendar.html', context)
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Report, SavedQuery, ReportSchedule, DashboardWidget
+from .models import Report, SavedQuery, ReportSchedule, ReportRun, DashboardWidget
 
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
@@ -21,11 +21,21 @@ class SavedQueryAdmin(admin.ModelAdmin):
 
 @admin.register(ReportSchedule)
 class ReportScheduleAdmin(admin.ModelAdmin):
-    list_display = ('report_title', 'report_type', 'frequency', 'next_run_date', 'active', 'created_by')
+    list_display = ('report_title', 'report_type', 'frequency', 'next_run_date', 'last_run_at', 'active', 'created_by')
     list_filter = ('report_type', 'frequency', 'active')
     search_fields = ('report_title', 'description')
     date_hierarchy = 'next_run_date'
     raw_id_fields = ('created_by', 'saved_query')
+    readonly_fields = ('claimed_by', 'claimed_at', 'last_run_at')
+
+@admin.register(ReportRun)
+class ReportRunAdmin(admin.ModelAdmin):
+    list_display = ('schedule', 'status', 'worker', 'scheduled_for', 'started_at', 'duration_seconds', 'queue_lag_seconds')
+    list_filter = ('status',)
+    date_hierarchy = 'started_at'
+    raw_id_fields = ('schedule', 'report')
+    readonly_fields = ('schedule', 'report', 'worker', 'status', 'error', 'scheduled_for', 'started_at',
+                       'finished_at', 'duration_seconds', 'queue_lag_seconds')
 
 @admin.register(DashboardWidget)
 class DashboardWidgetAdmin(admin.ModelAdmin):
@@ -0,0 +1,275 @@
+"""
+Portfolio-at-risk (PAR) and arrears aging report.
+
+The report is computed by one SQL statement. A window function gives the
+running amount due over each loan's installment schedule, late fees
+included, since the loan's paid total includes the fees paid. The oldest
+installment whose running total is above what the loan has paid is the
+loan's oldest unpaid installment. A loan without a schedule counts as one
+installment of its whole amount, due on its expected end date. Days past due are counted from that due
+date, less the product grace period. Conditional sums then roll the loans up
+per group, field officer or product. No Python loop runs per loan.
+
+Results are cached per day, so the report is computed at most once a day
+for each grouping.
+"""
+import csv
+import os
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from tablebanking.models import Loan, LoanInstallment, LoanProduct
+from user_management.models import FieldOfficer, Group, Member
+
+from .models import Report
+
+
+# Loans that make up the outstanding portfolio
+PORTFOLIO_STATUSES = ('DISBURSED', 'ACTIVE', 'DEFAULTED')
+
+# PAR figures: outstanding balance of loans more than N days past due
+PAR_THRESHOLDS = (
+    ('par1', 0),
+    ('par30', 30),
+    ('par90', 90),
+)
+
+# Aging buckets by days past due (inclusive bounds, None = open ended)
+AGING_BUCKETS = (
+    ('current', None, 0),
+    ('days_1_30', 1, 30),
+    ('days_31_60', 31, 60),
+    ('days_61_90', 61, 90),
+    ('days_91_180', 91, 180),
+    ('days_over_180', 181, None),
+)
+
+# Report groupings and the column of the per-loan rows they group by
+DIMENSIONS = {
+    'group': 'group_id',
+    'field_officer': 'officer_id',
+    'product': 'product_id',
+}
+
+# Days between the report date (a parameter) and a date column, per database
+DAYS_BETWEEN = {
+    'sqlite': "CAST(julianday(%s) - julianday({column}) AS INTEGER)",
+    'postgresql': "(CAST(%s AS date) - {column})",
+    'mysql': "DATEDIFF(%s, {column})",
+    'oracle': "(CAST(%s AS DATE) - {column})",
+}
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+CENT = Decimal('0.01')
+
+AMOUNT_COLUMNS = (
+    ('outstanding', 'arrears')
+    + tuple(name for name, _ in PAR_THRESHOLDS)
+    + tuple(name for name, _, _ in AGING_BUCKETS)
+)
+
+
+def _range_condition(low, high):
+    conditions = []
+    if low is not None:
+        conditions.append(f"days_past_due >= {int(low)}")
+    if high is not None:
+        conditions.append(f"days_past_due <= {int(high)}")
+    return ' AND '.join(conditions)
+
+
+def _report_sql(dimension):
+    """Build the aggregate query; it takes the statuses twice then the report date three times."""
+    days_late = DAYS_BETWEEN[connection.vendor].format(column='a.oldest_unpaid')
+    par_columns = ',\n'.join(
+        f"SUM(CASE WHEN days_past_due > {days} THEN outstanding ELSE 0 END) AS {name}"
+        for name, days in PAR_THRESHOLDS
+    )
+    bucket_columns = ',\n'.join(
+        f"SUM(CASE WHEN {_range_condition(low, high)} THEN outstanding ELSE 0 END) AS {name}"
+        for name, low, high in AGING_BUCKETS
+    )
+    statuses = ', '.join(['%s'] * len(PORTFOLIO_STATUSES))
+
+    sql = f"""
+        WITH schedule AS (
+            SELECT i.loan_id, i.due_date,
+                   SUM(i.principal_due + i.interest_due + i.penalty_due) OVER (
+                       PARTITION BY i.loan_id ORDER BY i.installment_number
+                   ) AS cumulative_due
+            FROM {LoanInstallment._meta.db_table} i
+            JOIN {Loan._meta.db_table} l ON l.id = i.loan_id
+            WHERE l.status IN ({statuses})
+            UNION ALL
+            SELECT l.id, l.expected_end_date, l.total_amount_due
+            FROM {Loan._meta.db_table} l
+            WHERE l.status IN ({statuses})
+              AND NOT EXISTS (SELECT 1 FROM {LoanInstallment._meta.db_table} i WHERE i.loan_id = l.id)
+        ),
+        loan_arrears AS (
+            SELECT l.id AS loan_id,
+                   l.loan_product_id AS product_id,
+                   l.group_id AS group_id,
+                   COALESCE(m.field_officer_id, g.field_officer_id) AS officer_id,
+                   CASE WHEN l.remaining_balance > 0 THEN l.remaining_balance ELSE 0 END AS outstanding,
+                   l.total_amount_paid AS paid,
+                   p.grace_period AS grace_period,
+                   MAX(CASE WHEN s.due_date < %s THEN s.cumulative_due ELSE 0 END) AS overdue_to_date,
+                   MIN(CASE WHEN s.due_date < %s AND s.cumulative_due > l.total_amount_paid
+                            THEN s.due_date END) AS oldest_unpaid
+            FROM {Loan._meta.db_table} l
+            JOIN schedule s ON s.loan_id = l.id
+            JOIN {LoanProduct._meta.db_table} p ON p.id = l.loan_product_id
+            LEFT JOIN {Member._meta.db_table} m ON m.id = l.member_id
+            LEFT JOIN {Group._meta.db_table} g ON g.id = l.group_id
+            GROUP BY l.id, l.loan_product_id, l.group_id, m.field_officer_id, g.field_officer_id,
+                     l.remaining_balance, l.total_amount_paid, p.grace_period
+        ),
+        aged AS (
+            SELECT a.{DIMENSIONS[dimension]} AS dimension_id,
+                   a.outstanding,
+                   CASE WHEN a.overdue_to_date > a.paid THEN a.overdue_to_date - a.paid ELSE 0 END AS arrears,
+                   CASE WHEN a.oldest_unpaid IS NULL THEN 0
+                        ELSE {days_late} - a.grace_period END AS days_past_due
+            FROM loan_arrears a
+        )
+        SELECT dimension_id,
+               COUNT(*) AS loans,
+               SUM(CASE WHEN days_past_due > 0 THEN 1 ELSE 0 END) AS loans_in_arrears,
+               SUM(outstanding) AS outstanding,
+               SUM(arrears) AS arrears,
+               {par_columns},
+               {bucket_columns}
+        FROM aged
+        GROUP BY dimension_id
+    """
+    return sql
+
+
+def _amount(value):
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def _ratio(part, whole):
+    return (part * 100 / whole).quantize(CENT) if whole else Decimal('0.00')
+
+
+def _labels(dimension, ids):
+    ids = [pk for pk in ids if pk is not None]
+    if dimension == 'group':
+        return dict(Group.objects.filter(pk__in=ids).values_list('pk', 'name'))
+    if dimension == 'product':
+        return dict(LoanProduct.objects.filter(pk__in=ids).values_list('pk', 'name'))
+    officers = FieldOfficer.objects.filter(pk__in=ids).select_related('user')
+    return {officer.pk: officer.user.get_full_name() or officer.user.username for officer in officers}
+
+
+def _add_ratios(row):
+    for name, _ in PAR_THRESHOLDS:
+        row[f'{name}_ratio'] = _ratio(row[name], row['outstanding'])
+    return row
+
+
+def compute_arrears_report(dimension='group', as_of=None):
+    """
+    Run the PAR and aging query for one grouping.
+
+    Returns a dict with one row per group/officer/product plus a portfolio
+    total row. Ratios are percentages of the outstanding balance.
+    """
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Unknown arrears report dimension '{dimension}'.")
+    as_of = as_of or timezone.localdate()
+
+    with connection.cursor() as cursor:
+        cursor.execute(_report_sql(dimension), [*PORTFOLIO_STATUSES, *PORTFOLIO_STATUSES, as_of, as_of, as_of])
+        columns = [column[0] for column in cursor.description]
+        fetched = [dict(zip(columns, values)) for values in cursor.fetchall()]
+
+    labels = _labels(dimension, [row['dimension_id'] for row in fetched])
+    unassigned = "Individual loans" if dimension == 'group' else "Unassigned"
+    rows = []
+    total = {'loans': 0, 'loans_in_arrears': 0, **{column: Decimal('0.00') for column in AMOUNT_COLUMNS}}
+    for values in fetched:
+        row = {
+            'id': values['dimension_id'],
+            'name': labels.get(values['dimension_id'], unassigned),
+            'loans': values['loans'],
+            'loans_in_arrears': values['loans_in_arrears'] or 0,
+        }
+        for column in AMOUNT_COLUMNS:
+            row[column] = _amount(values[column])
+            total[column] += row[column]
+        total['loans'] += row['loans']
+        total['loans_in_arrears'] += row['loans_in_arrears']
+        rows.append(_add_ratios(row))
+
+    rows.sort(key=lambda row: (-row['outstanding'], row['name']))
+    return {
+        'dimension': dimension,
+        'as_of': as_of.isoformat(),
+        'rows': rows,
+        'total': _add_ratios(total),
+    }
+
+
+def get_arrears_report(dimension='group', as_of=None, refresh=False):
+    """Return the report for a day from the cache, computing it on first use."""
+    as_of = as_of or timezone.localdate()
+    key = f'reports:arrears:{dimension}:{as_of.isoformat()}'
+    report = None if refresh else cache.get(key)
+    if report is None:
+        report = compute_arrears_report(dimension, as_of)
+        cache.set(key, report, CACHE_TIMEOUT)
+    return report
+
+
+def report_columns():
+    """Column order used when the report is exported."""
+    columns = ['name', 'loans', 'loans_in_arrears', 'outstanding', 'arrears']
+    for name, _ in PAR_THRESHOLDS:
+        columns.extend([name, f'{name}_ratio'])
+    columns.extend(name for name, _, _ in AGING_BUCKETS)
+    return columns
+
+
+def export_arrears_report(dimension='group', as_of=None, generated_by=None):
+    """
+    Write the report to a CSV file under MEDIA_ROOT and record it as a Report.
+
+    Returns the saved Report.
+    """
+    as_of = as_of or timezone.localdate()
+    data = get_arrears_report(dimension, as_of)
+    columns = report_columns()
+
+    relative_path = os.path.join('reports', f'arrears_{dimension}_{as_of.isoformat()}.csv')
+    full_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(columns)
+        for row in data['rows'] + [dict(data['total'], name='Total')]:
+            writer.writerow([row[column] for column in columns])
+
+    return Report.objects.create(
+        title=f"Portfolio at risk by {dimension.replace('_', ' ')} as of {as_of:%Y-%m-%d}",
+        report_type='LOAN',
+        description="PAR1/PAR30/PAR90 and arrears aging of the outstanding loan portfolio.",
+        generated_by=generated_by,
+        parameters={'report': 'arrears', 'dimension': dimension, 'as_of': as_of.isoformat()},
+        file_path=relative_path,
+        report_format='CSV',
+        date_range_end=as_of,
+    )
+
+
+def parse_as_of(value):
+    """Parse an optional YYYY-MM-DD report date; None means today."""
+    return date.fromisoformat(value) if value else None
@@ -0,0 +1,290 @@
+"""
+Streaming report exports.
+
+Each generator reads its rows with ``values_list(...).iterator(chunk_size=...)``,
+so related names come from joins in the same query. Rows go straight to the
+output as they are read. A CSV export is a StreamingHttpResponse. An XLSX
+export uses openpyxl's write-only workbook, which flushes rows to disk as it
+goes. Either way, memory stays flat however many rows are exported.
+"""
+import csv
+import os
+import tempfile
+from datetime import date, datetime
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import DateTimeField, Q
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from user_management.models import GroupMembership
+
+from .models import Report
+
+
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+EXPORT_FORMATS = {
+    'csv': ('CSV', 'csv'),
+    'xlsx': ('EXCEL', 'xlsx'),
+}
+
+
+class ReportGenerator:
+    """Definition of an exportable report over one model."""
+
+    def __init__(self, key, title, report_type, model, columns, date_field, group_paths):
+        self.key = key
+        self.title = title
+        self.report_type = report_type
+        self.model_label = model
+        self.columns = columns
+        self.date_field = date_field
+        self.group_paths = group_paths
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def queryset(self, date_from=None, date_to=None, group=None):
+        """Rows for the report as tuples, in column order."""
+        queryset = self.model.objects.all()
+
+        date_lookup = self.date_field
+        if isinstance(self.model._meta.get_field(self.date_field), DateTimeField):
+            date_lookup = f'{self.date_field}__date'
+        if date_from:
+            queryset = queryset.filter(**{f'{date_lookup}__gte': date_from})
+        if date_to:
+            queryset = queryset.filter(**{f'{date_lookup}__lte': date_to})
+
+        if group:
+            # Member paths match through the membership table with a subquery,
+            # which keeps one output row per record
+            members = GroupMembership.objects.filter(group=group).values('member')
+            condition = Q()
+            for path in self.group_paths:
+                if path.endswith('member'):
+                    condition |= Q(**{f'{path}__in': members})
+                else:
+                    condition |= Q(**{path: group})
+            queryset = queryset.filter(condition)
+
+        return queryset.order_by('pk').values_list(*[path for _, path in self.columns])
+
+    def rows(self, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+        return self.queryset(**filters).iterator(chunk_size=chunk_size)
+
+
+GENERATORS = {generator.key: generator for generator in [
+    ReportGenerator(
+        'transactions', "Transactions", 'TABLEBAKING', 'tablebanking.Transaction',
+        [
+            ("Reference", 'reference_number'),
+            ("Date", 'date'),
+            ("Type", 'transaction_type'),
+            ("Amount", 'amount'),
+            ("Member account", 'individual_savings_account__account_number'),
+            ("Member first name", 'individual_savings_account__member__first_name'),
+            ("Member last name", 'individual_savings_account__member__last_name'),
+            ("Group account", 'group_savings_account__account_number'),
+            ("Group", 'group_savings_account__group__name'),
+            ("Field officer", 'field_officer__user__username'),
+            ("Description", 'description'),
+        ],
+        'date', ['group_savings_account__group', 'individual_savings_account__member'],
+    ),
+    ReportGenerator(
+        'loans', "Loans", 'LOAN', 'tablebanking.Loan',
+        [
+            ("Loan number", 'loan_number'),
+            ("Member first name", 'member__first_name'),
+            ("Member last name", 'member__last_name'),
+            ("Group", 'group__name'),
+            ("Product", 'loan_product__name'),
+            ("Principal", 'principal_amount'),
+            ("Interest rate", 'interest_rate'),
+            ("Interest method", 'interest_method'),
+            ("Term (months)", 'term_months'),
+            ("Status", 'status'),
+            ("Application date", 'application_date'),
+            ("Disbursement date", 'disbursement_date'),
+            ("Expected end date", 'expected_end_date'),
+            ("Total due", 'total_amount_due'),
+            ("Total paid", 'total_amount_paid'),
+            ("Balance", 'remaining_balance'),
+        ],
+        'application_date', ['group', 'member'],
+    ),
+    ReportGenerator(
+        'agriculture_collections', "Agriculture collections", 'AGRICULTURE', 'boosters.AgricultureCollection',
+        [
+            ("Receipt", 'receipt_number'),
+            ("Date", 'collection_date'),
+            ("Member first name", 'member__first_name'),
+            ("Member last name", 'member__last_name'),
+            ("Product", 'product__name'),
+            ("Quantity", 'quantity'),
+            ("Unit price", 'unit_price'),
+            ("Total value", 'total_value'),
+            ("Location", 'collection_location'),
+            ("Payment status", 'payment_status'),
+            ("Amount paid", 'amount_paid'),
+            ("Collected by", 'collected_by__user__username'),
+        ],
+        'collection_date', ['member'],
+    ),
+    ReportGenerator(
+        'school_fees_collections', "School fees collections", 'SCHOOL_FEES', 'boosters.SchoolFeesCollection',
+        [
+            ("Receipt", 'receipt_number'),
+            ("Date", 'collection_date'),
+            ("Member first name", 'member__first_name'),
+            ("Member last name", 'member__last_name'),
+            ("Student", 'student_name'),
+            ("School", 'school_name'),
+            ("Level", 'education_level'),
+            ("Academic year", 'academic_year'),
+            ("Term", 'term'),
+            ("Amount", 'amount'),
+            ("Payment method", 'payment_method'),
+            ("Complete payment", 'is_complete_payment'),
+            ("Collected by", 'collected_by__user__username'),
+        ],
+        'collection_date', ['member'],
+    ),
+    ReportGenerator(
+        'memberships', "Group memberships", 'GROUP', 'user_management.GroupMembership',
+        [
+            ("Group", 'group__name'),
+            ("Registration number", 'group__registration_number'),
+            ("Member first name", 'member__first_name'),
+            ("Member last name", 'member__last_name'),
+            ("ID number", 'member__id_number'),
+            ("Phone", 'member__phone_number'),
+            ("Join date", 'join_date'),
+            ("Active", 'is_active'),
+            ("Exit date", 'exit_date'),
+        ],
+        'join_date', ['group'],
+    ),
+]}
+
+
+def parse_export_filters(params):
+    """Read date_from, date_to and group from request parameters."""
+    filters = {}
+    for name in ('date_from', 'date_to'):
+        if params.get(name):
+            try:
+                filters[name] = date.fromisoformat(params[name])
+            except ValueError:
+                raise ValueError(f"'{name}' must be a date in YYYY-MM-DD format.")
+    if params.get('group'):
+        try:
+            filters['group'] = int(params['group'])
+        except ValueError:
+            raise ValueError("'group' must be a group id.")
+    return filters
+
+
+class _Echo:
+    """File-like object whose write() hands back the line for streaming."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    # Excel has no time zones, so both formats write local wall-clock times
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    return value
+
+
+def iter_csv(generator, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(generator.headers)
+    for row in rows:
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def write_csv(generator, rows, handle):
+    writer = csv.writer(handle)
+    writer.writerow(generator.headers)
+    for row in rows:
+        writer.writerow([_cell(value) for value in row])
+
+
+def write_xlsx(generator, rows, handle):
+    """Write rows to an XLSX file (path or binary file object) in constant memory."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=generator.title[:31])
+    sheet.append(generator.headers)
+    for row in rows:
+        sheet.append([_cell(value) for value in row])
+    workbook.save(handle)
+
+
+def _filename(generator, extension):
+    return f"{generator.key}_{timezone.now():%Y%m%d_%H%M%S}.{extension}"
+
+
+def export_response(generator, export_format='csv', **filters):
+    """HTTP response that streams the report as CSV or XLSX."""
+    rows = generator.rows(**filters)
+    filename = _filename(generator, EXPORT_FORMATS[export_format][1])
+
+    if export_format == 'xlsx':
+        # A zip archive cannot be streamed as it is written, so the workbook
+        # goes to an anonymous temporary file that FileResponse then streams
+        handle = tempfile.TemporaryFile()
+        write_xlsx(generator, rows, handle)
+        handle.seek(0)
+        return FileResponse(handle, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+    response = StreamingHttpResponse(iter_csv(generator, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def generate_report_file(generator, export_format='csv', generated_by=None, **filters):
+    """
+    Write the report to a file under MEDIA_ROOT and record it as a Report.
+
+    Returns the saved Report.
+    """
+    report_format, extension = EXPORT_FORMATS[export_format]
+    relative_path = os.path.join('reports', _filename(generator, extension))
+    full_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    rows = generator.rows(**filters)
+    if export_format == 'xlsx':
+        with open(full_path, 'wb') as handle:
+            write_xlsx(generator, rows, handle)
+    else:
+        with open(full_path, 'w', newline='') as handle:
+            write_csv(generator, rows, handle)
+
+    parameters = {'report': generator.key, 'format': export_format}
+    parameters.update({name: str(value) for name, value in filters.items() if value})
+    return Report.objects.create(
+        title=f"{generator.title} export",
+        report_type=generator.report_type,
+        generated_by=generated_by,
+        parameters=parameters,
+        file_path=relative_path,
+        report_format=report_format,
+        date_range_start=filters.get('date_from'),
+        date_range_end=filters.get('date_to'),
+    )
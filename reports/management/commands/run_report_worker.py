@@ -0,0 +1,57 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from reports import scheduler
+
+
+class Command(BaseCommand):
+    help = "Run due report schedules in background worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1,
+                            help="Number of worker processes to run (default 1).")
+        parser.add_argument('--batch-size', type=int, default=1,
+                            help="Schedules each worker claims at a time (default 1).")
+        parser.add_argument('--poll-interval', type=float, default=30,
+                            help="Seconds to wait when the queue is empty (default 30).")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once no schedules are due instead of polling.")
+
+    def report_run(self, run):
+        message = (f"[{run.worker}] {run.schedule.report_title}: {run.get_status_display().lower()} "
+                   f"in {run.duration_seconds:.2f}s (queue lag {run.queue_lag_seconds:.0f}s)")
+        if run.status in ('FAILED', 'ABANDONED'):
+            self.stderr.write(message)
+        else:
+            self.stdout.write(message)
+
+    def work(self, options):
+        scheduler.work(
+            batch_size=options['batch_size'],
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+            on_run=self.report_run,
+        )
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--processes and --batch-size must be at least 1.")
+
+        if options['processes'] == 1:
+            self.work(options)
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        workers = [multiprocessing.Process(target=self.work, args=(options,))
+                   for _ in range(options['processes'])]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
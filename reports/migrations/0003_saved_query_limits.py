@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_report_runs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedquery',
+            name='cache_timeout',
+            field=models.PositiveIntegerField(default=300, help_text='Seconds results are cached (0 disables caching)'),
+        ),
+        migrations.AddField(
+            model_name='savedquery',
+            name='max_rows',
+            field=models.PositiveIntegerField(default=5000, help_text='Rows returned at most'),
+        ),
+        migrations.AddField(
+            model_name='savedquery',
+            name='timeout_seconds',
+            field=models.PositiveIntegerField(default=30, help_text='Statement timeout in seconds'),
+        ),
+    ]
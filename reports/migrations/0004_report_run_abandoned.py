@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_saved_query_limits'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportrun',
+            name='status',
+            field=models.CharField(choices=[('RUNNING', 'Running'), ('SUCCEEDED', 'Succeeded'), ('FAILED', 'Failed'), ('ABANDONED', 'Abandoned')], default='RUNNING', max_length=20),
+        ),
+    ]
@@ -56,6 +56,12 @@ class SavedQuery(models.Model):
     sql_query = models.TextField(blank=True, null=True)
     parameters_definition = models.JSONField(blank=True, null=True)
     
+    # Execution limits
+    timeout_seconds = models.PositiveIntegerField(default=30, help_text="Statement timeout in seconds")
+    max_rows = models.PositiveIntegerField(default=5000, help_text="Rows returned at most")
+    cache_timeout = models.PositiveIntegerField(default=300,
+                                                help_text="Seconds results are cached (0 disables caching)")
+    
     # Creator and permissions
     created_by = models.ForeignKey(FieldOfficer, on_delete=models.SET_NULL, null=True)
     created_date = models.DateTimeField(default=timezone.now)
@@ -97,10 +103,49 @@ class ReportSchedule(models.Model):
     created_by = models.ForeignKey(FieldOfficer, on_delete=models.SET_NULL, null=True)
     created_date = models.DateTimeField(default=timezone.now)
     
+    # Worker claim; a claim older than the scheduler's timeout is considered abandoned
+    claimed_by = models.CharField(max_length=100, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['active', 'next_run_date']),
+        ]
+    
     def __str__(self):
         return f"{self.report_title} - {self.get_frequency_display()} Schedule"
 
 
+class ReportRun(models.Model):
+    """One execution of a report schedule by a worker."""
+    STATUS_CHOICES = (
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+        ('ABANDONED', 'Abandoned'),
+    )
+    
+    schedule = models.ForeignKey(ReportSchedule, on_delete=models.CASCADE, related_name='runs')
+    report = models.ForeignKey(Report, on_delete=models.SET_NULL, null=True, blank=True)
+    worker = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='RUNNING')
+    error = models.TextField(blank=True, null=True)
+    
+    # Timing: lag is how long the run waited past its scheduled time
+    scheduled_for = models.DateTimeField()
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_seconds = models.FloatField(null=True, blank=True)
+    queue_lag_seconds = models.FloatField()
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{self.schedule.report_title} at {self.started_at} ({self.get_status_display()})"
+
+
 class DashboardWidget(models.Model):
     """Widgets for analytics dashboards."""
     WIDGET_TYPES = (
@@ -0,0 +1,320 @@
+"""
+Execution engine for SavedQuery.
+
+Saved SQL is run read-only. It must be a single SELECT (or WITH ... SELECT)
+statement, and its parameters are bound by the database driver, never
+formatted into the text. Placeholders are written ``%(name)s``, and a literal
+percent sign is written ``%%``.
+
+Each query has its own statement timeout and row limit. On SQLite and
+PostgreSQL the database itself enforces both the read-only mode and the
+timeout.
+
+Only the tables of the QUERYABLE_APPS can be read. A query naming any other
+table the project knows (users, sessions, the admin log) is refused before
+it runs, and on SQLite an authorizer callback also denies reading any table
+outside the list while the statement is prepared, whatever the SQL looks
+like.
+
+Results are cached in the ``saved_queries`` cache, which evicts by TTL and
+least recent use. The cache key is (query, parameters, data version). The
+data version is a counter in the database (see dashboard.versions) that is
+bumped when a transaction that changed application data commits (see
+reports.signals), so no worker process serves a cached result after the
+data under it has moved.
+"""
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from sqlite3 import SQLITE_DENY, SQLITE_FUNCTION, SQLITE_OK, SQLITE_READ, SQLITE_RECURSIVE, SQLITE_SELECT
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from dashboard.versions import bump_version, get_version
+
+from .models import Report
+
+
+DATA_VERSION_KEY = 'reports_data'
+
+# Apps whose tables saved queries may read
+QUERYABLE_APPS = ('user_management', 'tablebanking', 'boosters', 'dashboard', 'ukombozini_products')
+
+# Catalogs no saved query needs
+SYSTEM_TABLES = re.compile(r'^(sqlite_\w+|pg_\w+|information_schema)$', re.IGNORECASE)
+
+IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_$]*')
+
+RESULT_CACHE = 'saved_queries'
+
+STATEMENT_START = re.compile(r'^\s*(select|with)\b', re.IGNORECASE)
+
+# Statements and pragmas a read-only query never needs
+FORBIDDEN_KEYWORDS = re.compile(
+    r'\b(insert|update|delete|merge|upsert|drop|alter|create|truncate|grant|revoke|attach|detach|'
+    r'pragma|vacuum|reindex|analyze|copy|call|execute|lock|set)\b',
+    re.IGNORECASE,
+)
+
+
+class SavedQueryError(ValueError):
+    """A saved query that cannot be run: invalid SQL, bad parameters or a timeout."""
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ('1', 'true', 'yes', 'on'):
+        return True
+    if str(value).lower() in ('0', 'false', 'no', 'off', ''):
+        return False
+    raise ValueError(value)
+
+
+PARAMETER_TYPES = {
+    'string': str,
+    'int': int,
+    'decimal': lambda value: Decimal(str(value)),
+    'date': lambda value: value if isinstance(value, date) else date.fromisoformat(str(value)),
+    'bool': _parse_bool,
+}
+
+
+def validate_sql(sql):
+    """Reject anything other than a single read-only SELECT statement."""
+    statement = (sql or '').strip().rstrip(';').strip()
+    if not statement:
+        raise SavedQueryError("The query is empty.")
+    if ';' in statement:
+        raise SavedQueryError("Only a single statement can be run.")
+    if '--' in statement or '/*' in statement:
+        raise SavedQueryError("Comments are not allowed in saved queries.")
+    if not STATEMENT_START.match(statement):
+        raise SavedQueryError("Saved queries must start with SELECT or WITH.")
+    keyword = FORBIDDEN_KEYWORDS.search(statement)
+    if keyword:
+        raise SavedQueryError(f"'{keyword.group(1).upper()}' is not allowed in saved queries.")
+    allowed = queryable_tables()
+    for name in IDENTIFIER.findall(statement):
+        name = name.lower()
+        if name not in allowed and (name in project_tables() or SYSTEM_TABLES.match(name)):
+            raise SavedQueryError(f"Table '{name}' is not available to saved queries.")
+    return statement
+
+
+def _tables(models):
+    return frozenset(model._meta.db_table.lower() for model in models)
+
+
+def queryable_tables():
+    """Tables saved queries may read, many-to-many tables included."""
+    return _tables(model for app_label in QUERYABLE_APPS
+                   for model in apps.get_app_config(app_label).get_models(include_auto_created=True))
+
+
+def project_tables():
+    """Every table of every installed app."""
+    return _tables(apps.get_models(include_auto_created=True))
+
+
+def bind_parameters(definition, values):
+    """
+    Convert submitted values using the query's ``parameters_definition``.
+
+    The definition maps each parameter name to ``{"type": ..., "required": ...,
+    "default": ...}``; types are string, int, decimal, date and bool.
+    """
+    definition = definition or {}
+    values = values or {}
+    unknown = sorted(set(values) - set(definition))
+    if unknown:
+        raise SavedQueryError(f"Unknown parameter(s): {', '.join(unknown)}.")
+
+    bound = {}
+    for name, spec in definition.items():
+        spec = spec or {}
+        value = values.get(name, spec.get('default'))
+        if value in (None, ''):
+            if spec.get('required'):
+                raise SavedQueryError(f"Parameter '{name}' is required.")
+            bound[name] = None
+            continue
+        converter = PARAMETER_TYPES.get(spec.get('type', 'string'))
+        if converter is None:
+            raise SavedQueryError(f"Parameter '{name}' has unknown type '{spec.get('type')}'.")
+        try:
+            bound[name] = converter(value)
+        except (ValueError, TypeError, InvalidOperation):
+            raise SavedQueryError(f"Parameter '{name}' must be a valid {spec.get('type', 'string')}.")
+    return bound
+
+
+def data_version():
+    """Current application data version (starts at 1)."""
+    return get_version(DATA_VERSION_KEY)[0]
+
+
+def _bump_committed():
+    bump_version(DATA_VERSION_KEY)
+
+
+def bump_data_version():
+    """Mark all cached query results as stale once the current transaction commits."""
+    # Every data write calls this: deferring to the commit keeps writers from
+    # queueing on the counter row, and a transaction bumps it only once
+    pending = transaction.get_connection().run_on_commit
+    if not any(callback is _bump_committed for _, callback, _ in pending):
+        transaction.on_commit(_bump_committed)
+
+
+def _cache_key(saved_query, params):
+    payload = json.dumps([saved_query.sql_query, params], sort_keys=True, default=str)
+    digest = hashlib.sha256(payload.encode()).hexdigest()
+    return f'reports:query:{saved_query.pk}:{digest}:{data_version()}'
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    return value
+
+
+def _fetch(cursor, max_rows):
+    # One row past the limit tells whether the result was cut short
+    return [column[0] for column in cursor.description], cursor.fetchmany(max_rows + 1)
+
+
+def _sqlite_authorizer(allowed):
+    # Reads are reported per table and column; subqueries and CTEs report no table
+    def authorize(action, table, column, database, trigger):
+        if action in (SQLITE_SELECT, SQLITE_FUNCTION, SQLITE_RECURSIVE):
+            return SQLITE_OK
+        if action == SQLITE_READ and (table is None or table.lower() in allowed):
+            return SQLITE_OK
+        return SQLITE_DENY
+    return authorize
+
+
+def _execute_sqlite(cursor, sql, params, timeout, max_rows):
+    raw = connection.connection
+    deadline = time.monotonic() + timeout
+    # Abort the statement from SQLite's progress callback once time is up
+    raw.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+    cursor.execute('PRAGMA query_only = ON')
+    raw.set_authorizer(_sqlite_authorizer(queryable_tables()))
+    try:
+        cursor.execute(sql, params)
+        return _fetch(cursor, max_rows)
+    finally:
+        raw.set_authorizer(None)
+        cursor.execute('PRAGMA query_only = OFF')
+        raw.set_progress_handler(None, 0)
+
+
+def _execute_postgresql(cursor, sql, params, timeout, max_rows):
+    cursor.execute('SET TRANSACTION READ ONLY')
+    cursor.execute('SET LOCAL statement_timeout = %s', [int(timeout * 1000)])
+    cursor.execute(sql, params)
+    return _fetch(cursor, max_rows)
+
+
+def _execute_default(cursor, sql, params, timeout, max_rows):
+    cursor.execute(sql, params)
+    return _fetch(cursor, max_rows)
+
+
+EXECUTORS = {
+    'sqlite': _execute_sqlite,
+    'postgresql': _execute_postgresql,
+}
+
+
+def execute_saved_query(saved_query, values=None):
+    """Run a saved query against the database, bypassing the cache."""
+    sql = validate_sql(saved_query.sql_query)
+    params = bind_parameters(saved_query.parameters_definition, values)
+    executor = EXECUTORS.get(connection.vendor, _execute_default)
+
+    started = time.monotonic()
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                columns, rows = executor(cursor, sql, params, saved_query.timeout_seconds,
+                                         saved_query.max_rows)
+    except DatabaseError as e:
+        if 'interrupt' in str(e).lower() or 'timeout' in str(e).lower():
+            raise SavedQueryError(f"The query took longer than {saved_query.timeout_seconds} seconds.")
+        if 'not authorized' in str(e).lower():
+            raise SavedQueryError("The query reads a table that is not available to saved queries.")
+        raise SavedQueryError(f"The query failed: {e}")
+
+    truncated = len(rows) > saved_query.max_rows
+    rows = rows[:saved_query.max_rows]
+    return {
+        'columns': columns,
+        'rows': [[_json_value(value) for value in row] for row in rows],
+        'row_count': len(rows),
+        'truncated': truncated,
+        'duration_seconds': round(time.monotonic() - started, 3),
+        'executed_at': timezone.now().isoformat(),
+    }
+
+
+def run_saved_query(saved_query, values=None, use_cache=True):
+    """
+    Run a saved query, serving repeated calls from the result cache.
+
+    Returns a dict with columns, rows, row_count, truncated and execution
+    timing; ``cached`` tells whether the result came from the cache.
+    """
+    params = bind_parameters(saved_query.parameters_definition, values)
+    use_cache = use_cache and saved_query.cache_timeout > 0
+    key = _cache_key(saved_query, params) if use_cache else None
+
+    if use_cache:
+        result = caches[RESULT_CACHE].get(key)
+        if result is not None:
+            return dict(result, cached=True)
+
+    result = execute_saved_query(saved_query, values)
+    if use_cache:
+        caches[RESULT_CACHE].set(key, result, saved_query.cache_timeout)
+    return dict(result, cached=False)
+
+
+def export_saved_query(saved_query, values=None, generated_by=None, report_type='CUSTOM'):
+    """Write a saved query's result to a CSV file under MEDIA_ROOT and record it as a Report."""
+    result = run_saved_query(saved_query, values)
+
+    relative_path = os.path.join('reports', f"query_{saved_query.pk}_{timezone.now():%Y%m%d_%H%M%S}.csv")
+    full_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(result['columns'])
+        writer.writerows(result['rows'])
+
+    return Report.objects.create(
+        title=saved_query.name,
+        report_type=report_type,
+        description=saved_query.description,
+        generated_by=generated_by,
+        parameters={'saved_query': saved_query.pk, 'values': {k: str(v) for k, v in (values or {}).items()},
+                    'truncated': result['truncated']},
+        file_path=relative_path,
+        report_format='CSV',
+    )
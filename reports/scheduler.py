@@ -0,0 +1,232 @@
+"""
+Background execution of report schedules.
+
+Due schedules form a queue in the database. A worker claims a few at a time.
+It picks candidates with SELECT ... FOR UPDATE SKIP LOCKED, so workers never
+wait on each other's rows. It then stamps its name on each one with a
+conditional UPDATE, which keeps claims exclusive on databases without row
+locks too. While a report is generated a heartbeat thread keeps pushing the
+claim's timestamp forward, so a long run is not mistaken for an abandoned
+one. Each run records its duration and its queue lag (how long it waited
+past next_run_date) in a ReportRun row, then moves next_run_date on and
+releases the claim. A worker that finds its claim was taken over after all
+(it stalled past the timeout) throws its report away instead.
+"""
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .arrears import export_arrears_report
+from .exports import EXPORT_FORMATS, GENERATORS, generate_report_file, parse_export_filters
+from .models import ReportRun, ReportSchedule
+from .queries import export_saved_query
+
+
+# A claim older than this belongs to a worker that died mid-run
+CLAIM_TIMEOUT = timedelta(minutes=30)
+
+# How often a running worker refreshes its claim, well inside the timeout
+HEARTBEAT_INTERVAL = timedelta(minutes=5)
+
+FREQUENCY_DELTAS = {
+    'DAILY': relativedelta(days=1),
+    'WEEKLY': relativedelta(weeks=1),
+    'MONTHLY': relativedelta(months=1),
+    'QUARTERLY': relativedelta(months=3),
+    'YEARLY': relativedelta(years=1),
+}
+
+# Report produced for a schedule whose parameters do not name one
+REPORT_TYPE_GENERATORS = {
+    'TABLEBAKING': 'transactions',
+    'LOAN': 'loans',
+    'GROUP': 'memberships',
+    'AGRICULTURE': 'agriculture_collections',
+    'SCHOOL_FEES': 'school_fees_collections',
+}
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _due(now):
+    stale = now - CLAIM_TIMEOUT
+    return ReportSchedule.objects.filter(active=True, next_run_date__lte=now).filter(
+        Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale)
+    )
+
+
+def claim_schedules(worker, limit=1, now=None):
+    """Claim up to ``limit`` due schedules for a worker, oldest first."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        candidates = list(_due(now).select_for_update(skip_locked=True)
+                          .order_by('next_run_date').values_list('pk', flat=True)[:limit])
+        if not candidates:
+            return []
+        # Only rows still unclaimed are taken, even if another worker read them too
+        _due(now).filter(pk__in=candidates).update(claimed_by=worker, claimed_at=now)
+    return list(ReportSchedule.objects.filter(pk__in=candidates, claimed_by=worker, claimed_at=now)
+                .order_by('next_run_date'))
+
+
+def refresh_claim(schedule_id, worker, now=None):
+    """Move a held claim's timestamp to ``now``. Returns whether the worker still holds it."""
+    return bool(ReportSchedule.objects.filter(pk=schedule_id, claimed_by=worker)
+                .update(claimed_at=now or timezone.now()))
+
+
+@contextmanager
+def heartbeat(schedule_id, worker, interval=HEARTBEAT_INTERVAL):
+    """Refresh a claim every ``interval`` from a background thread while the block runs."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(interval.total_seconds()):
+                if not refresh_claim(schedule_id, worker):
+                    return
+        finally:
+            # The thread has its own connection
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'report-claim-{schedule_id}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def discard_report(report):
+    """Delete a Report and the file it was written to."""
+    if report.file_path:
+        full_path = os.path.join(settings.MEDIA_ROOT, report.file_path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+    report.delete()
+
+
+def next_run_after(schedule, now):
+    """The first run time after ``now`` in the schedule's cadence; missed runs are skipped."""
+    delta = FREQUENCY_DELTAS[schedule.frequency]
+    run = schedule.next_run_date
+    while run <= now:
+        run += delta
+    return run
+
+
+def report_period(schedule):
+    """The dates a run covers: the frequency period that ended the day before it was due."""
+    end = timezone.localtime(schedule.next_run_date).date() - timedelta(days=1)
+    start = end + timedelta(days=1) - FREQUENCY_DELTAS[schedule.frequency]
+    return start, end
+
+
+def generate_scheduled_report(schedule):
+    """Produce the Report for one run of a schedule."""
+    parameters = dict(schedule.parameters or {})
+    name = parameters.get('report')
+    if name is None and schedule.saved_query_id is None:
+        name = REPORT_TYPE_GENERATORS.get(schedule.report_type)
+    period_start, period_end = report_period(schedule)
+
+    if name is None and schedule.saved_query_id:
+        report = export_saved_query(schedule.saved_query, parameters.get('query_parameters'),
+                                    generated_by=schedule.created_by, report_type=schedule.report_type)
+    elif name == 'arrears':
+        report = export_arrears_report(parameters.get('dimension', 'group'), as_of=period_end,
+                                       generated_by=schedule.created_by)
+    elif name in GENERATORS:
+        export_format = parameters.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{export_format}'.")
+        filters = {'date_from': period_start, 'date_to': period_end}
+        filters.update(parse_export_filters(parameters))
+        report = generate_report_file(GENERATORS[name], export_format,
+                                      generated_by=schedule.created_by, **filters)
+    else:
+        raise ValueError(f"No report generator for schedule type '{schedule.report_type}'.")
+
+    report.title = schedule.report_title
+    report.description = schedule.description or report.description
+    report.save(update_fields=['title', 'description'])
+    report.shared_with.set(schedule.recipients.all())
+    return report
+
+
+def run_schedule(schedule, worker):
+    """Run one claimed schedule, record the outcome, advance it and release the claim."""
+    started = timezone.now()
+    run = ReportRun.objects.create(
+        schedule=schedule,
+        worker=worker,
+        scheduled_for=schedule.next_run_date,
+        started_at=started,
+        queue_lag_seconds=max((started - schedule.next_run_date).total_seconds(), 0),
+    )
+
+    try:
+        with heartbeat(schedule.pk, worker):
+            run.report = generate_scheduled_report(schedule)
+        run.status = 'SUCCEEDED'
+    except Exception:
+        # A failing report must not stop the worker; the error stays on the run
+        run.status = 'FAILED'
+        run.error = traceback.format_exc()
+
+    run.finished_at = timezone.now()
+    run.duration_seconds = (run.finished_at - started).total_seconds()
+
+    with transaction.atomic():
+        held = ReportSchedule.objects.select_for_update().filter(pk=schedule.pk, claimed_by=worker).exists()
+        if not held:
+            # Another worker has taken the schedule over; its run is the one that counts
+            if run.report:
+                discard_report(run.report)
+                run.report = None
+            run.status = 'ABANDONED'
+            run.error = "The claim expired and another worker took the schedule over."
+        run.save()
+
+        # Failed runs advance too, so a broken schedule is not retried in a loop
+        if held:
+            ReportSchedule.objects.filter(pk=schedule.pk, claimed_by=worker).update(
+                next_run_date=next_run_after(schedule, run.finished_at),
+                last_run_at=started,
+                claimed_by='',
+                claimed_at=None,
+            )
+    return run
+
+
+def work(worker=None, batch_size=1, poll_interval=30, once=False, on_run=None):
+    """
+    Claim and run due schedules until stopped.
+
+    With ``once`` the worker returns as soon as the queue is empty, which
+    suits running it from cron. ``on_run`` is called with each ReportRun.
+    """
+    worker = worker or worker_name()
+    while True:
+        claimed = claim_schedules(worker, batch_size)
+        for schedule in claimed:
+            run = run_schedule(schedule, worker)
+            if on_run:
+                on_run(run)
+        if not claimed:
+            if once:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from tablebanking.signals import balance_changed, loans_changed
+from .queries import bump_data_version
+
+
+# Apps whose data saved queries report on
+DATA_APPS = ('user_management', 'tablebanking', 'boosters', 'dashboard')
+
+# Bookkeeping models that change without changing reportable data
+IGNORED_MODELS = ('dashboard.KPISnapshot', 'dashboard.ChangeFeedEntry', 'dashboard.CacheVersion')
+
+
+def _is_data_model(model):
+    return model._meta.app_label in DATA_APPS and model._meta.label not in IGNORED_MODELS
+
+
+def data_changed(sender, raw=False, action='post_save', **kwargs):
+    """Invalidate cached saved query results after any write to application data."""
+    if raw or not action.startswith('post_') or not _is_data_model(sender):
+        return
+    bump_data_version()
+
+
+def data_changed_in_bulk(sender, **kwargs):
+    """Bulk balance and loan updates bypass save(); they announce themselves instead."""
+    bump_data_version()
+
+
+def connect_data_version_signals():
+    post_save.connect(data_changed, dispatch_uid='reports_data_version_post_save')
+    post_delete.connect(data_changed, dispatch_uid='reports_data_version_post_delete')
+    m2m_changed.connect(data_changed, dispatch_uid='reports_data_version_m2m_changed')
+    balance_changed.connect(data_changed_in_bulk, dispatch_uid='reports_data_version_balance_changed')
+    loans_changed.connect(data_changed_in_bulk, dispatch_uid='reports_data_version_loans_changed')
@@ -1,3 +1,307 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from tablebanking.models import (GroupSavingsAccount, IndividualSavingsAccount, Loan, LoanProduct, LoanRepayment,
+                                 SavingsProduct, Transaction)
+from tablebanking.penalties import assess_penalties
+from user_management.models import Group, GroupMembership, Member
+
+from .arrears import compute_arrears_report
+from .exports import GENERATORS, generate_report_file
+from .models import DashboardWidget, Report, ReportSchedule, SavedQuery
+from .queries import SavedQueryError, _execute_sqlite, data_version, run_saved_query, validate_sql
+from .scheduler import CLAIM_TIMEOUT, claim_schedules, heartbeat, refresh_claim, run_schedule
+from .widgets import DATA_SOURCES, DEFAULT_CACHE_TIMEOUT, get_widgets_data, widget_cache_timeout
+
+
+class ArrearsReportTests(TestCase):
+    """Arrears and days past due follow the schedule, late fees and unscheduled loans included."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            name='Umoja', registration_number='G-1', formation_date=date(2020, 1, 1),
+            meeting_schedule='Every Monday', meeting_location='Hall',
+        )
+        cls.product = LoanProduct.objects.create(
+            name='Group loan', code='GL', description='', interest_rate=12, minimum_amount=100,
+            maximum_amount=100000, minimum_term=1, maximum_term=12, late_payment_fee=50,
+        )
+
+    def add_loan(self, number, **fields):
+        # 1200 over 3 months at 12% flat: installments of 412 due 1 February, 1 March and 1 April
+        fields.setdefault('disbursement_date', date(2024, 1, 1))
+        fields.setdefault('status', 'DISBURSED')
+        return Loan.objects.create(loan_product=self.product, loan_number=number, group=self.group,
+                                   principal_amount=1200, interest_rate=12, term_months=3, **fields)
+
+    def total(self, as_of):
+        return compute_arrears_report('group', as_of)['total']
+
+    def test_arrears_from_the_schedule(self):
+        self.add_loan('L-1')
+        total = self.total(date(2024, 3, 15))
+
+        self.assertEqual((total['loans'], total['loans_in_arrears']), (1, 1))
+        self.assertEqual(total['arrears'], Decimal('824.00'))
+        self.assertEqual(total['days_31_60'], Decimal('1236.00'))
+
+    def test_paying_a_late_fee_does_not_hide_arrears(self):
+        loan = self.add_loan('L-1')
+        assess_penalties(date(2024, 2, 10))
+        before = self.total(date(2024, 3, 15))
+
+        LoanRepayment.objects.create(loan=loan, amount=Decimal('50'), reference_number='R-1')
+        after = self.total(date(2024, 3, 15))
+
+        # The fee was owed and is now paid; the installments are as far behind as before
+        self.assertEqual(before['arrears'], Decimal('874.00'))
+        self.assertEqual(after['arrears'], Decimal('824.00'))
+        self.assertEqual(after['days_31_60'], after['outstanding'])
+
+    def test_loans_without_a_schedule_are_reported(self):
+        self.add_loan('L-1')
+        self.add_loan('L-2', status='ACTIVE', expected_end_date=date(2024, 2, 1))
+        self.assertFalse(Loan.objects.get(loan_number='L-2').installments.exists())
+
+        total = self.total(date(2024, 3, 15))
+        self.assertEqual((total['loans'], total['loans_in_arrears']), (2, 2))
+        self.assertEqual(total['outstanding'], Decimal('2472.00'))
+        self.assertEqual(total['arrears'], Decimal('2060.00'))
+
+    def test_reports_default_to_the_local_date(self):
+        # 01:00 in Nairobi is still the previous day in UTC
+        local_morning = timezone.make_aware(datetime(2024, 3, 15, 1))
+        with patch('django.utils.timezone.now', return_value=local_morning.astimezone(dt_timezone.utc)):
+            self.assertEqual(compute_arrears_report('group')['as_of'], '2024-03-15')
+
+
+class SavedQueryTests(TestCase):
+    """Saved queries read application tables only and their cached results follow the data."""
+
+    def saved_query(self, sql):
+        return SavedQuery.objects.create(name='Groups', query_type='custom', sql_query=sql)
+
+    def test_tables_outside_the_allowlist_are_refused(self):
+        for sql in ('SELECT username, password FROM auth_user',
+                    'SELECT session_data FROM "django_session"',
+                    'WITH s AS (SELECT * FROM django_session) SELECT * FROM s',
+                    'SELECT name FROM sqlite_master'):
+            with self.assertRaises(SavedQueryError):
+                validate_sql(sql)
+        self.assertTrue(validate_sql('SELECT name FROM user_management_group'))
+
+    def test_sqlite_refuses_reads_outside_the_allowlist(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('The authorizer is specific to SQLite.')
+        with connection.cursor() as cursor:
+            with self.assertRaises(DatabaseError):
+                _execute_sqlite(cursor, 'SELECT * FROM auth_user', {}, 5, 10)
+            columns, rows = _execute_sqlite(cursor, 'SELECT COUNT(*) FROM user_management_group', {}, 5, 10)
+        self.assertEqual(rows, [(0,)])
+
+    def test_cached_results_follow_the_data(self):
+        query = self.saved_query('SELECT name FROM user_management_group ORDER BY name')
+        self.assertFalse(run_saved_query(query)['cached'])
+        self.assertEqual((run_saved_query(query)['cached'], run_saved_query(query)['rows']), (True, []))
+
+        version = data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Group.objects.create(name='Amani', registration_number='G-2', formation_date=date(2021, 1, 1),
+                                 meeting_schedule='Every Friday', meeting_location='Church')
+            Group.objects.create(name='Tumaini', registration_number='G-3', formation_date=date(2021, 1, 1),
+                                 meeting_schedule='Every Friday', meeting_location='Church')
+        # One bump for the whole transaction, kept in the database
+        self.assertEqual(data_version(), version + 1)
+        cache.clear()
+        self.assertEqual(data_version(), version + 1)
+
+        result = run_saved_query(query)
+        self.assertFalse(result['cached'])
+        self.assertEqual(result['rows'], [['Amani'], ['Tumaini']])
+
+
+class WidgetDataTests(TestCase):
+    """A widget that fails reports its own error; the others still get their data."""
+
+    def setUp(self):
+        cache.clear()
+
+    def add_widget(self, title, data_source):
+        return DashboardWidget.objects.create(title=title, widget_type='METRIC', data_source=data_source)
+
+    def test_a_failing_widget_does_not_break_the_others(self):
+        def broken(config):
+            raise ZeroDivisionError('division by zero')
+
+        # The sources touch no tables: widgets fetched together run on worker threads
+        widgets = [self.add_widget('Members', 'members'), self.add_widget('Broken', 'broken'),
+                   self.add_widget('Unknown', 'missing')]
+        with patch.dict(DATA_SOURCES, members=lambda config: {'value': 40}, broken=broken), \
+                self.assertLogs('reports.widgets', 'ERROR') as logs:
+            members, failed, unknown = get_widgets_data(widgets)
+
+        self.assertEqual(members['data'], {'value': 40})
+        self.assertEqual(failed['error'], "The widget's data could not be loaded.")
+        self.assertEqual(unknown['error'], "Unknown data source 'missing'.")
+        self.assertIn('ZeroDivisionError', logs.output[0])
+
+        # Errors are not cached: the widget is fetched again once it works
+        with patch.dict(DATA_SOURCES, broken=lambda config: {'value': 1}):
+            self.assertEqual(get_widgets_data([widgets[1]])[0]['data'], {'value': 1})
+
+    def test_a_malformed_cache_timeout_falls_back_to_the_default(self):
+        widgets = [self.add_widget(title, 'members') for title in ('Soon', 'Null', 'Valid')]
+        for widget, timeout in zip(widgets, ['soon', None, '60']):
+            widget.config = {'cache_timeout': timeout}
+            widget.save()
+        with patch.dict(DATA_SOURCES, members=lambda config: {'value': 40}):
+            self.assertEqual([row['data'] for row in get_widgets_data(widgets)], [{'value': 40}] * 3)
+            self.assertEqual([row['cached'] for row in get_widgets_data(widgets)], [True] * 3)
+        self.assertEqual([widget_cache_timeout(widget) for widget in widgets], [DEFAULT_CACHE_TIMEOUT] * 2 + [60])
+
+
+class ScheduleClaimTests(TestCase):
+    """A worker keeps its claim while it runs and publishes nothing once the claim is lost."""
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.schedule = ReportSchedule.objects.create(report_title='Loans', report_type='LOAN', frequency='DAILY',
+                                                      next_run_date=self.now - timedelta(hours=1))
+
+    def generated(self, schedule):
+        return Report.objects.create(title=schedule.report_title, report_type='LOAN', report_format='CSV')
+
+    def test_a_refreshed_claim_is_not_taken_over(self):
+        claim_schedules('worker-a', now=self.now)
+        refreshed = self.now + CLAIM_TIMEOUT - timedelta(minutes=5)
+        self.assertTrue(refresh_claim(self.schedule.pk, 'worker-a', now=refreshed))
+
+        self.assertEqual(claim_schedules('worker-b', now=self.now + CLAIM_TIMEOUT + timedelta(minutes=1)), [])
+        self.assertEqual(claim_schedules('worker-b', now=self.now + 2 * CLAIM_TIMEOUT), [self.schedule])
+        self.assertFalse(refresh_claim(self.schedule.pk, 'worker-a'))
+
+    def test_heartbeat_refreshes_the_claim_until_the_block_ends(self):
+        with patch('reports.scheduler.refresh_claim', return_value=True) as refresh:
+            with heartbeat(self.schedule.pk, 'worker-a', interval=timedelta(milliseconds=10)):
+                time.sleep(0.1)
+            beats = refresh.call_count
+            time.sleep(0.05)
+        self.assertGreater(beats, 0)
+        self.assertEqual(refresh.call_count, beats)
+        refresh.assert_called_with(self.schedule.pk, 'worker-a')
+
+    def test_a_run_that_still_holds_its_claim_is_published(self):
+        schedule, = claim_schedules('worker-a', now=self.now)
+        with patch('reports.scheduler.generate_scheduled_report', side_effect=self.generated):
+            run = run_schedule(schedule, 'worker-a')
+
+        self.assertEqual(run.status, 'SUCCEEDED')
+        self.assertTrue(Report.objects.filter(pk=run.report_id).exists())
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.claimed_by, '')
+        self.assertGreater(self.schedule.next_run_date, self.now)
+
+    def test_a_run_whose_claim_was_taken_over_is_discarded(self):
+        schedule, = claim_schedules('worker-a', now=self.now)
+        # worker-a stalled past the timeout and worker-b claimed the schedule
+        claim_schedules('worker-b', now=self.now + CLAIM_TIMEOUT + timedelta(minutes=1))
+        with patch('reports.scheduler.generate_scheduled_report', side_effect=self.generated):
+            run = run_schedule(schedule, 'worker-a')
+
+        self.assertEqual((run.status, run.report), ('ABANDONED', None))
+        self.assertFalse(Report.objects.exists())
+        self.schedule.refresh_from_db()
+        self.assertEqual((self.schedule.claimed_by, self.schedule.next_run_date),
+                         ('worker-b', self.now - timedelta(hours=1)))
+
+
+class ReportExportTests(TestCase):
+    """Exports stream every matching row from one query, as CSV or XLSX, to a response or a file."""
+
+    @classmethod
+    def setUpTestData(cls):
+        savings = SavingsProduct.objects.create(name='Savings', code='SV', description='', interest_rate=0,
+                                                minimum_deposit=0)
+        cls.groups = []
+        for index, name in enumerate(['Umoja', 'Amani']):
+            group = Group.objects.create(name=name, registration_number=f'G-{index}', formation_date=date(2020, 1, 1),
+                                         meeting_schedule='Every Monday', meeting_location='Hall')
+            member = Member.objects.create(first_name='Member', last_name=name, id_number=f'M-{index}', gender='F',
+                                           date_of_birth=date(1990, 1, 1), phone_number='+254711111111',
+                                           physical_address='Village')
+            GroupMembership.objects.create(member=member, group=group)
+            accounts = {
+                'group_savings_account': GroupSavingsAccount.objects.create(group=group, product=savings,
+                                                                            account_number=f'GS-{index}'),
+                'individual_savings_account': IndividualSavingsAccount.objects.create(
+                    member=member, product=savings, account_number=f'IS-{index}'),
+            }
+            for day, (field, account) in enumerate(accounts.items(), start=1):
+                Transaction.objects.create(
+                    transaction_type='DEPOSIT', amount=Decimal('100'), reference_number=f'D-{index}-{day}',
+                    date=timezone.make_aware(datetime(2024, 1, day, 9)), **{field: account},
+                )
+            cls.groups.append(group)
+        cls.user = User.objects.create_user('officer')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, name='transactions', **params):
+        return self.client.get(reverse('reports:export_report', args=[name]), params)
+
+    def csv_rows(self, response):
+        return list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+
+    def test_csv_streams_the_rows_of_one_query(self):
+        response = self.export(group=self.groups[0].pk)
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(1):
+            rows = self.csv_rows(response)
+
+        self.assertEqual(rows[0], GENERATORS['transactions'].headers)
+        # The group's own account and its member's account, in local time
+        self.assertEqual([row[:2] for row in rows[1:]], [['D-0-1', '2024-01-01 09:00:00'],
+                                                         ['D-0-2', '2024-01-02 09:00:00']])
+        self.assertEqual(rows[2][5:7], ['Member', 'Umoja'])
+
+    def test_date_filters(self):
+        rows = self.csv_rows(self.export(date_from='2024-01-02', date_to='2024-01-02'))
+        self.assertEqual([row[0] for row in rows[1:]], ['D-0-2', 'D-1-2'])
+
+    def test_xlsx(self):
+        response = self.export(format='xlsx')
+        sheet = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True).active
+        rows = list(sheet.values)
+        self.assertEqual(list(rows[0]), GENERATORS['transactions'].headers)
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1][3], 100)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.export(format='pdf').status_code, 400)
+        self.assertEqual(self.export(date_from='January').status_code, 400)
+        self.assertEqual(self.export(group='x').status_code, 400)
+        self.assertEqual(self.export('payroll').status_code, 404)
+
+    def test_report_file(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            report = generate_report_file(GENERATORS['memberships'], group=self.groups[1].pk)
+            with open(os.path.join(media_root, report.file_path), newline='') as handle:
+                rows = list(csv.reader(handle))
+        self.assertEqual((report.report_type, report.report_format), ('GROUP', 'CSV'))
+        self.assertEqual([row[:2] for row in rows], [['Group', 'Registration number'], ['Amani', 'G-1']])
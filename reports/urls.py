@@ -4,5 +4,9 @@ from . import views
 app_name = 'reports'
 
 urlpatterns = [
-    # URLs will be added as features are implemented
-] 
\ No newline at end of file
+    path('arrears/', views.arrears_report, name='arrears_report'),
+    path('arrears/export/', views.export_arrears, name='export_arrears'),
+    path('export/<str:name>/', views.export_report, name='export_report'),
+    path('queries/<int:pk>/results/', views.saved_query_results, name='saved_query_results'),
+    path('widgets/data/', views.widget_data, name='widget_data'),
+] 
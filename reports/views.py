@@ -1,3 +1,112 @@
-from django.shortcuts import render
+from django.contrib.auth.decorators import login_required
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
+from user_management.models import FieldOfficer
+from .arrears import DIMENSIONS, export_arrears_report, get_arrears_report, parse_as_of
+from .exports import EXPORT_FORMATS, GENERATORS, export_response, parse_export_filters
+from .models import DashboardWidget, SavedQuery
+from .queries import SavedQueryError, run_saved_query
+from .widgets import get_widgets_data
 
-# Create your views here.
+
+def _arrears_parameters(request):
+    """Read and check the grouping and report date of an arrears request."""
+    params = request.GET if request.method == 'GET' else request.POST
+    dimension = params.get('by', 'group')
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"'by' must be one of: {', '.join(DIMENSIONS)}.")
+    try:
+        as_of = parse_as_of(params.get('as_of'))
+    except ValueError:
+        raise ValueError("'as_of' must be a date in YYYY-MM-DD format.")
+    return dimension, as_of
+
+
+@login_required
+@require_GET
+def arrears_report(request):
+    """Portfolio at risk and arrears aging per group, field officer or product."""
+    try:
+        dimension, as_of = _arrears_parameters(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(get_arrears_report(dimension, as_of))
+
+
+@login_required
+@require_POST
+def export_arrears(request):
+    """Export the arrears report to CSV and record it as a Report."""
+    try:
+        dimension, as_of = _arrears_parameters(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    field_officer = FieldOfficer.objects.filter(user=request.user).first()
+    report = export_arrears_report(dimension, as_of, generated_by=field_officer)
+    
+    return JsonResponse({
+        'id': report.pk,
+        'title': report.title,
+        'file_path': report.file_path,
+    }, status=201)
+
+
+@login_required
+@require_GET
+def export_report(request, name):
+    """Stream a transactions, loans, collections or memberships report as CSV or XLSX."""
+    generator = GENERATORS.get(name)
+    if generator is None:
+        raise Http404("Unknown report.")
+    
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"'format' must be one of: {', '.join(EXPORT_FORMATS)}."}, status=400)
+    
+    try:
+        filters = parse_export_filters(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return export_response(generator, export_format, **filters)
+
+
+@login_required
+@require_GET
+def saved_query_results(request, pk):
+    """Run a saved query with the request's parameters and return its rows."""
+    saved_query = get_object_or_404(SavedQuery, pk=pk)
+    field_officer = FieldOfficer.objects.filter(user=request.user).first()
+    if not (saved_query.is_public or request.user.is_staff
+            or (field_officer and saved_query.created_by_id == field_officer.pk)):
+        return JsonResponse({'error': "You do not have access to this query."}, status=403)
+    
+    try:
+        result = run_saved_query(saved_query, request.GET.dict())
+    except SavedQueryError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(result)
+
+
+@login_required
+@require_GET
+def widget_data(request):
+    """Data for every dashboard widget the user can see, in grid order."""
+    widgets = DashboardWidget.objects.select_related('saved_query').order_by('position_y', 'position_x', 'pk')
+    if not request.user.is_staff:
+        field_officer = FieldOfficer.objects.filter(user=request.user).first()
+        widgets = widgets.filter(Q(is_public=True) | Q(created_by=field_officer) if field_officer
+                                 else Q(is_public=True))
+    
+    if request.GET.get('ids'):
+        try:
+            widgets = widgets.filter(pk__in=[int(pk) for pk in request.GET['ids'].split(',')])
+        except ValueError:
+            return JsonResponse({'error': "'ids' must be a comma-separated list of widget ids."}, status=400)
+    
+    return JsonResponse({'widgets': get_widgets_data(widgets, refresh=request.GET.get('refresh') == '1')})
@@ -0,0 +1,252 @@
+"""
+Data for dashboard widgets.
+
+A widget gets its data from one of three places:
+
+- a built-in data source named in ``data_source`` (see DATA_SOURCES)
+- its saved query
+- the raw SQL in ``query``, which runs through the saved query engine
+
+The data is shaped for the widget type. Charts get ``labels`` plus
+``datasets``, metrics get a single ``value`` and tables get ``columns`` plus
+``rows``.
+
+Each widget's payload is cached on its own, under a key tied to its
+definition. The TTL is ``config["cache_timeout"]``. On a page load the widgets
+that miss the cache are fetched in parallel on a thread pool, so the page
+waits for the slowest widget rather than the sum of all of them.
+"""
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from boosters.models import AgricultureCollection, SchoolFeesCollection
+from dashboard.kpis import get_snapshot
+from tablebanking.models import Loan, Transaction
+from user_management.models import Member
+
+from .arrears import DIMENSIONS, get_arrears_report
+from .models import SavedQuery
+from .queries import SavedQueryError, execute_saved_query, run_saved_query
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_TIMEOUT = 300
+
+# Threads used to fetch widgets that miss the cache
+MAX_WORKERS = 6
+
+DATA_SOURCES = {}
+
+
+def data_source(name):
+    """Register a built-in widget data source under ``name``."""
+    def register(function):
+        DATA_SOURCES[name] = function
+        return function
+    return register
+
+
+def _number(value):
+    return float(value or 0)
+
+
+def _months_back(config):
+    months = int(config.get('months', 12))
+    return (timezone.now() - timedelta(days=31 * months)).date().replace(day=1)
+
+
+@data_source('kpi')
+def kpi_value(config):
+    """One figure from the dashboard KPI snapshot; config: key, measure (count/total)."""
+    row = get_snapshot()[config.get('key', 'total_members')]
+    return {'value': _number(row[config.get('measure', 'count')])}
+
+
+@data_source('loans_by_status')
+def loans_by_status(config):
+    rows = (Loan.objects.values('status').annotate(loans=Count('pk'), principal=Sum('principal_amount'))
+            .order_by('status'))
+    return {
+        'labels': [row['status'] for row in rows],
+        'datasets': [
+            {'label': "Loans", 'data': [row['loans'] for row in rows]},
+            {'label': "Principal", 'data': [_number(row['principal']) for row in rows]},
+        ],
+    }
+
+
+@data_source('savings_by_month')
+def savings_by_month(config):
+    """Deposits and withdrawals per month; config: months (default 12)."""
+    rows = (Transaction.objects.filter(date__date__gte=_months_back(config),
+                                       transaction_type__in=['DEPOSIT', 'WITHDRAWAL'])
+            .annotate(month=TruncMonth('date')).values('month', 'transaction_type')
+            .annotate(total=Sum('amount')).order_by('month'))
+    months = sorted({row['month'].date() for row in rows})
+    totals = {(row['month'].date(), row['transaction_type']): row['total'] for row in rows}
+    return {
+        'labels': [month.strftime('%b %Y') for month in months],
+        'datasets': [
+            {'label': label, 'data': [_number(totals.get((month, kind))) for month in months]}
+            for kind, label in (('DEPOSIT', "Deposits"), ('WITHDRAWAL', "Withdrawals"))
+        ],
+    }
+
+
+@data_source('collections_by_month')
+def collections_by_month(config):
+    """Agriculture and school fees collections per month; config: months (default 12)."""
+    since = _months_back(config)
+    series = {}
+    for label, model, field in (("Agriculture", AgricultureCollection, 'total_value'),
+                                ("School fees", SchoolFeesCollection, 'amount')):
+        rows = (model.objects.filter(collection_date__gte=since).annotate(month=TruncMonth('collection_date'))
+                .values('month').annotate(total=Sum(field)).order_by('month'))
+        series[label] = {row['month']: row['total'] for row in rows}
+    months = sorted({month for totals in series.values() for month in totals})
+    return {
+        'labels': [month.strftime('%b %Y') for month in months],
+        'datasets': [{'label': label, 'data': [_number(totals.get(month)) for month in months]}
+                     for label, totals in series.items()],
+    }
+
+
+@data_source('members_by_gender')
+def members_by_gender(config):
+    rows = (Member.objects.filter(is_active=True).values('gender').annotate(members=Count('pk'))
+            .order_by('gender'))
+    return {
+        'labels': [row['gender'] for row in rows],
+        'datasets': [{'label': "Members", 'data': [row['members'] for row in rows]}],
+    }
+
+
+@data_source('portfolio_at_risk')
+def portfolio_at_risk(config):
+    """PAR ratios per group, field officer or product; config: by (default group)."""
+    dimension = config.get('by', 'group')
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Unknown arrears report dimension '{dimension}'.")
+    rows = get_arrears_report(dimension)['rows']
+    return {
+        'labels': [row['name'] for row in rows],
+        'datasets': [{'label': name.upper(), 'data': [_number(row[f'{name}_ratio']) for row in rows]}
+                     for name in ('par1', 'par30', 'par90')],
+    }
+
+
+def shape_table(widget, result):
+    """Shape a tabular query result (columns and rows) for the widget type."""
+    columns, rows = result['columns'], result['rows']
+    if widget.widget_type == 'METRIC':
+        return {'value': rows[0][0] if rows and rows[0] else None}
+    if widget.widget_type == 'CHART':
+        return {
+            'labels': [row[0] for row in rows],
+            'datasets': [{'label': column, 'data': [_number(row[index]) for row in rows]}
+                         for index, column in enumerate(columns) if index > 0],
+        }
+    return {'columns': columns, 'rows': rows, 'truncated': result['truncated']}
+
+
+def compute_widget_data(widget):
+    """Resolve a widget's data without the cache."""
+    config = widget.config or {}
+    if widget.data_source in DATA_SOURCES:
+        return DATA_SOURCES[widget.data_source](config)
+    if widget.saved_query_id:
+        return shape_table(widget, run_saved_query(widget.saved_query, config.get('parameters')))
+    if widget.query:
+        adhoc = SavedQuery(name=widget.title, sql_query=widget.query)
+        return shape_table(widget, execute_saved_query(adhoc))
+    raise ValueError(f"Unknown data source '{widget.data_source}'.")
+
+
+def widget_cache_key(widget):
+    definition = json.dumps([widget.widget_type, widget.data_source, widget.query, widget.saved_query_id,
+                             widget.config], sort_keys=True, default=str)
+    return f'reports:widget:{widget.pk}:{hashlib.sha256(definition.encode()).hexdigest()}'
+
+
+def widget_cache_timeout(widget):
+    """The widget's TTL in seconds; a missing or malformed ``cache_timeout`` falls back to the default."""
+    try:
+        return int((widget.config or {}).get('cache_timeout', DEFAULT_CACHE_TIMEOUT))
+    except (TypeError, ValueError):
+        return DEFAULT_CACHE_TIMEOUT
+
+
+def _fetch(widget):
+    try:
+        return {'data': compute_widget_data(widget)}, True
+    except (SavedQueryError, ValueError, KeyError) as e:
+        return {'error': str(e)}, False
+    except Exception:
+        # One broken widget must not take the rest of the page down with it
+        logger.exception("Widget %s (%s) failed", widget.pk, widget.title)
+        return {'error': "The widget's data could not be loaded."}, False
+
+
+def _fetch_in_thread(widget):
+    # Worker threads get their own connection; close it before the thread is reused
+    try:
+        return _fetch(widget)
+    finally:
+        connection.close()
+
+
+def get_widgets_data(widgets, refresh=False):
+    """
+    Return the payload of every widget, in the order given.
+
+    Cached payloads are used as they are. The rest are computed at the same
+    time on a thread pool and cached with each widget's own TTL. Errors are
+    reported per widget and are not cached.
+    """
+    widgets = list(widgets)
+    keys = {widget.pk: widget_cache_key(widget) for widget in widgets}
+    cached = {} if refresh else cache.get_many(keys.values())
+
+    payloads = {}
+    missing = []
+    for widget in widgets:
+        if keys[widget.pk] in cached:
+            payloads[widget.pk] = dict(cached[keys[widget.pk]], cached=True)
+        else:
+            missing.append(widget)
+
+    if len(missing) == 1:
+        results = [_fetch(missing[0])]
+    elif missing:
+        with ThreadPoolExecutor(max_workers=min(len(missing), MAX_WORKERS)) as pool:
+            results = list(pool.map(_fetch_in_thread, missing))
+    else:
+        results = []
+
+    for widget, (payload, cacheable) in zip(missing, results):
+        if cacheable:
+            cache.set(keys[widget.pk], payload, widget_cache_timeout(widget))
+        payloads[widget.pk] = dict(payload, cached=False)
+
+    return [
+        {
+            'id': widget.pk,
+            'title': widget.title,
+            'widget_type': widget.widget_type,
+            'chart_type': widget.chart_type,
+            'position': {'x': widget.position_x, 'y': widget.position_y,
+                         'width': widget.width, 'height': widget.height},
+            **payloads[widget.pk],
+        }
+        for widget in widgets
+    ]
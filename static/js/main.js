@@ -31,6 +31,9 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
+    // Participant pickers search the server instead of listing every member
+    document.querySelectorAll('select[data-autocomplete-url]').forEach(initAutocomplete);
+
     // Handle offline mode for forms
     if ('serviceWorker' in navigator && 'SyncManager' in window) {
         // Register forms for background sync
@@ -45,12 +48,13 @@ document.addEventListener('DOMContentLoaded', function() {
                     const formData = new FormData(form);
                     const formObject = {};
                     
+                    // Fields that repeat (checkbox lists) keep every value
                     formData.forEach((value, key) => {
-                        formObject[key] = value;
+                        formObject[key] = key in formObject ? [].concat(formObject[key], value) : value;
                     });
                     
                     // Store form data in IndexedDB
-                    storeForSync(form.id, formObject).then(() => {
+                    storeForSync(form.id, formObject, form.action).then(() => {
                         showOfflineNotification();
                     });
                 }
@@ -59,6 +63,77 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+// Turn a multiple select into a search box; only chosen options live in the select
+function initAutocomplete(select) {
+    const input = document.createElement('input');
+    input.type = 'search';
+    input.className = 'form-control mb-1';
+    input.placeholder = 'Search by name, ID number or phone';
+    const list = document.createElement('div');
+    list.className = 'list-group position-absolute w-100 shadow-sm';
+    list.style.zIndex = 1000;
+    const wrapper = document.createElement('div');
+    wrapper.className = 'position-relative';
+    select.parentNode.insertBefore(wrapper, select);
+    wrapper.append(input, list);
+
+    let timer = null;
+    let cursor = null;
+
+    function search(append) {
+        let url = `${select.dataset.autocompleteUrl}&q=${encodeURIComponent(input.value)}`;
+        if (cursor) {
+            url += `&cursor=${encodeURIComponent(cursor)}`;
+        }
+        fetch(url, { credentials: 'same-origin' })
+            .then(response => response.json())
+            .then(data => {
+                if (!append) {
+                    list.innerHTML = '';
+                }
+                (data.results || []).forEach(result => {
+                    const item = document.createElement('button');
+                    item.type = 'button';
+                    item.className = 'list-group-item list-group-item-action';
+                    item.textContent = result.text;
+                    item.addEventListener('click', () => {
+                        if (!select.querySelector(`option[value="${result.id}"]`)) {
+                            select.add(new Option(result.text, result.id, true, true));
+                        }
+                        list.innerHTML = '';
+                        input.value = '';
+                    });
+                    list.appendChild(item);
+                });
+                if (data.next) {
+                    const more = document.createElement('button');
+                    more.type = 'button';
+                    more.className = 'list-group-item list-group-item-action text-muted';
+                    more.textContent = 'More results...';
+                    more.addEventListener('click', () => {
+                        more.remove();
+                        cursor = data.next;
+                        search(true);
+                    });
+                    list.appendChild(more);
+                }
+            });
+    }
+
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        cursor = null;
+        timer = setTimeout(() => search(false), 300);
+    });
+
+    // Double-click a chosen participant to remove them
+    select.addEventListener('dblclick', event => {
+        if (event.target.tagName === 'OPTION') {
+            event.target.remove();
+        }
+    });
+}
+
 // Function to show offline notification
 function showOfflineNotification() {
     const notification = document.createElement('div');
@@ -76,7 +151,7 @@ function showOfflineNotification() {
 }
 
 // Function to store form data for sync
-async function storeForSync(formId, formData) {
+async function storeForSync(formId, formData, action) {
     // Open IndexedDB
     return new Promise((resolve, reject) => {
         const request = indexedDB.open('ukomboziniDB', 1);
@@ -95,6 +170,7 @@ async function storeForSync(formId, formData) {
             
             const item = {
                 formId: formId,
+                action: action,
                 data: formData,
                 timestamp: new Date().getTime()
             };
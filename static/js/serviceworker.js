@@ -146,47 +146,31 @@ async function syncForms() {
         });
 
         // Get all pending form data
-        const transaction = db.transaction(['pendingFormData'], 'readwrite');
-        const store = transaction.objectStore('pendingFormData');
         const pendingForms = await new Promise((resolve, reject) => {
-            const request = store.getAll();
+            const request = db.transaction(['pendingFormData'], 'readonly')
+                .objectStore('pendingFormData').getAll();
             request.onerror = reject;
             request.onsuccess = event => resolve(event.target.result);
         });
 
-        // Submit each form
-        const results = await Promise.all(pendingForms.map(async formData => {
-            try {
-                // Determine the URL based on form ID
-                const url = formUrlMapping[formData.formId] || '/api/sync-form/';
-                
-                // Send the data
-                const response = await fetch(url, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                        'X-CSRFToken': getCookie('csrftoken'),
-                    },
-                    body: JSON.stringify(formData.data),
-                });
-
-                if (response.ok) {
-                    // If successfully synced, remove from IndexedDB
-                    const delRequest = store.delete(formData.id);
-                    return new Promise((resolve, reject) => {
-                        delRequest.onsuccess = () => resolve(true);
-                        delRequest.onerror = reject;
-                    });
-                }
-                return false;
-            } catch (error) {
-                console.error('Sync error for form:', error);
-                return false;
-            }
-        }));
+        // Offline records go up in batches; anything else is posted form by form
+        const batched = pendingForms.filter(formData => formSyncModels[formData.formId]);
+        const single = pendingForms.filter(formData => !formSyncModels[formData.formId]);
 
-        // Show notification if synced successfully
-        if (results.some(result => result)) {
+        const syncedIds = [
+            ...await syncRecordBatches(batched),
+            ...await syncSingleForms(single),
+        ];
+
+        // Remove everything the server has accepted from IndexedDB
+        if (syncedIds.length) {
+            await new Promise((resolve, reject) => {
+                const transaction = db.transaction(['pendingFormData'], 'readwrite');
+                const store = transaction.objectStore('pendingFormData');
+                syncedIds.forEach(id => store.delete(id));
+                transaction.oncomplete = resolve;
+                transaction.onerror = reject;
+            });
             showSyncNotification();
         }
     } catch (error) {
@@ -194,16 +178,158 @@ async function syncForms() {
     }
 }
 
+// Upload offline records to the batch sync endpoint, SYNC_BATCH_SIZE at a time.
+// Returns the IndexedDB ids of records the server created or already had.
+async function syncRecordBatches(pendingForms) {
+    const syncedIds = [];
+
+    for (let start = 0; start < pendingForms.length; start += SYNC_BATCH_SIZE) {
+        const batch = pendingForms.slice(start, start + SYNC_BATCH_SIZE);
+        try {
+            const response = await fetch('/api/sync/', {
+                method: 'POST',
+                credentials: 'same-origin',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': getCookie('csrftoken'),
+                },
+                body: JSON.stringify({
+                    records: batch.map(formData => ({
+                        model: formSyncModels[formData.formId],
+                        client_id: formData.id,
+                        data: Object.assign({
+                            offline_created_at: new Date(formData.timestamp).toISOString(),
+                        }, formData.data),
+                    })),
+                }),
+            });
+
+            if (!response.ok) {
+                console.error('Batch sync failed with status', response.status);
+                continue;
+            }
+
+            const { results } = await response.json();
+            results.forEach(result => {
+                if (result.status === 'created' || result.status === 'duplicate') {
+                    syncedIds.push(result.client_id);
+                } else {
+                    console.warn('Record not synced:', result);
+                }
+            });
+        } catch (error) {
+            console.error('Sync error for batch:', error);
+        }
+    }
+
+    return syncedIds;
+}
+
+// Post forms that have no batch endpoint one at a time
+async function syncSingleForms(pendingForms) {
+    const results = await Promise.all(pendingForms.map(async formData => {
+        try {
+            // Determine the URL based on form ID
+            const url = formUrlMapping[formData.formId] || '/api/sync-form/';
+
+            const buildPayload = formPayloadBuilders[formData.formId] || (item => item.data);
+
+            // Send the data
+            const response = await fetch(url, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': getCookie('csrftoken'),
+                },
+                body: JSON.stringify(buildPayload(formData)),
+            });
+
+            if (response.ok) {
+                return formData.id;
+            }
+            // The server refused the form itself: sending it again would fail the same
+            // way, so it is dropped. Expired sessions and rate limits are retried.
+            if (response.status >= 400 && response.status < 500 && !RETRIED_STATUSES.includes(response.status)) {
+                console.warn('Form rejected and dropped:', formData.formId, response.status, await response.text());
+                return formData.id;
+            }
+            return null;
+        } catch (error) {
+            console.error('Sync error for form:', error);
+            return null;
+        }
+    }));
+
+    return results.filter(id => id !== null);
+}
+
+// Number of offline records uploaded per request
+const SYNC_BATCH_SIZE = 200;
+
+// Forms whose records are uploaded through the batch sync endpoint, by model
+const formSyncModels = {
+    'savings-form': 'transaction',
+    'payment-form': 'loan_repayment',
+    'agriculture-form': 'agriculture_collection',
+    'school-fees-form': 'school_fees_collection',
+    'booster-payment-form': 'booster_payment',
+};
+
 // Mapping of form IDs to API endpoints
 const formUrlMapping = {
     'member-form': '/api/members/',
     'group-form': '/api/groups/',
     'loan-form': '/api/loans/',
-    'payment-form': '/api/payments/',
-    'savings-form': '/api/savings/',
+    'attendance-form': '/api/attendance/',
     // Add more mappings as needed
 };
 
+// Client errors that can succeed later
+const RETRIED_STATUSES = [401, 408, 429];
+
+// Attendance registers are stored as the page's flat fields: present_members and
+// present_officers list who was there, and arrival_time_, departure_time_ and
+// notes_ fields are suffixed with member_<id> or officer_<id>. The API takes
+// {meeting, mark_completed, attendance: [{member | field_officer, is_present, ...}]}.
+function attendancePayload(formData) {
+    const fields = formData.data;
+    const actionMatch = (formData.action || '').match(/\/meetings\/(\d+)\/attendance\//);
+    const present = {
+        member: [].concat(fields.present_members || []).map(String),
+        officer: [].concat(fields.present_officers || []).map(String),
+    };
+    const entries = {};
+    const entryFor = (prefix, id) => {
+        const key = `${prefix}_${id}`;
+        if (!entries[key]) {
+            entries[key] = {
+                [prefix === 'member' ? 'member' : 'field_officer']: Number(id),
+                is_present: present[prefix].includes(id),
+            };
+        }
+        return entries[key];
+    };
+
+    Object.entries(present).forEach(([prefix, ids]) => ids.forEach(id => entryFor(prefix, id)));
+    Object.entries(fields).forEach(([name, value]) => {
+        const match = name.match(/^(arrival_time|departure_time|notes)_(member|officer)_(\d+)$/);
+        if (match) {
+            entryFor(match[2], match[3])[match[1]] = value;
+        }
+    });
+
+    return {
+        meeting: Number(fields.meeting || (actionMatch && actionMatch[1])),
+        mark_completed: fields.mark_completed === 'true',
+        attendance: Object.values(entries),
+    };
+}
+
+// Forms whose endpoint takes another shape than the form's own fields
+const formPayloadBuilders = {
+    'attendance-form': attendancePayload,
+};
+
 // Helper function to get cookie value
 function getCookie(name) {
     const value = `; ${document.cookie}`;
@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
     SavingsProduct, LoanProduct, IndividualSavingsAccount, GroupSavingsAccount,
-    Transaction, Loan, LoanRepayment
+    Transaction, Loan, LoanInstallment, LoanRepayment, LedgerPosting, BalanceCheckpoint, InterestAccrualRun,
+    LoanPenalty
 )
 
 @admin.register(SavingsProduct)
@@ -20,7 +21,7 @@ class LoanProductAdmin(admin.ModelAdmin):
             'fields': ('name', 'code', 'description', 'is_active')
         }),
         ('Financial Terms', {
-            'fields': ('interest_rate', 'processing_fee', 'minimum_amount', 'maximum_amount')
+            'fields': ('interest_rate', 'interest_method', 'processing_fee', 'minimum_amount', 'maximum_amount')
         }),
         ('Term and Fees', {
             'fields': ('minimum_term', 'maximum_term', 'grace_period', 'late_payment_fee')
@@ -51,6 +52,11 @@ class TransactionAdmin(admin.ModelAdmin):
     search_fields = ('reference_number', 'description')
     date_hierarchy = 'date'
     readonly_fields = ('is_synced',)
+    
+    # Each delete moves its balance back and removes its journal lines (see Transaction.delete)
+    def delete_queryset(self, request, queryset):
+        for txn in queryset:
+            txn.delete()
 
 @admin.register(Loan)
 class LoanAdmin(admin.ModelAdmin):
@@ -69,6 +75,15 @@ class LoanAdmin(admin.ModelAdmin):
             return "Unknown Borrower"
     get_borrower.short_description = 'Borrower'
 
+@admin.register(LoanInstallment)
+class LoanInstallmentAdmin(admin.ModelAdmin):
+    list_display = ('loan', 'installment_number', 'due_date', 'principal_due', 'interest_due', 'penalty_due',
+                   'paid_date')
+    list_filter = ('due_date', 'paid_date')
+    search_fields = ('loan__loan_number',)
+    date_hierarchy = 'due_date'
+    raw_id_fields = ('loan',)
+
 @admin.register(LoanRepayment)
 class LoanRepaymentAdmin(admin.ModelAdmin):
     list_display = ('loan', 'amount', 'payment_date', 'reference_number', 'receipt_issued', 'is_synced')
@@ -76,3 +91,43 @@ class LoanRepaymentAdmin(admin.ModelAdmin):
     search_fields = ('reference_number', 'loan__loan_number')
     date_hierarchy = 'payment_date'
     readonly_fields = ('is_synced',)
+
+@admin.register(LedgerPosting)
+class LedgerPostingAdmin(admin.ModelAdmin):
+    list_display = ('transaction', 'account_code', 'entry_type', 'debit', 'credit', 'effective_date',
+                   'is_reversal')
+    list_filter = ('account_code', 'entry_type', 'is_reversal', 'effective_date')
+    search_fields = ('transaction__reference_number',)
+    date_hierarchy = 'effective_date'
+    raw_id_fields = ('transaction', 'individual_savings_account', 'group_savings_account')
+    
+    # The journal is append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(BalanceCheckpoint)
+class BalanceCheckpointAdmin(admin.ModelAdmin):
+    list_display = ('individual_savings_account', 'group_savings_account', 'as_of', 'balance', 'created_date')
+    list_filter = ('as_of',)
+    date_hierarchy = 'as_of'
+    raw_id_fields = ('individual_savings_account', 'group_savings_account')
+
+@admin.register(InterestAccrualRun)
+class InterestAccrualRunAdmin(admin.ModelAdmin):
+    list_display = ('frequency', 'period_start', 'period_end', 'accounts_credited', 'total_interest',
+                    'started_at', 'completed_at')
+    list_filter = ('frequency',)
+    date_hierarchy = 'period_start'
+    readonly_fields = ('last_individual_account_id', 'last_group_account_id', 'accounts_credited',
+                       'total_interest', 'started_at', 'completed_at')
+
+
+@admin.register(LoanPenalty)
+class LoanPenaltyAdmin(admin.ModelAdmin):
+    list_display = ('loan', 'installment', 'amount', 'days_overdue', 'assessed_on')
+    date_hierarchy = 'assessed_on'
+    search_fields = ('loan__loan_number',)
+    raw_id_fields = ('loan', 'installment')
@@ -0,0 +1,195 @@
+"""
+Loan amortization schedules.
+
+Schedules are computed for many loans at once with NumPy. Each loan is one row
+of an array and each installment is one column, and all amounts are integer
+cents. Only the annuity balance recurrence loops, and it loops over
+installment numbers (at most the longest term), never over loans.
+
+Methods:
+    FLAT      - interest on the original principal, spread evenly; equal principal.
+    DECLINING - equal principal; interest on the balance outstanding each month.
+    ANNUITY   - equal total installments; interest on the outstanding balance.
+
+Rounding remainders always go on the final installment, so each schedule
+adds up exactly to the principal and total interest.
+"""
+from decimal import Decimal
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from django.db import transaction as db_transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from .models import Loan, LoanInstallment
+
+
+# Loan statuses that carry a repayment schedule
+SCHEDULED_STATUSES = ('DISBURSED', 'ACTIVE', 'COMPLETED', 'DEFAULTED')
+
+CENT = Decimal('0.01')
+
+
+def _to_cents(values):
+    return np.array([int((Decimal(value) * 100).to_integral_value()) for value in values], dtype=np.int64)
+
+
+def _from_cents(value):
+    return (Decimal(int(value)) * CENT).quantize(CENT)
+
+
+def compute_schedules(principals, annual_rates, terms, methods):
+    """
+    Compute principal and interest for every installment of many loans.
+
+    Arguments are equal-length sequences (principal amounts, annual rates in
+    percent, terms in months and method codes). Returns a pair of int64 cent
+    arrays of shape (loans, longest term); columns beyond a loan's term are 0.
+    """
+    principal = _to_cents(principals)
+    rate = np.array([float(value) for value in annual_rates], dtype=np.float64) / 100
+    term = np.maximum(np.array(terms, dtype=np.int64), 1)
+    methods = np.array(methods)
+
+    count = len(principal)
+    longest = int(term.max()) if count else 0
+    number = np.arange(1, longest + 1)
+    in_term = number[np.newaxis, :] <= term[:, np.newaxis]
+    rows = np.arange(count)
+    last = term - 1
+    monthly = rate / 12
+
+    # Equal principal per installment, remainder on the last one (FLAT and DECLINING)
+    base = principal // term
+    principal_due = np.where(in_term, base[:, np.newaxis], 0)
+    principal_due[rows, last] += principal - base * term
+
+    # FLAT: the Loan.save() simple-interest total, spread evenly
+    flat_total = np.rint(principal * rate * term / 12).astype(np.int64)
+    flat_base = flat_total // term
+    flat_interest = np.where(in_term, flat_base[:, np.newaxis], 0)
+    flat_interest[rows, last] += flat_total - flat_base * term
+
+    # DECLINING: interest on the balance outstanding at the start of each month
+    opening = principal[:, np.newaxis] - np.cumsum(principal_due, axis=1) + principal_due
+    declining_interest = np.where(in_term, np.rint(opening * monthly[:, np.newaxis]), 0).astype(np.int64)
+
+    # ANNUITY: fixed payment, recurrence over the installment columns
+    annuity_principal = np.zeros((count, longest), dtype=np.int64)
+    annuity_interest = np.zeros((count, longest), dtype=np.int64)
+    is_annuity = methods == 'ANNUITY'
+    if is_annuity.any():
+        with np.errstate(divide='ignore', invalid='ignore'):
+            factor = np.where(monthly > 0, monthly / (1 - (1 + monthly) ** -term), 1 / term)
+        payment = np.rint(principal * factor).astype(np.int64)
+        balance = principal.copy()
+        for column in range(longest):
+            active = column < term
+            interest = np.where(active, np.rint(balance * monthly), 0).astype(np.int64)
+            paid = np.where(column == last, balance, np.minimum(payment - interest, balance))
+            paid = np.where(active, paid, 0)
+            annuity_interest[:, column] = interest
+            annuity_principal[:, column] = paid
+            balance = balance - paid
+
+    principal_out = np.where(is_annuity[:, np.newaxis], annuity_principal, principal_due)
+    interest_out = np.select(
+        [methods[:, np.newaxis] == 'DECLINING', is_annuity[:, np.newaxis]],
+        [declining_interest, annuity_interest],
+        default=flat_interest,
+    )
+    return principal_out, interest_out
+
+
+def loan_total_interest(loan):
+    """Total interest over the life of a single (possibly unsaved) loan."""
+    method = loan.interest_method or loan.loan_product.interest_method
+    _, interest = compute_schedules([loan.principal_amount], [loan.interest_rate], [loan.term_months], [method])
+    return _from_cents(interest.sum())
+
+
+def _due_dates(start, term, cache):
+    key = (start, term)
+    if key not in cache:
+        cache[key] = [start + relativedelta(months=number) for number in range(1, term + 1)]
+    return cache[key]
+
+
+def build_installments(loan_rows):
+    """
+    Build unsaved LoanInstallment rows for many loans.
+
+    ``loan_rows`` is a list of dicts with id, principal_amount, interest_rate,
+    term_months, method and disbursement_date.
+    """
+    if not loan_rows:
+        return []
+
+    principal, interest = compute_schedules(
+        [row['principal_amount'] for row in loan_rows],
+        [row['interest_rate'] for row in loan_rows],
+        [row['term_months'] for row in loan_rows],
+        [row['method'] for row in loan_rows],
+    )
+
+    # Loans disbursed on the same day share their due dates
+    date_cache = {}
+    installments = []
+    for index, row in enumerate(loan_rows):
+        term = max(row['term_months'], 1)
+        start = row['disbursement_date'] or timezone.localdate()
+        for column, due_date in enumerate(_due_dates(start, term, date_cache)):
+            installments.append(LoanInstallment(
+                loan_id=row['id'],
+                installment_number=column + 1,
+                due_date=due_date,
+                principal_due=_from_cents(principal[index, column]),
+                interest_due=_from_cents(interest[index, column]),
+            ))
+    return installments
+
+
+def _loan_rows(queryset):
+    return list(queryset.annotate(
+        method=Coalesce(NullIf(F('interest_method'), Value('')), F('loan_product__interest_method')),
+    ).values('id', 'principal_amount', 'interest_rate', 'term_months', 'method', 'disbursement_date'))
+
+
+def generate_schedule(loan):
+    """(Re)build the installment schedule of one saved loan."""
+    return generate_schedules(Loan.objects.filter(pk=loan.pk), replace=True)
+
+
+def generate_schedules(queryset=None, replace=False, batch_size=5000):
+    """
+    Build schedules for a set of loans; by default every disbursed loan without one.
+
+    With ``replace`` existing schedules are deleted and rebuilt, except for
+    loans that already have payments allocated to an installment. Loans are
+    processed ``batch_size`` at a time, each batch with one bulk insert.
+    Returns the number of installments written.
+    """
+    if queryset is None:
+        queryset = Loan.objects.filter(status__in=SCHEDULED_STATUSES, disbursement_date__isnull=False)
+
+    if replace:
+        paid = LoanInstallment.objects.filter(
+            loan__in=queryset.values('pk'),
+        ).exclude(principal_paid=0, interest_paid=0, penalty_paid=0).values('loan_id')
+        queryset = queryset.exclude(pk__in=paid)
+    else:
+        queryset = queryset.filter(installments__isnull=True)
+
+    loan_ids = list(queryset.order_by('pk').values_list('pk', flat=True).distinct())
+    written = 0
+    for start in range(0, len(loan_ids), batch_size):
+        batch = loan_ids[start:start + batch_size]
+        installments = build_installments(_loan_rows(Loan.objects.filter(pk__in=batch)))
+        with db_transaction.atomic():
+            if replace:
+                LoanInstallment.objects.filter(loan_id__in=batch).delete()
+            LoanInstallment.objects.bulk_create(installments, batch_size=2000)
+        written += len(installments)
+    return written
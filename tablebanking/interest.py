@@ -0,0 +1,178 @@
+"""
+Interest accrual on savings balances.
+
+For each daily or monthly period every active individual and group savings
+account whose product pays interest is credited with an INTEREST_EARNED
+transaction. Each day of the period earns the balance at the end of that
+day times the product's annual rate over 365; the days are added up and
+rounded to the cent once. A day with a zero or negative balance earns
+nothing. An institution accrues either daily or monthly: a period that
+overlaps one already accrued at the other frequency is refused.
+
+Accounts are processed in chunks in id order. For each chunk one query reads
+the balances and rates and one grouped query reads the postings made since
+the period began, per account and day. The daily balances of the whole
+chunk are then worked back from the current balance with NumPy in integer
+cents, and the transactions go in with one bulk insert and one journal
+posting (see tablebanking.ledger). The period's InterestAccrualRun is
+locked and moved past the chunk in the same database transaction, so a run
+that stops half way resumes at the next chunk and a finished period is never
+credited twice.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction as db_transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .ledger import ACCOUNT_FIELDS, post_transactions
+from .models import InterestAccrualRun, LedgerPosting, Transaction
+
+
+CHUNK_SIZE = 5000
+
+DAYS_IN_YEAR = 365
+
+CENT = Decimal('0.01')
+
+# Run field holding how far each kind of account has been credited, and the
+# letter that marks it in reference numbers
+RUN_CURSORS = {
+    'individual_savings_account': ('last_individual_account_id', 'I'),
+    'group_savings_account': ('last_group_account_id', 'G'),
+}
+
+
+def accrual_period(frequency, day):
+    """The (first, last) day of the daily or monthly period that contains ``day``."""
+    if frequency == 'DAILY':
+        return day, day
+    if frequency == 'MONTHLY':
+        start = day.replace(day=1)
+        return start, (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+    raise ValueError(f"Unknown accrual frequency '{frequency}'.")
+
+
+def last_complete_period(frequency, today=None):
+    """The latest period that has fully ended: yesterday, or last month."""
+    today = today or timezone.localdate()
+    if frequency == 'MONTHLY':
+        return accrual_period(frequency, today.replace(day=1) - timedelta(days=1))
+    return accrual_period(frequency, today - timedelta(days=1))
+
+
+def compute_interest(daily_balances, rates):
+    """
+    Interest in cents for many accounts at once.
+
+    ``daily_balances`` holds one row of end-of-day balances in integer cents
+    per account and ``rates`` the accounts' annual percentages in hundredths
+    (525 for 5.25%). Half a cent rounds up.
+    """
+    balances = np.maximum(np.atleast_2d(np.asarray(daily_balances, dtype=np.int64)), 0)
+    numerator = balances.sum(axis=1) * np.asarray(rates, dtype=np.int64)
+    denominator = 100 * 100 * DAYS_IN_YEAR
+    return (numerator + denominator // 2) // denominator
+
+
+def daily_balances(closing, movements):
+    """
+    End-of-day balances from each account's balance at the end of the period.
+
+    ``closing`` holds the accounts' closing balances and ``movements`` their
+    net postings per day of the period (both in cents); a day's balance is
+    the closing balance less everything posted on the days after it.
+    """
+    movements = np.asarray(movements, dtype=np.int64)
+    later = movements.sum(axis=1, keepdims=True) - np.cumsum(movements, axis=1)
+    return np.asarray(closing, dtype=np.int64)[:, None] - later
+
+
+def _cents(value):
+    return int((Decimal(value) * 100).to_integral_value())
+
+
+def _accrue_chunk(run_id, model, field, period_from, as_of, chunk_size):
+    """Credit the next chunk of accounts of one kind. Returns False once none are left."""
+    cursor_field, code = RUN_CURSORS[field]
+    with db_transaction.atomic():
+        run = InterestAccrualRun.objects.select_for_update().get(pk=run_id)
+        rows = list(model.objects.filter(
+            pk__gt=getattr(run, cursor_field), is_active=True, date_opened__lte=run.period_end,
+            product__interest_rate__gt=0,
+        ).order_by('pk').values_list('pk', 'current_balance', 'product__interest_rate')[:chunk_size])
+        if not rows:
+            return False
+
+        ids = [pk for pk, _, _ in rows]
+        index = {pk: position for position, pk in enumerate(ids)}
+        days = (run.period_end - run.period_start).days + 1
+        # Net postings per day of the period, and after it in the last column
+        movements = np.zeros((len(ids), days + 1), dtype=np.int64)
+        postings = (LedgerPosting.objects
+                    .filter(**{f'{field}_id__in': ids}, account_code='SAVINGS', effective_date__gte=period_from)
+                    .values(f'{field}_id', day=TruncDate('effective_date'))
+                    .annotate(credit=Sum('credit'), debit=Sum('debit')).order_by())
+        for row in postings:
+            column = min((row['day'] - run.period_start).days, days)
+            movements[index[row[f'{field}_id']], column] += _cents((row['credit'] or 0) - (row['debit'] or 0))
+
+        closing = np.array([_cents(balance) for _, balance, _ in rows], dtype=np.int64) - movements[:, days]
+        interest = compute_interest(daily_balances(closing, movements[:, :days]),
+                                    [_cents(rate) for _, _, rate in rows])
+
+        period = f"{run.frequency[0]}{run.period_start:%Y%m%d}"
+        description = f"Interest {run.period_start} to {run.period_end}"
+        transactions = Transaction.objects.bulk_create([
+            Transaction(
+                transaction_type='INTEREST_EARNED', amount=Decimal(int(cents)) * CENT, date=as_of,
+                description=description, reference_number=f"INT-{period}-{code}{pk}", **{f'{field}_id': pk},
+            )
+            for pk, cents in zip(ids, interest) if cents > 0
+        ])
+        # bulk_create bypasses Transaction.save(), so the chunk is posted to the journal here
+        post_transactions(transactions)
+
+        setattr(run, cursor_field, ids[-1])
+        run.accounts_credited += len(transactions)
+        run.total_interest += sum((txn.amount for txn in transactions), Decimal('0'))
+        run.save(update_fields=[cursor_field, 'accounts_credited', 'total_interest'])
+    return True
+
+
+def accrue_interest(frequency='MONTHLY', day=None, chunk_size=CHUNK_SIZE):
+    """
+    Credit interest for the period containing ``day`` (by default the last complete one).
+
+    Returns the period's InterestAccrualRun. Running a completed period again
+    does nothing; running an interrupted one finishes it.
+    """
+    if day is None:
+        start, end = last_complete_period(frequency)
+    else:
+        start, end = accrual_period(frequency, day)
+    if end >= timezone.localdate():
+        raise ValueError("Interest can only be accrued for a period that has ended.")
+
+    overlapping = (InterestAccrualRun.objects.exclude(frequency=frequency)
+                   .filter(period_start__lte=end, period_end__gte=start).first())
+    if overlapping:
+        raise ValueError(f"{start} to {end} overlaps {overlapping}; interest is accrued at one frequency only.")
+
+    run, _ = InterestAccrualRun.objects.get_or_create(frequency=frequency, period_start=start,
+                                                      defaults={'period_end': end})
+    if run.completed_at:
+        return run
+
+    period_from = timezone.make_aware(datetime.combine(start, time.min))
+    as_of = timezone.make_aware(datetime.combine(end, time.max))
+    for model, field in ACCOUNT_FIELDS:
+        while _accrue_chunk(run.pk, model, field, period_from, as_of, chunk_size):
+            pass
+
+    InterestAccrualRun.objects.filter(pk=run.pk).update(completed_at=timezone.now())
+    run.refresh_from_db()
+    return run
@@ -0,0 +1,356 @@
+"""
+Double-entry posting journal for savings accounts.
+
+Every Transaction is posted as a balanced pair of LedgerPosting lines: one on
+the member/group savings account and a contra line on an internal account.
+Fees paid in cash belong to no savings account; they are posted from CASH to
+FEE_INCOME and move no balance.
+Account balances are moved in the same database transaction with F()
+expressions while the account rows are locked, so concurrent postings never
+lose updates. BalanceCheckpoint rows let an as-of-date balance be answered
+with one checkpoint read plus a scan of the postings made after it.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, DecimalField, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.utils import timezone
+
+from .models import BalanceCheckpoint, GroupSavingsAccount, IndividualSavingsAccount, LedgerPosting
+from .signals import balance_changed
+
+
+# Direction a transaction type moves the savings account (+1 credits it, -1
+# debits it) and the internal account the contra line is posted to. A
+# direction of None follows the sign of the transaction amount.
+POSTING_RULES = {
+    'DEPOSIT': (1, 'CASH'),
+    'WITHDRAWAL': (-1, 'CASH'),
+    'LOAN_DISBURSEMENT': (1, 'LOANS_RECEIVABLE'),
+    'LOAN_REPAYMENT': (-1, 'LOANS_RECEIVABLE'),
+    'INTEREST_EARNED': (1, 'INTEREST_EXPENSE'),
+    'INTEREST_PAID': (-1, 'INTEREST_INCOME'),
+    'FEE': (-1, 'FEE_INCOME'),
+    'TRANSFER': (None, 'SUSPENSE'),
+    'OTHER': (None, 'SUSPENSE'),
+}
+
+# Transaction types posted from CASH when they belong to no savings account,
+# and the internal account credited
+CASH_RULES = {
+    'FEE': 'FEE_INCOME',
+}
+
+# Savings account models and the foreign key that points at them from
+# Transaction, LedgerPosting and BalanceCheckpoint
+ACCOUNT_FIELDS = (
+    (IndividualSavingsAccount, 'individual_savings_account'),
+    (GroupSavingsAccount, 'group_savings_account'),
+)
+
+ZERO = Decimal('0.00')
+
+
+def account_field_for(account):
+    """Return the foreign key name used to reference the given savings account."""
+    for model, field in ACCOUNT_FIELDS:
+        if isinstance(account, model):
+            return field
+    raise TypeError(f"{account!r} is not a savings account")
+
+
+def _account_key(txn):
+    """Return (model, account_id) for the savings account a transaction belongs to."""
+    for model, field in ACCOUNT_FIELDS:
+        account_id = getattr(txn, f'{field}_id')
+        if account_id:
+            return model, account_id
+    return None
+
+
+def balance_effect(txn):
+    """Signed change a transaction makes to its savings account balance."""
+    direction, _ = POSTING_RULES.get(txn.transaction_type, (None, 'SUSPENSE'))
+    amount = Decimal(txn.amount)
+    if direction is None:
+        return amount
+    return abs(amount) * direction
+
+
+def build_postings(txn):
+    """Return the unsaved, balanced pair of journal lines for a transaction."""
+    key = _account_key(txn)
+    if key is None:
+        return _cash_postings(txn)
+
+    effect = balance_effect(txn)
+    if not effect:
+        return []
+
+    _, contra_code = POSTING_RULES.get(txn.transaction_type, (None, 'SUSPENSE'))
+    amount = abs(effect)
+    savings_side, contra_side = ('CREDIT', 'DEBIT') if effect > 0 else ('DEBIT', 'CREDIT')
+    posted_at = timezone.now()
+
+    savings_line = LedgerPosting(
+        transaction=txn,
+        account_code='SAVINGS',
+        individual_savings_account_id=txn.individual_savings_account_id,
+        group_savings_account_id=txn.group_savings_account_id,
+        entry_type=savings_side,
+        effective_date=txn.date,
+        posted_at=posted_at,
+    )
+    contra_line = LedgerPosting(
+        transaction=txn,
+        account_code=contra_code,
+        individual_savings_account_id=txn.individual_savings_account_id,
+        group_savings_account_id=txn.group_savings_account_id,
+        entry_type=contra_side,
+        effective_date=txn.date,
+        posted_at=posted_at,
+    )
+    for line in (savings_line, contra_line):
+        if line.entry_type == 'DEBIT':
+            line.debit = amount
+        else:
+            line.credit = amount
+    return [savings_line, contra_line]
+
+
+def _cash_postings(txn):
+    # A cash payment to an internal account: debit CASH, credit the income account
+    amount = abs(Decimal(txn.amount))
+    if txn.transaction_type not in CASH_RULES or not amount:
+        return []
+    posted_at = timezone.now()
+    return [
+        LedgerPosting(transaction=txn, account_code='CASH', entry_type='DEBIT', debit=amount,
+                      effective_date=txn.date, posted_at=posted_at),
+        LedgerPosting(transaction=txn, account_code=CASH_RULES[txn.transaction_type], entry_type='CREDIT',
+                      credit=amount, effective_date=txn.date, posted_at=posted_at),
+    ]
+
+
+def apply_balance_deltas(deltas):
+    """
+    Move savings balances by the given amounts.
+
+    ``deltas`` maps (model, account_id) to a (Decimal change, effective date)
+    pair. Rows are locked in primary key order and every account of a model is
+    updated with a single UPDATE, so a batch costs a fixed number of queries.
+    Checkpoints at or after the effective date are dropped because they no
+    longer reflect the journal.
+    """
+    by_model = defaultdict(dict)
+    for (model, account_id), (amount, effective_date) in deltas.items():
+        if amount:
+            by_model[model][account_id] = (amount, effective_date)
+
+    for model, field in ACCOUNT_FIELDS:
+        changes = by_model.get(model)
+        if not changes:
+            continue
+
+        locked = (model.objects.select_for_update()
+                  .filter(pk__in=changes.keys()).order_by('pk')
+                  .values_list('pk', 'is_active'))
+        active_ids = {pk for pk, is_active in locked if is_active}
+
+        model.objects.filter(pk__in=changes.keys()).update(current_balance=F('current_balance') + Case(
+            *[When(pk=pk, then=Value(amount)) for pk, (amount, _) in changes.items()],
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ))
+
+        stale = Q()
+        for pk, (_, effective_date) in changes.items():
+            stale |= Q(**{f'{field}_id': pk, 'as_of__gte': effective_date})
+        BalanceCheckpoint.objects.filter(stale).delete()
+
+        balance_changed.send(
+            sender=model,
+            deltas={pk: amount for pk, (amount, _) in changes.items()},
+            active_delta=sum((amount for pk, (amount, _) in changes.items() if pk in active_ids), ZERO),
+        )
+
+
+def post_transactions(transactions):
+    """
+    Post a batch of saved transactions to the journal and update balances.
+
+    All lines are written with one bulk insert and balances move with one
+    UPDATE per account model.
+    """
+    postings = []
+    deltas = {}
+    for txn in transactions:
+        lines = build_postings(txn)
+        if not lines:
+            continue
+        postings.extend(lines)
+        key = _account_key(txn)
+        if key is None:
+            continue
+        amount, effective_date = deltas.get(key, (ZERO, txn.date))
+        deltas[key] = (amount + balance_effect(txn), min(effective_date, txn.date))
+
+    if not postings:
+        return []
+
+    with db_transaction.atomic():
+        LedgerPosting.objects.bulk_create(postings)
+        apply_balance_deltas(deltas)
+    return postings
+
+
+def post_transaction(txn):
+    """Post a single saved transaction to the journal."""
+    return post_transactions([txn])
+
+
+def reverse_postings(txn):
+    """
+    Cancel out everything currently posted for a transaction.
+
+    The journal is never edited; instead opposite lines are appended at the
+    original effective dates so the transaction's net effect becomes zero.
+    """
+    nets = (LedgerPosting.objects.filter(transaction=txn)
+            .values('account_code', 'individual_savings_account_id', 'group_savings_account_id',
+                    'effective_date')
+            .annotate(net=Sum('credit') - Sum('debit')))
+
+    reversals = []
+    deltas = {}
+    posted_at = timezone.now()
+    for row in nets:
+        net = row['net'] or ZERO
+        if not net:
+            continue
+        line = LedgerPosting(
+            transaction=txn,
+            account_code=row['account_code'],
+            individual_savings_account_id=row['individual_savings_account_id'],
+            group_savings_account_id=row['group_savings_account_id'],
+            entry_type='DEBIT' if net > 0 else 'CREDIT',
+            debit=net if net > 0 else ZERO,
+            credit=-net if net < 0 else ZERO,
+            effective_date=row['effective_date'],
+            posted_at=posted_at,
+            is_reversal=True,
+        )
+        reversals.append(line)
+
+        if row['account_code'] == 'SAVINGS':
+            for model, field in ACCOUNT_FIELDS:
+                account_id = row[f'{field}_id']
+                if account_id:
+                    amount, effective_date = deltas.get((model, account_id), (ZERO, row['effective_date']))
+                    deltas[(model, account_id)] = (amount - net, min(effective_date, row['effective_date']))
+
+    if reversals:
+        with db_transaction.atomic():
+            LedgerPosting.objects.bulk_create(reversals)
+            apply_balance_deltas(deltas)
+    return reversals
+
+
+def remove_postings(txn):
+    """
+    Take a transaction out of the journal before it is deleted.
+
+    Its net effect is reversed first, which moves the account balance back,
+    and then all of its lines are deleted.
+    """
+    with db_transaction.atomic():
+        reverse_postings(txn)
+        LedgerPosting.objects.filter(transaction=txn).delete()
+
+
+def _journal_total(postings):
+    totals = postings.aggregate(credit=Sum('credit'), debit=Sum('debit'))
+    return (totals['credit'] or ZERO) - (totals['debit'] or ZERO)
+
+
+def balance_as_of(account, as_of):
+    """
+    Balance of a savings account at a point in time.
+
+    Reads the latest checkpoint at or before ``as_of`` and adds the postings
+    made between the checkpoint and ``as_of``.
+    """
+    field = account_field_for(account)
+    checkpoint = (BalanceCheckpoint.objects.filter(**{field: account}, as_of__lte=as_of)
+                  .order_by('-as_of').first())
+
+    tail = LedgerPosting.objects.filter(**{field: account}, account_code='SAVINGS', effective_date__lte=as_of)
+    opening = ZERO
+    if checkpoint:
+        tail = tail.filter(effective_date__gt=checkpoint.as_of)
+        opening = checkpoint.balance
+    return opening + _journal_total(tail)
+
+
+def create_checkpoints(as_of):
+    """
+    Write a checkpoint at ``as_of`` for every savings account.
+
+    Each account starts from its latest earlier checkpoint; accounts sharing
+    the same previous checkpoint time are summed with one grouped query.
+    Returns the number of checkpoints created.
+    """
+    created = 0
+    for model, field in ACCOUNT_FIELDS:
+        previous = (BalanceCheckpoint.objects.filter(**{field: OuterRef('pk')}, as_of__lte=as_of)
+                    .order_by('-as_of'))
+        accounts = model.objects.annotate(
+            checkpoint_as_of=Subquery(previous.values('as_of')[:1]),
+            checkpoint_balance=Subquery(previous.values('balance')[:1]),
+        ).values('pk', 'checkpoint_as_of', 'checkpoint_balance')
+
+        # Group accounts by the time of their previous checkpoint
+        cohorts = defaultdict(dict)
+        for row in accounts:
+            if row['checkpoint_as_of'] == as_of:
+                continue
+            cohorts[row['checkpoint_as_of']][row['pk']] = row['checkpoint_balance'] or ZERO
+
+        checkpoints = []
+        for since, openings in cohorts.items():
+            postings = LedgerPosting.objects.filter(**{f'{field}_id__in': openings.keys()},
+                                                    account_code='SAVINGS', effective_date__lte=as_of)
+            if since is not None:
+                postings = postings.filter(effective_date__gt=since)
+            tails = {
+                row[f'{field}_id']: (row['credit'] or ZERO) - (row['debit'] or ZERO)
+                for row in postings.values(f'{field}_id').annotate(credit=Sum('credit'), debit=Sum('debit'))
+            }
+            for pk, opening in openings.items():
+                checkpoints.append(BalanceCheckpoint(
+                    **{f'{field}_id': pk}, as_of=as_of, balance=opening + tails.get(pk, ZERO),
+                ))
+
+        BalanceCheckpoint.objects.bulk_create(checkpoints, batch_size=1000)
+        created += len(checkpoints)
+    return created
+
+
+def find_balance_mismatches():
+    """
+    Compare each account's current_balance with the total of its journal.
+
+    Returns a list of (account, current_balance, journal_balance) tuples.
+    """
+    mismatches = []
+    for model, field in ACCOUNT_FIELDS:
+        journal = {
+            row[f'{field}_id']: (row['credit'] or ZERO) - (row['debit'] or ZERO)
+            for row in (LedgerPosting.objects.filter(**{f'{field}__isnull': False}, account_code='SAVINGS')
+                        .values(f'{field}_id').annotate(credit=Sum('credit'), debit=Sum('debit')))
+        }
+        for account in model.objects.only('pk', 'account_number', 'current_balance'):
+            expected = journal.get(account.pk, ZERO)
+            if account.current_balance != expected:
+                mismatches.append((account, account.current_balance, expected))
+    return mismatches
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tablebanking.interest import CHUNK_SIZE, accrue_interest
+
+
+class Command(BaseCommand):
+    help = "Credit savings interest for a daily or monthly period; safe to rerun and resumes an interrupted run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--frequency', choices=['daily', 'monthly'], default='monthly')
+        parser.add_argument('--period', help="Any day (YYYY-MM-DD) in the period to accrue. "
+                                             "Defaults to the last complete period.")
+        parser.add_argument('--chunk-size', dest='chunk_size', type=int, default=CHUNK_SIZE,
+                            help="Accounts credited per database transaction.")
+
+    def handle(self, *args, **options):
+        day = None
+        if options['period']:
+            try:
+                day = datetime.strptime(options['period'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--period must be in YYYY-MM-DD format.")
+
+        try:
+            run = accrue_interest(options['frequency'].upper(), day, chunk_size=options['chunk_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"{run}: {run.accounts_credited} account(s) credited {run.total_interest} in interest."
+        ))
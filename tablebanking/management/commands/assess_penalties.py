@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tablebanking.penalties import assess_penalties
+
+
+class Command(BaseCommand):
+    help = "Charge late fees on overdue loan installments past their product's grace period; safe to rerun."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Assessment date (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument('--dry-run', dest='dry_run', action='store_true',
+                            help="List the fees that would be charged without charging them.")
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--date must be in YYYY-MM-DD format.")
+        else:
+            day = timezone.localdate()
+
+        result = assess_penalties(day, dry_run=options['dry_run'])
+        if options['dry_run']:
+            for charge in result['charges']:
+                self.stdout.write(f"{charge['loan']} #{charge['installment']}: due {charge['due_date']}, "
+                                  f"{charge['days_overdue']} day(s) overdue, fee {charge['amount']}")
+        verb = "Would charge" if options['dry_run'] else "Charged"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['total']} in late fees on {result['installments']} installment(s) "
+            f"of {result['loans']} loan(s) as of {day}."
+        ))
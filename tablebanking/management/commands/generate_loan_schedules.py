@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from tablebanking.amortization import SCHEDULED_STATUSES, generate_schedules
+from tablebanking.models import Loan
+
+
+class Command(BaseCommand):
+    help = "Generate amortization schedules for disbursed loans (by default only loans without one)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loan', action='append', dest='loan_numbers',
+                            help="Only process the loan with this number (may be repeated).")
+        parser.add_argument('--replace', action='store_true',
+                            help="Rebuild existing schedules that have no payments allocated yet.")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Number of loans computed and inserted per batch.")
+
+    def handle(self, *args, **options):
+        loans = Loan.objects.filter(status__in=SCHEDULED_STATUSES, disbursement_date__isnull=False)
+        if options['loan_numbers']:
+            loans = loans.filter(loan_number__in=options['loan_numbers'])
+
+        written = generate_schedules(loans, replace=options['replace'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} installment(s)."))
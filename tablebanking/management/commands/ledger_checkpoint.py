@@ -0,0 +1,39 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tablebanking import ledger
+
+
+class Command(BaseCommand):
+    help = "Write savings balance checkpoints from the posting journal, or verify balances against it."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', dest='as_of',
+                            help="Checkpoint date (YYYY-MM-DD); balances are taken at the end of that day. "
+                                 "Defaults to the end of yesterday.")
+        parser.add_argument('--verify', action='store_true',
+                            help="Report accounts whose current_balance differs from the journal.")
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            mismatches = ledger.find_balance_mismatches()
+            if not mismatches:
+                self.stdout.write(self.style.SUCCESS("All savings balances match the posting journal."))
+                return
+            for account, current, expected in mismatches:
+                self.stdout.write(f"{account.account_number}: current_balance={current} journal={expected}")
+            raise CommandError(f"{len(mismatches)} account(s) do not match the posting journal.")
+
+        if options['as_of']:
+            try:
+                day = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("--as-of must be in YYYY-MM-DD format.")
+        else:
+            day = timezone.localdate() - timedelta(days=1)
+
+        as_of = timezone.make_aware(datetime.combine(day, time.max))
+        created = ledger.create_checkpoints(as_of)
+        self.stdout.write(self.style.SUCCESS(f"Created {created} balance checkpoint(s) as of {day}."))
@@ -0,0 +1,217 @@
+"""
+Meeting-day collection for a table-banking group.
+
+At a meeting the officer fills in one row per member: savings deposited,
+loan repayment and fee paid. Inside a single database transaction the
+group's members, their savings accounts and their outstanding loans are
+loaded with three queries, the loans locked in id order as they are read,
+and every row is checked against them in memory. A repayment posted to the
+same loan from elsewhere meanwhile waits for the lock, so no row is checked
+against a balance that is about to change. Nothing is written unless all
+rows are valid; then the deposits and fees go in with one bulk insert and
+one journal posting (see tablebanking.ledger), and the repayments with one
+bulk insert and one allocation (see tablebanking.repayments). The query
+count does not depend on the size of the group.
+
+Fees are handed over in cash like the savings, so they are posted as fee
+income on no savings account: a member's savings grow by the full amount
+deposited, and members without a savings account can still pay fees.
+"""
+import uuid
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from user_management.models import GroupMembership
+
+from .ledger import post_transactions
+from .models import IndividualSavingsAccount, Loan, LoanRepayment, Transaction
+from .repayments import post_repayments
+
+
+# Amount columns of a collection row and the transaction type each posts as
+# (None for the loan repayment)
+AMOUNT_FIELDS = (
+    ('savings', 'DEPOSIT'),
+    ('repayment', None),
+    ('fee', 'FEE'),
+)
+
+ZERO = Decimal('0.00')
+
+
+class CollectionError(ValueError):
+    """One or more collection rows are invalid; ``errors`` maps row index to field errors."""
+
+    def __init__(self, errors):
+        super().__init__("Some collection rows are invalid; nothing was posted.")
+        self.errors = errors
+
+
+def load_group(group, lock=False):
+    """
+    Everything needed to check a group's collection, in three queries.
+
+    Returns ``{member_id: {"name", "accounts", "loans"}}`` for the group's
+    active members, each member's active savings accounts oldest first and
+    outstanding loans oldest first. With ``lock`` the loans are locked, in
+    id order like every other writer of loans (see tablebanking.repayments),
+    until the surrounding transaction ends.
+    """
+    memberships = (GroupMembership.objects.filter(group=group, is_active=True, member__is_active=True)
+                   .order_by('member__last_name', 'member__first_name')
+                   .values_list('member_id', 'member__first_name', 'member__last_name'))
+    members = {member_id: {'name': f"{first_name} {last_name}", 'accounts': [], 'loans': []}
+               for member_id, first_name, last_name in memberships}
+
+    accounts = (IndividualSavingsAccount.objects.filter(member_id__in=members, is_active=True)
+                .order_by('date_opened', 'pk').values('id', 'member_id', 'account_number', 'current_balance'))
+    for account in accounts:
+        members[account['member_id']]['accounts'].append(account)
+
+    loans = Loan.objects.filter(member_id__in=members, status__in=Loan.OUTSTANDING_STATUSES, remaining_balance__gt=0)
+    if lock:
+        loans = loans.select_for_update()
+    loans = loans.order_by('pk').values('id', 'member_id', 'loan_number', 'remaining_balance', 'disbursement_date')
+    # Locks are taken in id order; a repayment without a chosen loan goes to the oldest
+    for loan in sorted(loans, key=lambda loan: (loan['disbursement_date'] or date.max, loan['id'])):
+        members[loan['member_id']]['loans'].append(loan)
+    return members
+
+
+def _amount(value):
+    if value in (None, ''):
+        return ZERO
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError("Enter a number.")
+    if not amount.is_finite() or amount < 0 or amount != amount.quantize(Decimal('0.01')):
+        raise ValueError("Enter an amount of zero or more with at most two decimal places.")
+    return amount
+
+
+def _pick(choices, wanted, label):
+    # The row's chosen account or loan, or the member's oldest one
+    if wanted in (None, ''):
+        if not choices:
+            raise ValueError(f"This member has no {label}.")
+        return choices[0]
+    for choice in choices:
+        if str(choice['id']) == str(wanted):
+            return choice
+    raise ValueError(f"Not one of this member's {label}s.")
+
+
+def validate_rows(members, rows):
+    """
+    Check collection rows against a loaded group.
+
+    Each row is ``{"member", "savings", "repayment", "fee"}`` with optional
+    ``"account"`` and ``"loan"`` ids. Returns the rows as
+    ``(index, member_id, {field: amount}, account, loan)``; raises
+    CollectionError listing every problem found.
+    """
+    errors = defaultdict(dict)
+    checked = []
+    seen = set()
+    repaid = defaultdict(Decimal)
+    for index, row in enumerate(rows):
+        row = row if isinstance(row, dict) else {}
+        member_id = int(row['member']) if str(row.get('member')).isdigit() else None
+        member = members.get(member_id)
+        if member is None:
+            errors[index]['member'] = ["Not an active member of this group."]
+            continue
+        if member_id in seen:
+            errors[index]['member'] = ["This member already has a row."]
+            continue
+        seen.add(member_id)
+
+        amounts = {}
+        for field, _ in AMOUNT_FIELDS:
+            try:
+                amounts[field] = _amount(row.get(field))
+            except ValueError as e:
+                errors[index][field] = [str(e)]
+
+        account = loan = None
+        if amounts.get('savings'):
+            try:
+                account = _pick(member['accounts'], row.get('account'), 'savings account')
+            except ValueError as e:
+                errors[index]['account'] = [str(e)]
+        if amounts.get('repayment'):
+            try:
+                loan = _pick(member['loans'], row.get('loan'), 'outstanding loan')
+            except ValueError as e:
+                errors[index]['loan'] = [str(e)]
+            else:
+                repaid[loan['id']] += amounts['repayment']
+                if repaid[loan['id']] > loan['remaining_balance']:
+                    errors[index]['repayment'] = [f"More than the {loan['remaining_balance']} left on the loan."]
+
+        if index not in errors:
+            checked.append((index, member_id, amounts, account, loan))
+
+    if errors:
+        raise CollectionError(dict(errors))
+    return checked
+
+
+def _collection_rows(group, members, checked, field_officer, when):
+    # One batch token keeps the generated reference numbers unique
+    batch = uuid.uuid4().hex[:12].upper()
+    description = f"{group.name} meeting-day collection"
+    transactions, repayments = [], []
+    totals = dict.fromkeys((field for field, _ in AMOUNT_FIELDS), ZERO)
+    for index, member_id, amounts, account, loan in checked:
+        for field, transaction_type in AMOUNT_FIELDS:
+            amount = amounts[field]
+            if not amount:
+                continue
+            totals[field] += amount
+            reference = f"MD-{batch}-{index:03d}-{field[0].upper()}"
+            if transaction_type is None:
+                repayments.append(LoanRepayment(
+                    loan_id=loan['id'], amount=amount, payment_date=when, received_by=field_officer,
+                    reference_number=reference, notes=description,
+                ))
+            elif field == 'fee':
+                # Cash fee income: the payer is named, as no savings account records them
+                transactions.append(Transaction(
+                    transaction_type=transaction_type, amount=amount, date=when,
+                    description=f"{description}: fee from {members[member_id]['name']}",
+                    reference_number=reference, field_officer=field_officer,
+                ))
+            else:
+                transactions.append(Transaction(
+                    transaction_type=transaction_type, amount=amount, date=when, description=description,
+                    reference_number=reference, individual_savings_account_id=account['id'],
+                    field_officer=field_officer,
+                ))
+    return transactions, repayments, totals
+
+
+def post_collection(group, rows, field_officer=None, when=None):
+    """
+    Validate and post a group's meeting-day collection as one unit.
+
+    Returns ``{"transactions", "repayments", "savings", "repayment", "fee"}``
+    with the rows written and the totals collected.
+    """
+    when = when or timezone.now()
+    with db_transaction.atomic():
+        members = load_group(group, lock=True)
+        checked = validate_rows(members, rows)
+        transactions, repayments, totals = _collection_rows(group, members, checked, field_officer, when)
+
+        # bulk_create bypasses Transaction.save(), so the batch is posted to the journal here
+        transactions = Transaction.objects.bulk_create(transactions)
+        post_transactions(transactions)
+        repayments = post_repayments(repayments)
+
+    return {'transactions': len(transactions), 'repayments': len(repayments), **totals}
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablebanking', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_code', models.CharField(choices=[('SAVINGS', 'Member/Group Savings'), ('CASH', 'Cash'), ('LOANS_RECEIVABLE', 'Loans Receivable'), ('INTEREST_EXPENSE', 'Interest Expense'), ('INTEREST_INCOME', 'Interest Income'), ('FEE_INCOME', 'Fee Income'), ('SUSPENSE', 'Suspense')], max_length=20)),
+                ('entry_type', models.CharField(choices=[('DEBIT', 'Debit'), ('CREDIT', 'Credit')], max_length=10)),
+                ('debit', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('credit', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('effective_date', models.DateTimeField()),
+                ('posted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('is_reversal', models.BooleanField(default=False)),
+                ('group_savings_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='tablebanking.groupsavingsaccount')),
+                ('individual_savings_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='tablebanking.individualsavingsaccount')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.RESTRICT, related_name='postings', to='tablebanking.transaction')),
+            ],
+            options={
+                'ordering': ['effective_date', 'id'],
+                'indexes': [models.Index(fields=['individual_savings_account', 'account_code', 'effective_date'], name='tablebankin_individ_70b05c_idx'), models.Index(fields=['group_savings_account', 'account_code', 'effective_date'], name='tablebankin_group_s_43b1aa_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BalanceCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateTimeField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('group_savings_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='tablebanking.groupsavingsaccount')),
+                ('individual_savings_account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='tablebanking.individualsavingsaccount')),
+            ],
+            options={
+                'ordering': ['-as_of'],
+                'indexes': [models.Index(fields=['individual_savings_account', 'as_of'], name='tablebankin_individ_f95ca5_idx'), models.Index(fields=['group_savings_account', 'as_of'], name='tablebankin_group_s_dba71d_idx')],
+            },
+        ),
+    ]
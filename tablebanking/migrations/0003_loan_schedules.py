@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablebanking', '0002_ledger_journal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='interest_method',
+            field=models.CharField(blank=True, choices=[('FLAT', 'Flat Rate'), ('DECLINING', 'Declining Balance'), ('ANNUITY', 'Equal Installments')], help_text="Defaults to the loan product's method", max_length=20),
+        ),
+        migrations.AddField(
+            model_name='loanproduct',
+            name='interest_method',
+            field=models.CharField(choices=[('FLAT', 'Flat Rate'), ('DECLINING', 'Declining Balance'), ('ANNUITY', 'Equal Installments')], default='FLAT', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='LoanInstallment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('installment_number', models.PositiveSmallIntegerField()),
+                ('due_date', models.DateField()),
+                ('principal_due', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('interest_due', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('penalty_due', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('principal_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('interest_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('penalty_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paid_date', models.DateField(blank=True, help_text='Date the installment was fully settled', null=True)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='tablebanking.loan')),
+            ],
+            options={
+                'ordering': ['loan', 'installment_number'],
+                'indexes': [models.Index(fields=['due_date', 'paid_date'], name='tablebankin_due_dat_1ad162_idx')],
+                'unique_together': {('loan', 'installment_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablebanking', '0003_loan_schedules'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loanrepayment',
+            index=models.Index(fields=['payment_date', 'id'], name='tablebankin_payment_0b3711_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanrepayment',
+            index=models.Index(fields=['loan', 'payment_date', 'id'], name='tablebankin_loan_id_8735bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date', 'id'], name='tablebankin_date_652000_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['individual_savings_account', 'date', 'id'], name='tablebankin_individ_0ea000_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['group_savings_account', 'date', 'id'], name='tablebankin_group_s_4082e8_idx'),
+        ),
+    ]
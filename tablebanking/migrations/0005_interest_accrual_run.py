@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:27
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablebanking', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterestAccrualRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('DAILY', 'Daily'), ('MONTHLY', 'Monthly')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('last_individual_account_id', models.BigIntegerField(default=0)),
+                ('last_group_account_id', models.BigIntegerField(default=0)),
+                ('accounts_credited', models.PositiveIntegerField(default=0)),
+                ('total_interest', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-period_end', 'frequency'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='interestaccrualrun',
+            constraint=models.UniqueConstraint(fields=('frequency', 'period_start'), name='unique_interest_accrual_period'),
+        ),
+    ]
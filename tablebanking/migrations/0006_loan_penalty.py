@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablebanking', '0005_interest_accrual_run'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanPenalty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('assessed_on', models.DateField()),
+                ('days_overdue', models.PositiveIntegerField()),
+                ('created_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('installment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='penalty', to='tablebanking.loaninstallment')),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='penalties', to='tablebanking.loan')),
+            ],
+            options={
+                'ordering': ['-assessed_on', 'loan', 'installment'],
+                'indexes': [models.Index(fields=['assessed_on'], name='tablebankin_assesse_87bc35_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:51
+
+from datetime import datetime, time
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Min, Sum
+from django.utils import timezone
+
+
+# Account model, its foreign key and the reference number letter
+ACCOUNTS = (
+    ('IndividualSavingsAccount', 'individual_savings_account', 'I'),
+    ('GroupSavingsAccount', 'group_savings_account', 'G'),
+)
+
+
+def post_opening_balances(apps, schema_editor):
+    """
+    Carry balances that predate the journal into it.
+
+    Each account whose balance differs from the total of its SAVINGS lines
+    gets one OTHER transaction for the difference, posted against
+    OPENING_BALANCE as of the day the account was opened (or its first
+    line, if earlier). Balances are left as they are.
+    """
+    Transaction = apps.get_model('tablebanking', 'Transaction')
+    LedgerPosting = apps.get_model('tablebanking', 'LedgerPosting')
+    for model_name, field, code in ACCOUNTS:
+        journal = {
+            row[field]: row
+            for row in (LedgerPosting.objects.filter(**{f'{field}__isnull': False}, account_code='SAVINGS')
+                        .values(field).annotate(credit=Sum('credit'), debit=Sum('debit'), first=Min('effective_date'))
+                        .order_by())
+        }
+        for account in apps.get_model('tablebanking', model_name).objects.order_by('pk').iterator():
+            row = journal.get(account.pk, {})
+            difference = account.current_balance - ((row.get('credit') or Decimal('0')) - (row.get('debit') or Decimal('0')))
+            if not difference:
+                continue
+
+            opened = timezone.make_aware(datetime.combine(account.date_opened, time.min))
+            effective_date = min(opened, row['first']) if row.get('first') else opened
+            txn = Transaction.objects.create(
+                transaction_type='OTHER', amount=difference, date=effective_date,
+                description='Opening balance', reference_number=f'OPEN-{code}{account.pk}',
+                **{field: account},
+            )
+            savings_side, contra_side = ('CREDIT', 'DEBIT') if difference > 0 else ('DEBIT', 'CREDIT')
+            LedgerPosting.objects.bulk_create([
+                LedgerPosting(
+                    transaction=txn, account_code=account_code, entry_type=side, effective_date=effective_date,
+                    debit=abs(difference) if side == 'DEBIT' else 0, credit=abs(difference) if side == 'CREDIT' else 0,
+                    **{field: account},
+                )
+                for account_code, side in (('SAVINGS', savings_side), ('OPENING_BALANCE', contra_side))
+            ])
+
+
+def remove_opening_balances(apps, schema_editor):
+    LedgerPosting = apps.get_model('tablebanking', 'LedgerPosting')
+    opening = set(LedgerPosting.objects.filter(account_code='OPENING_BALANCE').values_list('transaction_id', flat=True))
+    LedgerPosting.objects.filter(transaction_id__in=opening).delete()
+    apps.get_model('tablebanking', 'Transaction').objects.filter(pk__in=opening).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tablebanking', '0006_loan_penalty'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ledgerposting',
+            name='account_code',
+            field=models.CharField(choices=[('SAVINGS', 'Member/Group Savings'), ('CASH', 'Cash'), ('LOANS_RECEIVABLE', 'Loans Receivable'), ('INTEREST_EXPENSE', 'Interest Expense'), ('INTEREST_INCOME', 'Interest Income'), ('FEE_INCOME', 'Fee Income'), ('SUSPENSE', 'Suspense'), ('OPENING_BALANCE', 'Opening Balances')], max_length=20),
+        ),
+        migrations.RunPython(post_opening_balances, remove_opening_balances),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from user_management.models import Member, Group, FieldOfficer
@@ -20,6 +20,13 @@ class SavingsProduct(models.Model):
         return f"{self.name} ({self.code})"
 
 
+INTEREST_METHOD_CHOICES = (
+    ('FLAT', 'Flat Rate'),
+    ('DECLINING', 'Declining Balance'),
+    ('ANNUITY', 'Equal Installments'),
+)
+
+
 class LoanProduct(models.Model):
     """Defines the different types of loan products offered."""
     name = models.CharField(max_length=100)
@@ -34,6 +41,7 @@ class LoanProduct(models.Model):
     maximum_term = models.IntegerField(help_text="Maximum loan term in months")
     grace_period = models.IntegerField(default=0, help_text="Grace period in days before late fees apply")
     late_payment_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    interest_method = models.CharField(max_length=20, choices=INTEREST_METHOD_CHOICES, default='FLAT')
     is_active = models.BooleanField(default=True)
     
     # Customer eligibility
@@ -86,6 +94,13 @@ class Transaction(models.Model):
         ('OTHER', 'Other'),
     )
     
+    # Fields that determine how a transaction is posted to the ledger
+    LEDGER_FIELDS = ('transaction_type', 'amount', 'date',
+                     'individual_savings_account_id', 'group_savings_account_id')
+    
+    # Newest first; keyset pages seek on it (see Meta.indexes)
+    LIST_ORDERING = ('-date', '-id')
+    
     transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     date = models.DateTimeField(default=timezone.now)
@@ -105,6 +120,13 @@ class Transaction(models.Model):
     is_synced = models.BooleanField(default=True)
     offline_created_at = models.DateTimeField(null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id']),
+            models.Index(fields=['individual_savings_account', 'date', 'id']),
+            models.Index(fields=['group_savings_account', 'date', 'id']),
+        ]
+    
     def __str__(self):
         if self.individual_savings_account:
             account = f"Individual: {self.individual_savings_account.account_number}"
@@ -114,6 +136,120 @@ class Transaction(models.Model):
             account = "No account"
         
         return f"{self.transaction_type} - {self.amount} - {account} - {self.date.date()}"
+    
+    def save(self, *args, **kwargs):
+        from .ledger import post_transaction, reverse_postings
+        
+        is_new = not self.pk
+        
+        # Saving and posting to the journal succeed or fail together
+        with db_transaction.atomic():
+            previous = None
+            if not is_new:
+                # Locked so that two edits of one transaction cannot both reverse the same legs
+                previous = (Transaction.objects.select_for_update().filter(pk=self.pk)
+                            .values(*self.LEDGER_FIELDS).first())
+            super().save(*args, **kwargs)
+            
+            if is_new or previous is None:
+                post_transaction(self)
+            elif any(previous[field] != getattr(self, field) for field in self.LEDGER_FIELDS):
+                # The journal is append-only: reverse the old legs and post the corrected ones
+                reverse_postings(self)
+                post_transaction(self)
+    
+    def delete(self, *args, **kwargs):
+        from .ledger import remove_postings
+        
+        # The balance the transaction moved goes back before its journal lines go
+        with db_transaction.atomic():
+            remove_postings(self)
+            return super().delete(*args, **kwargs)
+
+
+class LedgerPosting(models.Model):
+    """
+    Append-only double-entry journal line.
+    
+    Every Transaction posts a balanced pair of lines: one against the member or
+    group savings account (account_code SAVINGS) and a contra line against an
+    internal account. Both lines carry the savings account they belong to;
+    a fee paid in cash posts CASH and FEE_INCOME lines that carry none.
+    Lines are never edited; they are deleted only together with their
+    transaction, once its effect on the balance has been reversed.
+    """
+    ENTRY_TYPES = (
+        ('DEBIT', 'Debit'),
+        ('CREDIT', 'Credit'),
+    )
+    
+    ACCOUNT_CODES = (
+        ('SAVINGS', 'Member/Group Savings'),
+        ('CASH', 'Cash'),
+        ('LOANS_RECEIVABLE', 'Loans Receivable'),
+        ('INTEREST_EXPENSE', 'Interest Expense'),
+        ('INTEREST_INCOME', 'Interest Income'),
+        ('FEE_INCOME', 'Fee Income'),
+        ('SUSPENSE', 'Suspense'),
+        ('OPENING_BALANCE', 'Opening Balances'),
+    )
+    
+    # Transaction.delete() removes the lines; deleting transactions in bulk is refused
+    transaction = models.ForeignKey(Transaction, on_delete=models.RESTRICT, related_name='postings')
+    account_code = models.CharField(max_length=20, choices=ACCOUNT_CODES)
+    individual_savings_account = models.ForeignKey(IndividualSavingsAccount, on_delete=models.CASCADE,
+                                                   null=True, blank=True, related_name='postings')
+    group_savings_account = models.ForeignKey(GroupSavingsAccount, on_delete=models.CASCADE,
+                                              null=True, blank=True, related_name='postings')
+    entry_type = models.CharField(max_length=10, choices=ENTRY_TYPES)
+    debit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    credit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Effective date (the transaction date) and when the line was written
+    effective_date = models.DateTimeField()
+    posted_at = models.DateTimeField(default=timezone.now)
+    is_reversal = models.BooleanField(default=False)
+    
+    class Meta:
+        ordering = ['effective_date', 'id']
+        indexes = [
+            models.Index(fields=['individual_savings_account', 'account_code', 'effective_date']),
+            models.Index(fields=['group_savings_account', 'account_code', 'effective_date']),
+        ]
+    
+    def __str__(self):
+        amount = self.debit if self.entry_type == 'DEBIT' else self.credit
+        return f"{self.entry_type} {self.account_code} {amount} - {self.transaction.reference_number}"
+    
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValueError("Ledger postings are append-only and cannot be modified.")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger postings are append-only and cannot be deleted.")
+
+
+class BalanceCheckpoint(models.Model):
+    """Savings account balance as of a point in time, used to answer as-of queries quickly."""
+    individual_savings_account = models.ForeignKey(IndividualSavingsAccount, on_delete=models.CASCADE,
+                                                   null=True, blank=True, related_name='checkpoints')
+    group_savings_account = models.ForeignKey(GroupSavingsAccount, on_delete=models.CASCADE,
+                                              null=True, blank=True, related_name='checkpoints')
+    as_of = models.DateTimeField()
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    created_date = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-as_of']
+        indexes = [
+            models.Index(fields=['individual_savings_account', 'as_of']),
+            models.Index(fields=['group_savings_account', 'as_of']),
+        ]
+    
+    def __str__(self):
+        account = self.individual_savings_account or self.group_savings_account
+        return f"{account} - {self.balance} as of {self.as_of}"
 
 
 class Loan(models.Model):
@@ -129,6 +265,9 @@ class Loan(models.Model):
         ('CANCELLED', 'Cancelled'),
     )
     
+    # Loans that are out and being repaid
+    OUTSTANDING_STATUSES = ('DISBURSED', 'ACTIVE')
+    
     loan_product = models.ForeignKey(LoanProduct, on_delete=models.PROTECT)
     loan_number = models.CharField(max_length=20, unique=True)
     
@@ -139,6 +278,8 @@ class Loan(models.Model):
     # Loan details
     principal_amount = models.DecimalField(max_digits=12, decimal_places=2)
     interest_rate = models.DecimalField(max_digits=5, decimal_places=2)
+    interest_method = models.CharField(max_length=20, choices=INTEREST_METHOD_CHOICES, blank=True,
+                                       help_text="Defaults to the loan product's method")
     term_months = models.IntegerField()
     application_date = models.DateField(default=timezone.now)
     approval_date = models.DateField(null=True, blank=True)
@@ -169,23 +310,99 @@ class Loan(models.Model):
         return f"Loan {self.loan_number} - {borrower} - {self.status}"
     
     def save(self, *args, **kwargs):
+        from .amortization import loan_total_interest, generate_schedule
+        
+        if not self.interest_method:
+            self.interest_method = self.loan_product.interest_method
+        
         # Calculate financials if this is a new loan
         if not self.pk:
-            # Simple interest calculation
-            self.total_interest = (self.principal_amount * (self.interest_rate / 100) * self.term_months) / 12
+            self.total_interest = loan_total_interest(self)
             self.total_amount_due = self.principal_amount + self.total_interest
             self.remaining_balance = self.total_amount_due
-            
-        # If disbursement date is set, calculate expected end date
-        if self.disbursement_date and not self.expected_end_date:
-            from datetime import timedelta
-            self.expected_end_date = self.disbursement_date + timedelta(days=30 * self.term_months)
-            
-        super().save(*args, **kwargs)
+        
+        # If disbursement date is set, calculate expected end date and the installment schedule
+        newly_disbursed = bool(self.disbursement_date and not self.expected_end_date)
+        if newly_disbursed:
+            from dateutil.relativedelta import relativedelta
+            self.expected_end_date = self.disbursement_date + relativedelta(months=self.term_months)
+        
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+            if newly_disbursed:
+                generate_schedule(self)
 
 
+class LoanInstallment(models.Model):
+    """One scheduled installment of a loan's amortization schedule."""
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='installments')
+    installment_number = models.PositiveSmallIntegerField()
+    due_date = models.DateField()
+    
+    # Amounts due
+    principal_due = models.DecimalField(max_digits=12, decimal_places=2)
+    interest_due = models.DecimalField(max_digits=12, decimal_places=2)
+    penalty_due = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    # Amounts paid so far
+    principal_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    interest_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    penalty_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid_date = models.DateField(null=True, blank=True, help_text="Date the installment was fully settled")
+    
+    class Meta:
+        ordering = ['loan', 'installment_number']
+        unique_together = ('loan', 'installment_number')
+        indexes = [
+            models.Index(fields=['due_date', 'paid_date']),
+        ]
+    
+    def __str__(self):
+        return f"Loan {self.loan.loan_number} - #{self.installment_number} due {self.due_date}"
+    
+    @property
+    def total_due(self):
+        return self.principal_due + self.interest_due + self.penalty_due
+    
+    @property
+    def total_paid(self):
+        return self.principal_paid + self.interest_paid + self.penalty_paid
+    
+    @property
+    def outstanding(self):
+        return self.total_due - self.total_paid
+
+
+
+class LoanPenalty(models.Model):
+    """
+    Late fee charged on an overdue installment.
+    
+    The fee is added to the installment's penalty_due and the loan's balance,
+    and is collected with the loan's repayments as their penalty component.
+    An installment is charged at most once.
+    """
+    installment = models.OneToOneField(LoanInstallment, on_delete=models.CASCADE, related_name='penalty')
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='penalties')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    assessed_on = models.DateField()
+    days_overdue = models.PositiveIntegerField()
+    created_date = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-assessed_on', 'loan', 'installment']
+        indexes = [
+            models.Index(fields=['assessed_on']),
+        ]
+    
+    def __str__(self):
+        return f"Late fee {self.amount} on loan {self.loan.loan_number} #{self.installment.installment_number}"
+
 class LoanRepayment(models.Model):
     """Records payments made toward loans."""
+    # Newest first; keyset pages seek on it (see Meta.indexes)
+    LIST_ORDERING = ('-payment_date', '-id')
+    
     loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name='repayments')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     payment_date = models.DateTimeField(default=timezone.now)
@@ -205,20 +422,64 @@ class LoanRepayment(models.Model):
     is_synced = models.BooleanField(default=True)
     offline_created_at = models.DateTimeField(null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['payment_date', 'id']),
+            models.Index(fields=['loan', 'payment_date', 'id']),
+        ]
+    
     def __str__(self):
         return f"Payment of {self.amount} for Loan {self.loan.loan_number} on {self.payment_date.date()}"
     
     def save(self, *args, **kwargs):
-        # Update loan's paid amount and balance
-        if not self.pk:  # Only for new payments
-            self.loan.total_amount_paid += self.amount
-            self.loan.remaining_balance -= self.amount
-            
-            # Update loan status if fully paid
-            if self.loan.remaining_balance <= 0:
-                self.loan.status = 'COMPLETED'
-                self.loan.actual_end_date = timezone.now().date()
-                
-            self.loan.save()
-            
-        super().save(*args, **kwargs)
+        from .repayments import allocate_repayments, apply_allocation
+        
+        if self.pk:
+            return super().save(*args, **kwargs)
+        
+        # New payments are split over the installment schedule under the loan's row lock,
+        # and move the loan's totals with F() expressions (see tablebanking.repayments)
+        with db_transaction.atomic():
+            allocation = allocate_repayments([self])
+            super().save(*args, **kwargs)
+            apply_allocation(allocation)
+        
+        # The loan's totals changed in the database, not on the cached instance
+        if 'loan' in self._state.fields_cache:
+            self.loan.refresh_from_db(fields=['total_amount_paid', 'remaining_balance', 'status',
+                                              'actual_end_date'])
+
+
+class InterestAccrualRun(models.Model):
+    """
+    Checkpoint of one interest accrual period.
+    
+    The run records how far it has got through each kind of savings account
+    (accounts are credited in id order) in the same database transaction as
+    each chunk of interest, so an interrupted run resumes where it stopped and
+    a completed period is never credited twice.
+    """
+    FREQUENCY_CHOICES = (
+        ('DAILY', 'Daily'),
+        ('MONTHLY', 'Monthly'),
+    )
+    
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    last_individual_account_id = models.BigIntegerField(default=0)
+    last_group_account_id = models.BigIntegerField(default=0)
+    accounts_credited = models.PositiveIntegerField(default=0)
+    total_interest = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-period_end', 'frequency']
+        constraints = [
+            models.UniqueConstraint(fields=['frequency', 'period_start'], name='unique_interest_accrual_period'),
+        ]
+    
+    def __str__(self):
+        state = "completed" if self.completed_at else "in progress"
+        return f"{self.get_frequency_display()} interest {self.period_start} to {self.period_end} ({state})"
@@ -0,0 +1,110 @@
+"""
+Late fees on overdue loan installments.
+
+An installment that is still unsettled more than its product's grace_period
+days after it fell due is charged the product's late_payment_fee once. The
+fee is added to the installment's penalty_due and to the loan's amount due
+and balance, so the next repayment settles it first (see
+tablebanking.repayments) as its penalty component.
+
+The whole portfolio is assessed at once: the loans with an overdue
+installment that has no fee yet are locked in id order, like every other
+writer of loans (see tablebanking.repayments), so a repayment cannot settle
+an installment while its fee is being charged. One query on the
+installments' (due_date, paid_date) index then finds those installments,
+and the fees are written with one bulk insert and one UPDATE each for
+installments and loans. A LoanPenalty row per charged installment makes a
+rerun (the same night or any later one) charge nothing twice. A dry run
+makes the same assessment and writes nothing.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+
+from .models import Loan, LoanInstallment, LoanPenalty
+from .signals import loans_changed
+
+
+ZERO = Decimal('0.00')
+
+
+def _unsettled(day):
+    return LoanInstallment.objects.filter(due_date__lt=day, paid_date__isnull=True, penalty__isnull=True,
+                                          loan__status__in=Loan.OUTSTANDING_STATUSES,
+                                          loan__loan_product__late_payment_fee__gt=0)
+
+
+def overdue_installments(day):
+    """
+    Installments owing a late fee on ``day``, from one query.
+
+    Returns ``(installment_id, loan_id, loan_number, installment_number,
+    due_date, days_overdue, fee)`` tuples ordered by loan and installment.
+    """
+    rows = (_unsettled(day)
+            .order_by('loan_id', 'installment_number')
+            .values_list('pk', 'loan_id', 'loan__loan_number', 'installment_number', 'due_date',
+                         'loan__loan_product__grace_period', 'loan__loan_product__late_payment_fee'))
+    # The grace period differs by product, so it is applied here rather than in SQL
+    return [
+        (pk, loan_id, loan_number, number, due_date, (day - due_date).days, fee)
+        for pk, loan_id, loan_number, number, due_date, grace_period, fee in rows
+        if due_date + timedelta(days=max(grace_period, 0)) < day
+    ]
+
+
+def _by_pk(amounts):
+    return Case(*[When(pk=pk, then=Value(amount)) for pk, amount in amounts.items()],
+                output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def assess_penalties(day=None, dry_run=False):
+    """
+    Charge the late fees owed on ``day`` (today by default).
+
+    Returns ``{"charges", "installments", "loans", "total"}`` where
+    ``charges`` lists ``{"loan", "installment", "due_date", "days_overdue",
+    "amount"}``. With ``dry_run`` nothing is written.
+    """
+    day = day or timezone.localdate()
+    with db_transaction.atomic():
+        if not dry_run:
+            list(Loan.objects.select_for_update().filter(pk__in=_unsettled(day).values('loan_id'))
+                 .order_by('pk').values_list('pk', flat=True))
+        overdue = overdue_installments(day)
+
+        installment_fees = {pk: fee for pk, _, _, _, _, _, fee in overdue}
+        loan_fees = {}
+        for _, loan_id, _, _, _, _, fee in overdue:
+            loan_fees[loan_id] = loan_fees.get(loan_id, ZERO) + fee
+
+        if overdue and not dry_run:
+            # One fee per installment is enforced by the database too, so of two
+            # overlapping runs the second fails and rolls back rather than charging again
+            LoanPenalty.objects.bulk_create([
+                LoanPenalty(installment_id=pk, loan_id=loan_id, amount=fee, assessed_on=day,
+                            days_overdue=days_overdue)
+                for pk, loan_id, _, _, _, days_overdue, fee in overdue
+            ])
+            LoanInstallment.objects.filter(pk__in=installment_fees).update(
+                penalty_due=F('penalty_due') + _by_pk(installment_fees),
+            )
+            Loan.objects.filter(pk__in=loan_fees).update(
+                total_amount_due=F('total_amount_due') + _by_pk(loan_fees),
+                remaining_balance=F('remaining_balance') + _by_pk(loan_fees),
+            )
+            loans_changed.send(sender=Loan, loan_ids=list(loan_fees))
+
+    return {
+        'charges': [
+            {'loan': loan_number, 'installment': number, 'due_date': due_date, 'days_overdue': days_overdue,
+             'amount': fee}
+            for _, _, loan_number, number, due_date, days_overdue, fee in overdue
+        ],
+        'installments': len(installment_fees),
+        'loans': len(loan_fees),
+        'total': sum(installment_fees.values(), ZERO),
+    }
@@ -0,0 +1,168 @@
+"""
+Loan repayment posting.
+
+Posting a repayment locks its loan, allocates the amount over the loan's
+unsettled installments oldest first (penalty, then interest, then
+principal within each installment) and moves the loan's paid amount and
+balance with F() expressions. Only the changed columns are written:
+the installments' paid amounts with one bulk_update, and the loans' two
+totals with a single UPDATE. Two officers posting to the same loan at once
+are serialised by the lock, so neither payment is lost.
+
+Whatever is left after the last installment counts as principal paid ahead
+of the schedule, as does the whole amount for a loan without a schedule.
+
+post_repayments posts any number of new repayments, such as a group's
+meeting-day collection, with a fixed handful of queries.
+LoanRepayment.save() posts one repayment the same way, and
+apply_repayments allocates rows that were already inserted in bulk.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+
+from .models import Loan, LoanInstallment, LoanRepayment
+from .signals import loans_changed
+
+
+ZERO = Decimal('0')
+
+# Order a payment settles each installment's components in, as
+# (installment due field, installment paid field, repayment component field)
+ALLOCATION_ORDER = (
+    ('penalty_due', 'penalty_paid', 'penalty_component'),
+    ('interest_due', 'interest_paid', 'interest_component'),
+    ('principal_due', 'principal_paid', 'principal_component'),
+)
+
+INSTALLMENT_PAID_FIELDS = ['penalty_paid', 'interest_paid', 'principal_paid', 'paid_date']
+
+COMPONENT_FIELDS = [component for _, _, component in ALLOCATION_ORDER]
+
+
+class Allocation:
+    """How a set of repayments splits over installments, and what each loan's totals move by."""
+
+    def __init__(self):
+        self.installments = {}
+        self.loan_totals = defaultdict(Decimal)
+
+    def apply(self, repayment, installments, day):
+        """Spread one repayment over its loan's unsettled installments (oldest first)."""
+        remaining = Decimal(repayment.amount)
+        components = dict.fromkeys(COMPONENT_FIELDS, ZERO)
+        for installment in installments:
+            if remaining <= 0:
+                break
+            if installment.paid_date:
+                continue
+            for due_field, paid_field, component in ALLOCATION_ORDER:
+                share = min(remaining, getattr(installment, due_field) - getattr(installment, paid_field))
+                if share > 0:
+                    setattr(installment, paid_field, getattr(installment, paid_field) + share)
+                    components[component] += share
+                    remaining -= share
+            if installment.total_paid >= installment.total_due:
+                installment.paid_date = day
+            self.installments[installment.pk] = installment
+
+        # Paid ahead of (or without) a schedule
+        components['principal_component'] += remaining
+        for field, value in components.items():
+            setattr(repayment, field, value)
+        self.loan_totals[repayment.loan_id] += Decimal(repayment.amount)
+
+
+def allocate_repayments(repayments):
+    """
+    Lock the repayments' loans and split each repayment into its components.
+
+    Sets the principal, interest and penalty components on the repayments
+    and returns the Allocation that apply_allocation writes. Must run inside
+    the transaction that writes it.
+    """
+    repayments = list(repayments)
+    loan_ids = sorted({repayment.loan_id for repayment in repayments})
+    # Locked in id order so concurrent batches cannot deadlock
+    list(Loan.objects.select_for_update().filter(pk__in=loan_ids).order_by('pk').values_list('pk', flat=True))
+
+    schedules = defaultdict(list)
+    unsettled = (LoanInstallment.objects.filter(loan_id__in=loan_ids, paid_date__isnull=True)
+                 .order_by('loan_id', 'installment_number'))
+    for installment in unsettled:
+        schedules[installment.loan_id].append(installment)
+
+    allocation = Allocation()
+    for repayment in sorted(repayments, key=lambda repayment: repayment.payment_date):
+        paid_at = repayment.payment_date
+        day = timezone.localdate(paid_at) if timezone.is_aware(paid_at) else paid_at.date()
+        allocation.apply(repayment, schedules[repayment.loan_id], day)
+    return allocation
+
+
+def apply_allocation(allocation):
+    """
+    Write an allocation: installment paid amounts, then the loans' totals.
+
+    Loans that reach a zero balance are then marked completed through save()
+    so status listeners still fire.
+    """
+    if not allocation.loan_totals:
+        return
+
+    LoanInstallment.objects.bulk_update(list(allocation.installments.values()), INSTALLMENT_PAID_FIELDS)
+
+    totals = allocation.loan_totals
+    amount = Case(*[When(pk=pk, then=Value(total)) for pk, total in totals.items()],
+                  output_field=DecimalField(max_digits=12, decimal_places=2))
+    Loan.objects.filter(pk__in=totals.keys()).update(
+        total_amount_paid=F('total_amount_paid') + amount,
+        remaining_balance=F('remaining_balance') - amount,
+    )
+
+    paid_off = (Loan.objects.filter(pk__in=totals.keys(), remaining_balance__lte=0)
+                .exclude(status='COMPLETED'))
+    for loan in paid_off:
+        loan.status = 'COMPLETED'
+        loan.actual_end_date = timezone.now().date()
+        loan.save(update_fields=['status', 'actual_end_date'])
+
+    loans_changed.send(sender=Loan, loan_ids=list(totals))
+
+
+def post_repayments(repayments):
+    """
+    Insert and post new repayments in one transaction.
+
+    The repayments are inserted with one bulk_create (so no post_save is
+    sent for them) after their components are allocated. Returns the
+    inserted repayments.
+    """
+    repayments = list(repayments)
+    if not repayments:
+        return []
+
+    with db_transaction.atomic():
+        allocation = allocate_repayments(repayments)
+        inserted = LoanRepayment.objects.bulk_create(repayments)
+        apply_allocation(allocation)
+    return inserted
+
+
+def apply_repayments(repayments):
+    """
+    Post repayments that were already inserted in bulk.
+
+    Their components are allocated and saved with one bulk_update.
+    """
+    repayments = list(repayments)
+    if not repayments:
+        return
+
+    with db_transaction.atomic():
+        allocation = allocate_repayments(repayments)
+        LoanRepayment.objects.bulk_update(repayments, COMPONENT_FIELDS)
+        apply_allocation(allocation)
@@ -0,0 +1,14 @@
+from django.dispatch import Signal
+
+
+# Sent after ledger postings change savings balances with a bulk UPDATE (which
+# bypasses the model save signals). Arguments:
+#   sender       - IndividualSavingsAccount or GroupSavingsAccount
+#   deltas       - {account_id: Decimal change in current_balance}
+#   active_delta - net change across the accounts that are active
+balance_changed = Signal()
+
+# Sent after loan balances or statuses change with a bulk UPDATE. Arguments:
+#   sender   - Loan
+#   loan_ids - ids of the loans that changed
+loans_changed = Signal()
@@ -1,3 +1,523 @@
+from datetime import date, datetime
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.models import RestrictedError
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+
+from user_management.models import Group, GroupMembership, Member
+
+from .amortization import build_installments, compute_schedules, generate_schedules
+from .interest import _accrue_chunk, accrue_interest, compute_interest, daily_balances
+from .ledger import balance_as_of, find_balance_mismatches
+from .meeting_day import CollectionError, post_collection
+from .models import (GroupSavingsAccount, IndividualSavingsAccount, InterestAccrualRun, LedgerPosting, Loan,
+                     LoanInstallment, LoanPenalty, LoanProduct, LoanRepayment, SavingsProduct, Transaction)
+from .penalties import assess_penalties
+from .repayments import post_repayments
+
+OPENING_BALANCES = import_module('tablebanking.migrations.0007_opening_balances')
+
+# Lock, schedule read, insert, installment update, loan update and the paid-off check,
+# then the change feed entries and borrower profiles of the loans (savepoints included)
+POST_REPAYMENTS_QUERIES = 16
+
+# Three loading queries, then the inserts, journal, balance updates and repayment posting,
+# with the KPI, change feed and member profile updates they trigger (savepoints included)
+POST_COLLECTION_QUERIES = 51
+
+# The loan lock, the overdue query, the fee insert, the installment and loan updates, then the
+# change feed entries and borrower profiles of the loans (savepoints included)
+ASSESS_PENALTIES_QUERIES = 15
+
+
+class LoanTestCase(TestCase):
+    """A group and a flat-rate loan product, with helpers to lend to the group and take repayments."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(
+            name='Umoja', registration_number='G-1', formation_date=date(2020, 1, 1),
+            meeting_schedule='Every Monday', meeting_location='Hall',
+        )
+        cls.product = LoanProduct.objects.create(
+            name='Group loan', code='GL', description='', interest_rate=12, minimum_amount=100,
+            maximum_amount=100000, minimum_term=1, maximum_term=12, interest_method='FLAT',
+        )
+        cls.sequence = 0
+
+    def add_loan(self):
+        # 1200 over 3 months at 12% flat: three installments of 400 principal and 12 interest
+        type(self).sequence += 1
+        return Loan.objects.create(
+            loan_product=self.product, loan_number=f'L-{self.sequence}', group=self.group,
+            principal_amount=1200, interest_rate=12, term_months=3, status='DISBURSED',
+            disbursement_date=date(2024, 1, 1),
+        )
+
+    def pay(self, loan, amount):
+        type(self).sequence += 1
+        return LoanRepayment.objects.create(loan=loan, amount=Decimal(amount), reference_number=f'R-{self.sequence}')
+
+
+class RepaymentPostingTests(LoanTestCase):
+    """Repayments are split over the schedule and move the loan totals in the database."""
+
+    def paid(self, loan):
+        return list(LoanInstallment.objects.filter(loan=loan)
+                    .values_list('penalty_paid', 'interest_paid', 'principal_paid', 'paid_date'))
+
+    def test_allocates_penalty_interest_then_principal(self):
+        loan = self.add_loan()
+        LoanInstallment.objects.filter(loan=loan, installment_number=2).update(penalty_due=10)
+
+        first = self.pay(loan, '500')
+        self.assertEqual((first.penalty_component, first.interest_component, first.principal_component),
+                         (10, 24, 466))
+        second = self.pay(loan, '400')
+        self.assertEqual((second.penalty_component, second.interest_component, second.principal_component),
+                         (0, 12, 388))
+        self.assertEqual([row[:3] for row in self.paid(loan)], [(0, 12, 400), (10, 12, 400), (0, 12, 54)])
+        self.assertEqual([row[3] is not None for row in self.paid(loan)], [True, True, False])
+
+        loan.refresh_from_db()
+        self.assertEqual((loan.total_amount_paid, loan.remaining_balance), (900, 336))
+        self.assertEqual(first.loan.remaining_balance, 336)
+
+    def test_overpayment_completes_the_loan(self):
+        loan = self.add_loan()
+        repayment = self.pay(loan, '1300')
+        self.assertEqual(repayment.principal_component, 1264)
+        loan.refresh_from_db()
+        self.assertEqual(loan.status, 'COMPLETED')
+        self.assertEqual(loan.remaining_balance, -64)
+
+    def test_batch_posting_is_constant(self):
+        for count in (1, 4):
+            loans = [self.add_loan() for _ in range(count)]
+            repayments = []
+            for loan in loans:
+                for amount in ('100', '412'):
+                    type(self).sequence += 1
+                    repayments.append(LoanRepayment(loan=loan, amount=Decimal(amount),
+                                                    reference_number=f'R-{self.sequence}'))
+            with self.assertNumQueries(POST_REPAYMENTS_QUERIES):
+                post_repayments(repayments)
+
+        self.assertEqual([row[:3] for row in self.paid(loans[0])], [(0, 12, 400), (0, 12, 88), (0, 0, 0)])
+        self.assertEqual(set(Loan.objects.filter(pk__in=[loan.pk for loan in loans])
+                             .values_list('remaining_balance', flat=True)), {Decimal('724.00')})
+
+
+class LedgerTests(TestCase):
+    """Balances and the journal agree through edits, deletes and balances from before the journal."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.savings = SavingsProduct.objects.create(name='Savings', code='SV', description='', interest_rate=0,
+                                                    minimum_deposit=0)
+        member = Member.objects.create(
+            first_name='Saver', last_name='Njeri', id_number='L-1', gender='F', date_of_birth=date(1990, 1, 1),
+            phone_number='+254711111111', physical_address='Village',
+        )
+        cls.account = IndividualSavingsAccount.objects.create(member=member, product=cls.savings,
+                                                              account_number='LS-1', date_opened=date(2024, 1, 1))
+
+    def deposit(self, amount, reference):
+        return Transaction.objects.create(transaction_type='DEPOSIT', amount=Decimal(amount),
+                                          reference_number=reference, individual_savings_account=self.account)
+
+    def balance(self):
+        self.account.refresh_from_db()
+        return self.account.current_balance
+
+    def test_editing_a_transaction_reposts_it(self):
+        txn = self.deposit('500', 'D-1')
+        txn.amount = Decimal('300')
+        txn.save()
+        self.assertEqual(self.balance(), Decimal('300'))
+        self.assertEqual(find_balance_mismatches(), [])
+
+    def test_deleting_a_transaction_moves_the_balance_back(self):
+        self.deposit('500', 'D-1')
+        txn = self.deposit('200', 'D-2')
+        txn.delete()
+
+        self.assertEqual(self.balance(), Decimal('500'))
+        self.assertFalse(LedgerPosting.objects.filter(transaction_id=txn.pk).exists())
+        self.assertEqual(find_balance_mismatches(), [])
+
+        # A bulk delete would bypass the reversal, so the journal refuses it
+        with self.assertRaises(RestrictedError):
+            Transaction.objects.all().delete()
+        self.assertEqual(self.balance(), Decimal('500'))
+
+    def test_balances_from_before_the_journal_get_opening_postings(self):
+        self.deposit('500', 'D-1')
+        IndividualSavingsAccount.objects.filter(pk=self.account.pk).update(current_balance=Decimal('1250'))
+
+        # Run with the migration's historical models, which post nothing on save
+        historical = MigrationLoader(connection).project_state(('tablebanking', '0007_opening_balances')).apps
+        OPENING_BALANCES.post_opening_balances(historical, None)
+        self.assertEqual(find_balance_mismatches(), [])
+        opening = Transaction.objects.get(reference_number=f'OPEN-I{self.account.pk}')
+        self.assertEqual((opening.amount, timezone.localtime(opening.date).date()), (Decimal('750'), date(2024, 1, 1)))
+        self.assertEqual(self.balance(), Decimal('1250'))
+
+        # Accounts that already agree with the journal are left alone
+        OPENING_BALANCES.post_opening_balances(historical, None)
+        self.assertEqual(Transaction.objects.filter(reference_number__startswith='OPEN-').count(), 1)
+
+
+class MeetingDayCollectionTests(LoanTestCase):
+    """A group's meeting-day rows post together, in a fixed number of queries, or not at all."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.savings = SavingsProduct.objects.create(name='Savings', code='SV', description='', interest_rate=0,
+                                                    minimum_deposit=0)
+        cls.members = []
+        for index in range(40):
+            member = Member.objects.create(
+                first_name='Member', last_name=f'{index:02d}', id_number=f'M-{index}', gender='F',
+                date_of_birth=date(1990, 1, 1), phone_number='+254711111111', physical_address='Village',
+            )
+            GroupMembership.objects.create(member=member, group=cls.group)
+            IndividualSavingsAccount.objects.create(member=member, product=cls.savings, account_number=f'S-{index}')
+            cls.members.append(member)
+        cls.loans = [
+            Loan.objects.create(
+                loan_product=cls.product, loan_number=f'ML-{index}', member=member, principal_amount=1200,
+                interest_rate=12, term_months=3, status='DISBURSED', disbursement_date=date(2024, 1, 1),
+            )
+            for index, member in enumerate(cls.members)
+        ]
+
+    def rows(self, count):
+        return [{'member': member.pk, 'savings': '200', 'repayment': '412', 'fee': '10.50'}
+                for member in self.members[:count]]
+
+    def test_posts_every_row_in_constant_queries(self):
+        with self.assertNumQueries(POST_COLLECTION_QUERIES):
+            post_collection(self.group, self.rows(2))
+        # SQLite takes at most 999 parameters per statement, so the journal lines go in two inserts
+        with self.assertNumQueries(POST_COLLECTION_QUERIES + 1):
+            summary = post_collection(self.group, self.rows(40)[2:])
+
+        self.assertEqual(summary, {'transactions': 76, 'repayments': 38, 'savings': 7600, 'repayment': 15656,
+                                   'fee': 399})
+        self.assertEqual(set(IndividualSavingsAccount.objects.values_list('current_balance', flat=True)),
+                         {Decimal('200.00')})
+        self.assertEqual(LedgerPosting.objects.count(), 160)
+        self.assertEqual(set(Loan.objects.filter(member__isnull=False).values_list('remaining_balance', flat=True)),
+                         {Decimal('824.00')})
+
+    def test_fees_are_cash_income_not_taken_from_savings(self):
+        IndividualSavingsAccount.objects.filter(member=self.members[1]).delete()
+        post_collection(self.group, [{'member': self.members[0].pk, 'savings': '100', 'fee': '10'},
+                                     {'member': self.members[1].pk, 'fee': '20'}])
+
+        account = IndividualSavingsAccount.objects.get(member=self.members[0])
+        self.assertEqual(account.current_balance, Decimal('100.00'))
+        self.assertEqual(balance_as_of(account, timezone.now()), Decimal('100.00'))
+        fees = LedgerPosting.objects.filter(transaction__transaction_type='FEE')
+        self.assertEqual(sorted(fees.values_list('account_code', 'debit', 'credit')),
+                         [('CASH', 10, 0), ('CASH', 20, 0), ('FEE_INCOME', 0, 10), ('FEE_INCOME', 0, 20)])
+        self.assertFalse(fees.filter(individual_savings_account__isnull=False).exists())
+        self.assertEqual(find_balance_mismatches(), [])
+
+    def test_invalid_rows_post_nothing(self):
+        rows = self.rows(3)
+        rows[1]['repayment'] = '5000'
+        rows[2]['fee'] = '-1'
+        rows.append({'member': 999999, 'savings': '1'})
+        with self.assertRaises(CollectionError) as raised:
+            post_collection(self.group, rows)
+        self.assertEqual(sorted(raised.exception.errors), [1, 2, 3])
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(LoanRepayment.objects.exists())
+
+    def test_rows_are_checked_inside_the_transaction_with_the_loans_locked(self):
+        with CaptureQueriesContext(connection) as queries:
+            post_collection(self.group, self.rows(2))
+        statements = [query['sql'] for query in queries.captured_queries]
+        opened = next(index for index, sql in enumerate(statements) if sql.startswith('SAVEPOINT'))
+        loans = next(index for index, sql in enumerate(statements) if sql.startswith('SELECT "tablebanking_loan"'))
+        self.assertLess(opened, loans)
+        self.assertTrue(statements[loans].endswith('ORDER BY "tablebanking_loan"."id" ASC'))
+
+    def test_grid_page(self):
+        self.client.force_login(User.objects.create_user('officer'))
+        response = self.client.get(reverse('tablebanking:meeting_day_grid', args=[self.group.pk]))
+        self.assertContains(response, 'Umoja meeting-day collection')
+        self.assertContains(response, 'data-member=', count=40)
+        self.assertContains(response, reverse('tablebanking:meeting_day_collection', args=[self.group.pk]))
+
+    def test_collection_view(self):
+        user = User.objects.create_user('officer')
+        self.client.force_login(user)
+        url = reverse('tablebanking:meeting_day_collection', args=[self.group.pk])
+        grid = self.client.get(url).json()
+        self.assertEqual(len(grid['members']), 40)
+        self.assertEqual(grid['members'][0]['loans'][0]['loan_number'], 'ML-0')
+
+        response = self.client.post(url, {'rows': self.rows(1)}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(url, {'rows': [{'member': 'x'}]}, content_type='application/json')
+        self.assertEqual(response.json()['errors'], {'0': {'member': ["Not an active member of this group."]}})
+
+
+class InterestAccrualTests(LoanTestCase):
+    """Each period credits every interest-earning account once, on its balance at the end of each day."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.savings = SavingsProduct.objects.create(name='Savings', code='SV', description='', interest_rate=10,
+                                                    minimum_deposit=0)
+        cls.plain = SavingsProduct.objects.create(name='Plain', code='PL', description='', interest_rate=0,
+                                                  minimum_deposit=0)
+        cls.accounts = []
+        for index in range(3):
+            member = Member.objects.create(
+                first_name='Saver', last_name=f'{index}', id_number=f'S-{index}', gender='F',
+                date_of_birth=date(1990, 1, 1), phone_number='+254711111111', physical_address='Village',
+            )
+            cls.accounts.append(IndividualSavingsAccount.objects.create(
+                member=member, product=cls.savings, account_number=f'IS-{index}', date_opened=date(2024, 1, 1),
+            ))
+        cls.group_account = GroupSavingsAccount.objects.create(
+            group=cls.group, product=cls.savings, account_number='GS-1', date_opened=date(2024, 1, 1),
+        )
+        cls.no_interest = IndividualSavingsAccount.objects.create(
+            member=member, product=cls.plain, account_number='IS-PLAIN', date_opened=date(2024, 1, 1),
+        )
+        for account in cls.accounts + [cls.group_account, cls.no_interest]:
+            cls.deposit(account, '5000', datetime(2024, 1, 10, 9))
+        # After January, so not part of January's closing balance
+        cls.deposit(cls.accounts[0], '1000', datetime(2024, 2, 5, 9))
+
+    @classmethod
+    def deposit(cls, account, amount, when):
+        field = 'group_savings_account' if isinstance(account, GroupSavingsAccount) else 'individual_savings_account'
+        Transaction.objects.create(
+            transaction_type='DEPOSIT', amount=Decimal(amount), date=timezone.make_aware(when),
+            reference_number=f'DEP-{account.account_number}-{when:%m%d}', **{field: account},
+        )
+
+    def interest_rows(self):
+        return Transaction.objects.filter(transaction_type='INTEREST_EARNED').order_by('reference_number')
+
+    def test_compute_interest_rounds_half_up_and_ignores_overdrawn_days(self):
+        # 5000.00 at 10% for 31 days is 42.4657...; 365.00 at 5% for one day is exactly 0.05
+        self.assertEqual(list(compute_interest([[500000] * 31, [36500] * 31, [-100000] * 31], [1000, 500, 1000])),
+                         [4247, 155, 0])
+        self.assertEqual(list(compute_interest([[36500]], [500])), [5])
+        # Overdrawn for one of two days: only the other day earns
+        self.assertEqual(list(compute_interest([[-36500, 36500]], [500])), [5])
+
+    def test_daily_balances_work_back_from_the_closing_balance(self):
+        balances = daily_balances([1500], [[1000, 0, 500]])
+        self.assertEqual(balances.tolist(), [[1000, 1000, 1500]])
+
+    def test_month_credits_each_account_on_its_daily_balances(self):
+        run = accrue_interest('MONTHLY', date(2024, 1, 15))
+
+        self.assertEqual((run.period_start, run.period_end), (date(2024, 1, 1), date(2024, 1, 31)))
+        self.assertIsNotNone(run.completed_at)
+        self.assertEqual(run.accounts_credited, 4)
+        # 5000.00 at 10% from 10 to 31 January (22 days) is 30.1369...
+        self.assertEqual(run.total_interest, Decimal('120.56'))
+        rows = self.interest_rows()
+        self.assertEqual([row.amount for row in rows], [Decimal('30.14')] * 4)
+        self.assertEqual(rows.filter(group_savings_account=self.group_account).count(), 1)
+        self.assertFalse(rows.filter(individual_savings_account=self.no_interest).exists())
+        self.assertEqual(rows[0].date, timezone.make_aware(datetime(2024, 1, 31, 23, 59, 59, 999999)))
+
+        self.accounts[0].refresh_from_db()
+        self.assertEqual(self.accounts[0].current_balance, Decimal('6030.14'))
+        self.assertEqual(LedgerPosting.objects.filter(transaction__in=rows).count(), 8)
+
+    def test_rerunning_a_period_credits_nothing_more(self):
+        accrue_interest('MONTHLY', date(2024, 1, 15))
+        with self.assertNumQueries(2):
+            run = accrue_interest('MONTHLY', date(2024, 1, 31))
+
+        self.assertEqual(run.accounts_credited, 4)
+        self.assertEqual(self.interest_rows().count(), 4)
+        self.assertEqual(InterestAccrualRun.objects.count(), 1)
+
+    def test_interrupted_run_resumes_after_the_last_chunk(self):
+        run = InterestAccrualRun.objects.create(frequency='DAILY', period_start=date(2024, 1, 20),
+                                                period_end=date(2024, 1, 20))
+        period_from = timezone.make_aware(datetime(2024, 1, 20))
+        as_of = timezone.make_aware(datetime(2024, 1, 20, 23, 59, 59, 999999))
+        self.assertTrue(_accrue_chunk(run.pk, IndividualSavingsAccount, 'individual_savings_account', period_from,
+                                      as_of, 2))
+
+        run.refresh_from_db()
+        self.assertEqual(run.last_individual_account_id, self.accounts[1].pk)
+        self.assertIsNone(run.completed_at)
+
+        run = accrue_interest('DAILY', date(2024, 1, 20), chunk_size=2)
+        self.assertEqual(run.accounts_credited, 4)
+        self.assertEqual(self.interest_rows().count(), 4)
+        # 5000.00 at 10% for one day
+        self.assertEqual(run.total_interest, Decimal('5.48'))
+
+    def test_deposit_late_in_the_month_earns_only_its_days(self):
+        account = self.accounts[1]
+        self.deposit(account, '36500', datetime(2024, 2, 29, 20))
+
+        accrue_interest('MONTHLY', date(2024, 2, 1))
+        row = self.interest_rows().get(individual_savings_account=account)
+        # 5000.00 for all 29 days (39.73) and 36,500.00 for the last one (10.00)
+        self.assertEqual(row.amount, Decimal('49.73'))
+
+    def test_one_frequency_per_period(self):
+        accrue_interest('DAILY', date(2024, 1, 20))
+        with self.assertRaises(ValueError):
+            accrue_interest('MONTHLY', date(2024, 1, 1))
+        self.assertEqual(InterestAccrualRun.objects.count(), 1)
+
+        accrue_interest('MONTHLY', date(2024, 3, 1))
+        with self.assertRaises(ValueError):
+            accrue_interest('DAILY', date(2024, 3, 31))
+
+    def test_periods_that_have_not_ended_are_refused(self):
+        with self.assertRaises(ValueError):
+            accrue_interest('DAILY', timezone.localdate())
+        self.assertFalse(InterestAccrualRun.objects.exists())
+
+
+class PenaltyAssessmentTests(LoanTestCase):
+    """Overdue installments past their grace period are charged one late fee, whatever the number of loans."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        LoanProduct.objects.filter(pk=cls.product.pk).update(grace_period=5, late_payment_fee=50)
+
+    def penalties(self, loan):
+        return list(LoanInstallment.objects.filter(loan=loan).values_list('penalty_due', flat=True))
+
+    def test_charges_installments_past_the_grace_period_once(self):
+        # Installments fall due on 1 February, 1 March and 1 April
+        loan = self.add_loan()
+
+        result = assess_penalties(date(2024, 3, 4))
+        self.assertEqual((result['installments'], result['loans'], result['total']), (1, 1, Decimal('50')))
+        self.assertEqual(result['charges'][0]['days_overdue'], 32)
+        self.assertEqual(self.penalties(loan), [50, 0, 0])
+        loan.refresh_from_db()
+        self.assertEqual((loan.total_amount_due, loan.remaining_balance), (Decimal('1286'), Decimal('1286')))
+
+        self.assertEqual(assess_penalties(date(2024, 3, 4))['installments'], 0)
+        self.assertEqual(assess_penalties(date(2024, 3, 7))['installments'], 1)
+        self.assertEqual(self.penalties(loan), [50, 50, 0])
+        self.assertEqual(LoanPenalty.objects.filter(loan=loan).count(), 2)
+
+    def test_dry_run_reports_without_charging(self):
+        loan = self.add_loan()
+
+        result = assess_penalties(date(2024, 4, 20), dry_run=True)
+        self.assertEqual([charge['installment'] for charge in result['charges']], [1, 2, 3])
+        self.assertEqual(result['total'], Decimal('150'))
+        self.assertEqual(self.penalties(loan), [0, 0, 0])
+        self.assertFalse(LoanPenalty.objects.exists())
+
+    def test_settled_installments_and_closed_loans_are_not_charged(self):
+        settled = self.add_loan()
+        self.pay(settled, '412')
+        closed = self.add_loan()
+        Loan.objects.filter(pk=closed.pk).update(status='DEFAULTED')
+
+        result = assess_penalties(date(2024, 3, 4))
+        self.assertEqual(result['installments'], 0)
+
+    def test_fee_is_repaid_before_interest_and_principal(self):
+        loan = self.add_loan()
+        assess_penalties(date(2024, 3, 4))
+
+        repayment = self.pay(loan, '100')
+        self.assertEqual((repayment.penalty_component, repayment.interest_component, repayment.principal_component),
+                         (50, 12, 38))
+
+    def test_portfolio_is_assessed_in_constant_queries(self):
+        for _ in range(5):
+            self.add_loan()
+        with self.assertNumQueries(ASSESS_PENALTIES_QUERIES):
+            result = assess_penalties(date(2024, 4, 20))
+        self.assertEqual((result['installments'], result['loans']), (15, 5))
+
+    def test_loans_are_locked_in_id_order_before_the_installments_are_read(self):
+        self.add_loan()
+        with CaptureQueriesContext(connection) as queries:
+            assess_penalties(date(2024, 4, 20))
+        statements = [query['sql'] for query in queries.captured_queries]
+        loans = next(index for index, sql in enumerate(statements) if sql.startswith('SELECT "tablebanking_loan"'))
+        installments = next(index for index, sql in enumerate(statements)
+                            if sql.startswith('SELECT "tablebanking_loaninstallment"'))
+        self.assertLess(loans, installments)
+        self.assertTrue(statements[loans].endswith('ORDER BY "tablebanking_loan"."id" ASC'))
+
+
+class AmortizationTests(LoanTestCase):
+    """Schedules add up to the loan exactly, whichever the method, for one loan or many at once."""
+
+    def schedule(self, loan):
+        return list(LoanInstallment.objects.filter(loan=loan).order_by('installment_number')
+                    .values_list('due_date', 'principal_due', 'interest_due'))
+
+    def test_methods_in_cents(self):
+        principal, interest = compute_schedules([1200, 1200, 1200, 1000], [12, 12, 12, 0], [3, 3, 3, 3],
+                                                ['FLAT', 'DECLINING', 'ANNUITY', 'FLAT'])
+        self.assertEqual(principal[0].tolist(), [40000, 40000, 40000])
+        self.assertEqual(interest[0].tolist(), [1200, 1200, 1200])
+        self.assertEqual(interest[1].tolist(), [1200, 800, 400])
+        # Equal installments of 408.03, the rounding taken back on the last one
+        self.assertEqual((principal[2] + interest[2]).tolist(), [40803, 40803, 40802])
+        self.assertEqual(principal[2].sum(), 120000)
+        self.assertEqual((principal[3].tolist(), interest[3].tolist()), ([33333, 33333, 33334], [0, 0, 0]))
+
+    def test_different_terms_share_one_array(self):
+        principal, interest = compute_schedules([600, 1200], [12, 12], [2, 4], ['FLAT', 'DECLINING'])
+        self.assertEqual(principal.shape, (2, 4))
+        self.assertEqual(principal[0].tolist(), [30000, 30000, 0, 0])
+        self.assertEqual(interest[0].sum(), 1200)
+
+    def test_disbursed_loan_gets_its_schedule(self):
+        loan = self.add_loan()
+        self.assertEqual(self.schedule(loan), [
+            (date(2024, 2, 1), Decimal('400.00'), Decimal('12.00')),
+            (date(2024, 3, 1), Decimal('400.00'), Decimal('12.00')),
+            (date(2024, 4, 1), Decimal('400.00'), Decimal('12.00')),
+        ])
+        self.assertEqual((loan.total_interest, loan.expected_end_date), (Decimal('36.00'), date(2024, 4, 1)))
+
+    def test_undisbursed_rows_start_from_the_local_date(self):
+        installment, = build_installments([{'id': 1, 'principal_amount': 100, 'interest_rate': 0, 'term_months': 1,
+                                            'method': 'FLAT', 'disbursement_date': None}])
+        self.assertEqual(installment.due_date, timezone.localdate() + relativedelta(months=1))
+
+    def test_backfill_and_rebuild_leave_paid_schedules_alone(self):
+        unpaid, paid, missing = self.add_loan(), self.add_loan(), self.add_loan()
+        self.pay(paid, '100')
+        LoanInstallment.objects.filter(loan=missing).delete()
+        LoanInstallment.objects.filter(loan__in=[unpaid, paid]).update(interest_due=0)
 
-# Create your tests here.
+        self.assertEqual(generate_schedules(), 3)
+        call_command('generate_loan_schedules', '--replace', stdout=StringIO())
+        self.assertEqual(self.schedule(unpaid), self.schedule(missing))
+        self.assertEqual(self.schedule(unpaid)[0][2], Decimal('12.00'))
+        self.assertEqual(self.schedule(paid)[0][2], Decimal('0.00'))
@@ -4,5 +4,8 @@ from . import views
 app_name = 'tablebanking'
 
 urlpatterns = [
-    # URLs will be added as features are implemented
+    path('transactions/', views.transaction_list, name='transaction_list'),
+    path('repayments/', views.repayment_list, name='repayment_list'),
+    path('groups/<int:group_id>/collection/', views.meeting_day_collection, name='meeting_day_collection'),
+    path('groups/<int:group_id>/collection/grid/', views.meeting_day_grid, name='meeting_day_grid'),
 ] 
\ No newline at end of file
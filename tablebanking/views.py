@@ -1,3 +1,126 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.views.decorators.http import require_GET, require_http_methods
+
+from dashboard.pagination import DEFAULT_PER_PAGE, InvalidCursor, KeysetPaginator
+from user_management.models import FieldOfficer, Group
+from .meeting_day import CollectionError, load_group, post_collection
+from .models import LoanRepayment, Transaction
+
+
+TRANSACTION_FIELDS = ('id', 'transaction_type', 'amount', 'date', 'reference_number',
+                      'individual_savings_account_id', 'group_savings_account_id')
+
+REPAYMENT_FIELDS = ('id', 'loan_id', 'amount', 'payment_date', 'reference_number',
+                    'principal_component', 'interest_component', 'penalty_component')
+
+
+def _integer_filters(request, names):
+    """Exact-match filters for the given integer query parameters that were sent."""
+    filters = {}
+    for param, lookup in names.items():
+        value = request.GET.get(param)
+        if value:
+            if not value.isdigit():
+                raise ValueError(f"'{param}' must be an integer.")
+            filters[lookup] = int(value)
+    return filters
+
+
+def _keyset_page(request, queryset, ordering, fields):
+    """One keyset page of ``queryset`` as JSON, with an approximate total when ?total=1."""
+    try:
+        per_page = int(request.GET.get('limit', DEFAULT_PER_PAGE))
+    except ValueError:
+        return JsonResponse({'error': "'limit' must be an integer."}, status=400)
+    
+    paginator = KeysetPaginator(queryset.values(*fields), ordering, per_page=per_page,
+                                with_total=request.GET.get('total') == '1')
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    data = {'results': page.object_list, 'next': page.next_cursor, 'previous': page.previous_cursor}
+    if page.total is not None:
+        data['total'] = page.total
+    return JsonResponse(data)
+
+
+@login_required
+@require_GET
+def transaction_list(request):
+    """Savings transactions, newest first (filter with ?account= or ?group_account=)."""
+    try:
+        filters = _integer_filters(request, {'account': 'individual_savings_account_id',
+                                             'group_account': 'group_savings_account_id'})
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return _keyset_page(request, Transaction.objects.filter(**filters), Transaction.LIST_ORDERING,
+                        TRANSACTION_FIELDS)
+
+
+@login_required
+@require_GET
+def repayment_list(request):
+    """Loan repayments, newest first (filter with ?loan=)."""
+    try:
+        filters = _integer_filters(request, {'loan': 'loan_id'})
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return _keyset_page(request, LoanRepayment.objects.filter(**filters), LoanRepayment.LIST_ORDERING,
+                        REPAYMENT_FIELDS)
+
+
+@login_required
+@require_GET
+def meeting_day_grid(request, group_id):
+    """The meeting-day collection screen; rows are posted to meeting_day_collection."""
+    group = get_object_or_404(Group, pk=group_id)
+    context = {
+        'group': group,
+        'members': [{'id': member_id, **member} for member_id, member in load_group(group).items()],
+        'active_menu': 'collections',
+    }
+    return render(request, 'tablebanking/meeting_day_collection.html', context)
+
+
+@login_required
+@require_http_methods(['GET', 'POST'])
+def meeting_day_collection(request, group_id):
+    """
+    A group's meeting-day collection grid.
+    
+    GET lists the active members with their savings accounts and outstanding
+    loans. POST takes ``{"rows": [{"member", "savings", "repayment", "fee"}]}``
+    and posts every row in one go, or nothing if any row is invalid.
+    """
+    group = get_object_or_404(Group, pk=group_id)
+    if request.method == 'GET':
+        members = load_group(group)
+        return JsonResponse({
+            'group': {'id': group.pk, 'name': group.name},
+            'members': [{'id': member_id, **member} for member_id, member in members.items()],
+        })
+    
+    try:
+        payload = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': "Request body must be valid JSON."}, status=400)
+    
+    rows = payload.get('rows') if isinstance(payload, dict) else None
+    if not isinstance(rows, list) or not rows:
+        return JsonResponse({'error': "Expected a non-empty 'rows' list."}, status=400)
+    
+    field_officer = FieldOfficer.objects.filter(user=request.user).first()
+    try:
+        summary = post_collection(group, rows, field_officer=field_officer)
+    except CollectionError as e:
+        return JsonResponse({'error': str(e), 'errors': e.errors}, status=400)
+    
+    return JsonResponse(summary, status=201)
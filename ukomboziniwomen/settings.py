@@ -191,5 +191,31 @@ LOGIN_URL = 'login'
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    # Saved query results; least recently used entries are culled when full
+    'saved_queries': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'saved-queries',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 500,
+        },
+    },
+}
+
+# Meeting reminder delivery (see dashboard.reminders); RATE_LIMIT is messages per second
+REMINDER_BACKENDS = {
+    'default': {
+        'BACKEND': 'dashboard.reminders.ConsoleBackend',
+        'BATCH_SIZE': 100,
+        'RATE_LIMIT': None,
+    },
+    'file': {
+        'BACKEND': 'dashboard.reminders.FileBackend',
+        'BATCH_SIZE': 500,
+        'RATE_LIMIT': None,
+        'OPTIONS': {
+            'PATH': os.path.join(BASE_DIR, 'reminders.log'),
+        },
+    },
 }
@@ -20,7 +20,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 from django.shortcuts import redirect
-from dashboard.views import offline_view
+from dashboard.views import offline_view, sync_offline_records, sync_meeting_attendance, change_feed
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -42,6 +42,15 @@ urlpatterns = [
     # Offline page
     path('offline/', offline_view, name='offline'),
     
+    # Batch upload of records captured offline
+    path('api/sync/', sync_offline_records, name='api_sync'),
+    
+    # Meeting registers captured offline
+    path('api/attendance/', sync_meeting_attendance, name='api_attendance'),
+    
+    # Changes to download since the device's last cursor
+    path('api/changes/', change_feed, name='api_changes'),
+    
     # Default redirect to dashboard
     path('', lambda request: redirect('dashboard:index'), name='home'),
 ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fieldofficer',
+            index=models.Index(fields=['phone_number'], name='user_manage_phone_n_800b99_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['last_name', 'first_name'], name='user_manage_last_na_84f11c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['first_name'], name='user_manage_first_n_dedfb1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['phone_number'], name='user_manage_phone_n_7a29d0_idx'),
+        ),
+    ]
@@ -13,6 +13,11 @@ class FieldOfficer(models.Model):
     date_joined = models.DateField(default=timezone.now)
     is_active = models.BooleanField(default=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['phone_number']),
+        ]
+    
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.assigned_area}"
 
@@ -46,6 +51,14 @@ class Member(models.Model):
     # Field officer who registered/manages this member
     field_officer = models.ForeignKey(FieldOfficer, on_delete=models.SET_NULL, null=True, blank=True)
     
+    class Meta:
+        # Prefix searches from the participant pickers
+        indexes = [
+            models.Index(fields=['last_name', 'first_name']),
+            models.Index(fields=['first_name']),
+            models.Index(fields=['phone_number']),
+        ]
+    
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.id_number}"
     